@@ -11,7 +11,8 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+# (Skipped when app.migrations runs us inside the server process.)
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 import sys
@@ -64,6 +65,17 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # app.migrations hands us the connection it holds the migration lock on
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(
+            connection=connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     # START CHANGE: Check for DATABASE_URL env var
     config_section = config.get_section(config.config_ini_section, {})
     database_url = os.getenv("DATABASE_URL")
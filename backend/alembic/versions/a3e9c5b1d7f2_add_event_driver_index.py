@@ -0,0 +1,25 @@
+"""add events (driver_id, start_time) index for commute chaining
+
+Revision ID: a3e9c5b1d7f2
+Revises: f2c7a9e4b8d3
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'a3e9c5b1d7f2'
+down_revision: Union[str, Sequence[str], None] = 'f2c7a9e4b8d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases built by the old Base.metadata.create_all() startup may already have it
+    op.create_index('ix_events_driver_id_start_time', 'events', ['driver_id', 'start_time'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_driver_id_start_time', table_name='events', if_exists=True)
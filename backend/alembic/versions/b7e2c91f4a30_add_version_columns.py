@@ -0,0 +1,35 @@
+"""add version columns for optimistic concurrency
+
+Revision ID: b7e2c91f4a30
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b7e2c91f4a30'
+down_revision: Union[str, Sequence[str], None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ('users', 'events', 'todos', 'shopping_items')
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table in VERSIONED_TABLES:
+        columns = [c['name'] for c in inspector.get_columns(table)]
+        if 'version' not in columns:
+            op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
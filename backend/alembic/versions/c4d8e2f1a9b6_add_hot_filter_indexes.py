@@ -0,0 +1,42 @@
+"""add indexes for hot filters
+
+Revision ID: c4d8e2f1a9b6
+Revises: b7e2c91f4a30
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c4d8e2f1a9b6'
+down_revision: Union[str, Sequence[str], None] = 'b7e2c91f4a30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns) - keep in sync with the Index definitions in app/models.py
+INDEXES = (
+    ('ix_users_family_id', 'users', ['family_id']),
+    ('ix_users_invite_token', 'users', ['invite_token']),
+    ('ix_users_email_lower', 'users', [sa.text('lower(email)')]),
+    ('ix_todos_family_id_assigned_to_user_id', 'todos', ['family_id', 'assigned_to_user_id']),
+    ('ix_shopping_items_family_id_is_bought', 'shopping_items', ['family_id', 'is_bought']),
+    ('ix_user_profile_attributes_user_id_key', 'user_profile_attributes', ['user_id', 'key']),
+    ('ix_event_attendees_event_id_user_id', 'event_attendees', ['event_id', 'user_id']),
+    ('ix_event_attendees_user_id', 'event_attendees', ['user_id']),
+)
+
+
+def upgrade() -> None:
+    # Databases built by the old Base.metadata.create_all() startup may already have
+    # these. IF NOT EXISTS rather than an inspector check: SQLite's inspector skips
+    # expression indexes.
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,41 @@
+"""recurring events: rrule, exdates, recurrence_end
+
+Revision ID: c6f1a8d3e5b7
+Revises: b8d4f6a2c9e1
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c6f1a8d3e5b7'
+down_revision: Union[str, Sequence[str], None] = 'b8d4f6a2c9e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('events')}
+    # Databases built by the old Base.metadata.create_all() startup may already have them
+    if 'rrule' not in columns:
+        with op.batch_alter_table('events') as batch_op:
+            batch_op.add_column(sa.Column('rrule', sa.String(), nullable=True))
+            batch_op.add_column(sa.Column('exdates', sa.JSON(), nullable=True))
+            batch_op.add_column(sa.Column('recurrence_end', sa.DateTime(), nullable=True))
+    op.create_index('ix_events_end_time', 'events', ['end_time'], if_not_exists=True)
+    op.create_index(
+        'ix_events_series_start_time', 'events', ['start_time'], if_not_exists=True,
+        sqlite_where=sa.text('rrule IS NOT NULL'), postgresql_where=sa.text('rrule IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_series_start_time', table_name='events', if_exists=True)
+    op.drop_index('ix_events_end_time', table_name='events', if_exists=True)
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.drop_column('recurrence_end')
+        batch_op.drop_column('exdates')
+        batch_op.drop_column('rrule')
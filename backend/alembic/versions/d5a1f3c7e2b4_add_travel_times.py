@@ -0,0 +1,39 @@
+"""add travel_times
+
+Revision ID: d5a1f3c7e2b4
+Revises: c4d8e2f1a9b6
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd5a1f3c7e2b4'
+down_revision: Union[str, Sequence[str], None] = 'c4d8e2f1a9b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases built by the old Base.metadata.create_all() startup may already have the table
+    if sa.inspect(op.get_bind()).has_table('travel_times'):
+        return
+    op.create_table(
+        'travel_times',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('origin_key', sa.String(), nullable=False),
+        sa.Column('dest_key', sa.String(), nullable=False),
+        sa.Column('profile', sa.String(), nullable=False),
+        sa.Column('minutes', sa.Float(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_travel_times_route', 'travel_times', ['origin_key', 'dest_key', 'profile'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_travel_times_route', table_name='travel_times', if_exists=True)
+    op.drop_table('travel_times')
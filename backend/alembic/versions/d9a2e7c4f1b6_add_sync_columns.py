@@ -0,0 +1,47 @@
+"""delta sync: updated_at / deleted_at on events, todos, shopping_items
+
+Revision ID: d9a2e7c4f1b6
+Revises: c6f1a8d3e5b7
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd9a2e7c4f1b6'
+down_revision: Union[str, Sequence[str], None] = 'c6f1a8d3e5b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('events', 'todos', 'shopping_items')
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    now = datetime.datetime.utcnow()
+    for table in TABLES:
+        columns = {c['name'] for c in inspector.get_columns(table)}
+        # Databases built by the old Base.metadata.create_all() startup may already have them
+        if 'updated_at' not in columns:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+                batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+            # Existing rows count as changed now: the first sync after the upgrade sends everything
+            rows = sa.table(table, sa.column('updated_at', sa.DateTime))
+            bind.execute(rows.update().where(rows.c.updated_at.is_(None)).values(updated_at=now))
+        op.create_index(f'ix_{table}_family_id_updated_at', table, ['family_id', 'updated_at'], if_not_exists=True)
+    op.create_index('ix_events_deleted_at', 'events', ['deleted_at'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_deleted_at', table_name='events', if_exists=True)
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_family_id_updated_at', table_name=table, if_exists=True)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('deleted_at')
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,39 @@
+"""add geocoded_places
+
+Revision ID: e8b3d6a2f4c1
+Revises: d5a1f3c7e2b4
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e8b3d6a2f4c1'
+down_revision: Union[str, Sequence[str], None] = 'd5a1f3c7e2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases built by the old Base.metadata.create_all() startup may already have the table
+    if sa.inspect(op.get_bind()).has_table('geocoded_places'):
+        return
+    op.create_table(
+        'geocoded_places',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('query_key', sa.String(), nullable=False),
+        sa.Column('display_name', sa.String(), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('provider', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_geocoded_places_query_key', 'geocoded_places', ['query_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_geocoded_places_query_key', table_name='geocoded_places', if_exists=True)
+    op.drop_table('geocoded_places')
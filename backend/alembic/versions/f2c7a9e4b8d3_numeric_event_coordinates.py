@@ -0,0 +1,80 @@
+"""numeric event coordinates and grid cell
+
+Revision ID: f2c7a9e4b8d3
+Revises: e8b3d6a2f4c1
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f2c7a9e4b8d3'
+down_revision: Union[str, Sequence[str], None] = 'e8b3d6a2f4c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Keep in sync with app/services/logistics.py (grid_cell)
+GRID_DEGREES = 0.25
+
+
+def _grid_cell(lat, lng):
+    if lat is None or lng is None:
+        return None
+    row = min(max(int((lat + 90) // GRID_DEGREES), 0), int(180 / GRID_DEGREES) - 1)
+    columns = int(360 / GRID_DEGREES)
+    return row * columns + int((lng + 180) // GRID_DEGREES) % columns
+
+
+def _to_float(value, low, high):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if low <= number <= high else None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {c['name'] for c in sa.inspect(bind).get_columns('events')}
+    # Databases built by the old Base.metadata.create_all() startup may already have the new columns
+    if 'geo_cell' in columns:
+        return
+
+    # Parse the old strings in Python: whatever was typed in, unparseable values become NULL
+    events = sa.table('events', sa.column('id', sa.Integer), sa.column('latitude', sa.String), sa.column('longitude', sa.String))
+    rows = bind.execute(sa.select(events.c.id, events.c.latitude, events.c.longitude)).all()
+
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.alter_column('latitude', type_=sa.Float(), existing_type=sa.String(), postgresql_using='NULL::double precision')
+        batch_op.alter_column('longitude', type_=sa.Float(), existing_type=sa.String(), postgresql_using='NULL::double precision')
+        batch_op.add_column(sa.Column('geo_cell', sa.Integer(), nullable=True))
+
+    events = sa.table(
+        'events', sa.column('id', sa.Integer), sa.column('latitude', sa.Float),
+        sa.column('longitude', sa.Float), sa.column('geo_cell', sa.Integer),
+    )
+    values = []
+    for event_id, lat, lng in rows:
+        lat, lng = _to_float(lat, -90, 90), _to_float(lng, -180, 180)
+        if lat is None or lng is None:
+            lat = lng = None
+        values.append({'row_id': event_id, 'lat': lat, 'lng': lng, 'cell': _grid_cell(lat, lng)})
+    if values:
+        bind.execute(
+            events.update().where(events.c.id == sa.bindparam('row_id')).values(
+                latitude=sa.bindparam('lat'), longitude=sa.bindparam('lng'), geo_cell=sa.bindparam('cell'),
+            ),
+            values,
+        )
+    op.create_index('ix_events_geo_cell_start_time', 'events', ['geo_cell', 'start_time'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_geo_cell_start_time', table_name='events', if_exists=True)
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.drop_column('geo_cell')
+        batch_op.alter_column('latitude', type_=sa.String(), existing_type=sa.Float())
+        batch_op.alter_column('longitude', type_=sa.String(), existing_type=sa.Float())
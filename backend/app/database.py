@@ -1,26 +1,348 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event, exc, insert, text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
+import datetime
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict, deque
 
-# Check if running in production (Render sets DATABASE_URL)
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+logger = logging.getLogger(__name__)
+
+def normalize_database_url(url):
+    if url and url.startswith("postgres://"):
+        # Fix for Render's Postgres URL which uses postgres:// but SQLAlchemy needs postgresql://
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
 
+# Check if running in production (Render sets DATABASE_URL)
 # If not in production (or DATABASE_URL not set), fallback to SQLite
-if not SQLALCHEMY_DATABASE_URL:
-    SQLALCHEMY_DATABASE_URL = "sqlite:///./family_calendar.db"
-elif SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-    # Fix for Render's Postgres URL which uses postgres:// but SQLAlchemy needs postgresql://
-    SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    # Only use check_same_thread for SQLite
-    connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
-)
+SQLALCHEMY_DATABASE_URL = normalize_database_url(os.getenv("DATABASE_URL")) or "sqlite:///./family_calendar.db"
+
+
+# ──────────────────────────────────────────────
+# Connection pool: configuration + telemetry
+# ──────────────────────────────────────────────
+
+def _env_flag(env, name, default):
+    return env.get(name, default) not in ("0", "false", "False", "")
+
+
+class PoolStats:
+    """Checkout latency window plus in-use / overflow gauges for one engine's pool."""
+
+    def __init__(self, window: int = 500):
+        self.latencies = deque(maxlen=window)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.pool = None
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def on_checkout(self, *args):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def on_checkin(self, *args):
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def stats(self):
+        with self._lock:
+            ordered = sorted(self.latencies)
+        pool = self.pool
+        return {
+            "pool": type(pool).__name__ if pool is not None else None,
+            "size": pool.size() if isinstance(pool, QueuePool) else None,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            # QueuePool.overflow() starts at -pool_size; clamp to "connections beyond pool_size"
+            "overflow": max(pool.overflow(), 0) if isinstance(pool, QueuePool) else 0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "checkout_ms_avg": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None,
+            "checkout_ms_p95": round(ordered[max(int(len(ordered) * 0.95) - 1, 0)] * 1000, 3) if ordered else None,
+            "checkout_ms_max": round(ordered[-1] * 1000, 3) if ordered else None,
+        }
+
+
+class _TimedCheckout:
+    """Pool mixin that times how long callers wait for a connection."""
+
+    pool_stats = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            if self.pool_stats is not None:
+                self.pool_stats.timeouts += 1
+            raise
+        finally:
+            if self.pool_stats is not None:
+                self.pool_stats.record_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        # Invalidation rebuilds the pool; listeners carry over via _dispatch,
+        # so only the stats' view of the pool needs repointing
+        new_pool = super().recreate()
+        new_pool.pool_stats = self.pool_stats
+        if self.pool_stats is not None:
+            self.pool_stats.pool = new_pool
+        return new_pool
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def instrument_pool(pool, pool_stats: PoolStats):
+    pool.pool_stats = pool_stats
+    pool_stats.pool = pool
+    event.listen(pool, "checkout", pool_stats.on_checkout)
+    event.listen(pool, "checkin", pool_stats.on_checkin)
+    return pool_stats
+
+
+def async_database_url(url: str) -> str:
+    """Maps a sync URL onto its asyncio driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+def engine_options(url: str, env=None):
+    """
+    Builds create_engine() kwargs from the environment:
+
+    DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE /
+    DB_POOL_PRE_PING size the pool; DB_STATEMENT_TIMEOUT_MS caps every
+    Postgres statement. DB_PGBOUNCER=1 hands pooling to PgBouncer (transaction
+    mode): no client-side pool, and the timeout is applied per transaction
+    because PgBouncer rejects startup options.
+    """
+    env = os.environ if env is None else env
+    is_sqlite = url.startswith("sqlite")
+    is_async = "+aiosqlite" in url or "+asyncpg" in url
+    options = {"pool_pre_ping": _env_flag(env, "DB_POOL_PRE_PING", "1")}
+    connect_args = {}
+
+    if is_sqlite and not is_async:
+        # Only use check_same_thread for SQLite
+        connect_args["check_same_thread"] = False
+    statement_timeout = int(env.get("DB_STATEMENT_TIMEOUT_MS", "0"))
+    pgbouncer = not is_sqlite and _env_flag(env, "DB_PGBOUNCER", "0")
+
+    if pgbouncer:
+        options["poolclass"] = TimedNullPool
+        if is_async:
+            # asyncpg's prepared statements don't survive transaction pooling
+            connect_args.update(statement_cache_size=0, prepared_statement_cache_size=0)
+    else:
+        options.update(
+            poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+            pool_size=int(env.get("DB_POOL_SIZE", "5")),
+            max_overflow=int(env.get("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(env.get("DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(env.get("DB_POOL_RECYCLE", "1800")),
+        )
+        if statement_timeout and not is_sqlite:
+            if is_async:
+                connect_args["server_settings"] = {"statement_timeout": str(statement_timeout)}
+            else:
+                connect_args["options"] = f"-c statement_timeout={statement_timeout}"
+
+    options["connect_args"] = connect_args
+    return options
+
+
+def _attach_telemetry(new_engine, url: str, env):
+    # AsyncEngine is slotted; telemetry hangs off its sync_engine
+    sync_engine = getattr(new_engine, "sync_engine", new_engine)
+    sync_engine.pool_stats = instrument_pool(sync_engine.pool, PoolStats())
+
+    statement_timeout = int(env.get("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if statement_timeout and isinstance(sync_engine.pool, NullPool) and not url.startswith("sqlite"):
+        @event.listens_for(sync_engine, "begin")
+        def _set_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {statement_timeout}")
+
+    return new_engine
+
+
+def create_app_engine(url: str, env=None):
+    """create_engine() with environment-driven pool settings and checkout telemetry attached."""
+    env = os.environ if env is None else env
+    return _attach_telemetry(create_engine(url, **engine_options(url, env)), url, env)
+
+
+def create_app_async_engine(url: str, env=None):
+    """Asyncio twin of create_app_engine(); `url` is the sync URL."""
+    env = os.environ if env is None else env
+    url = async_database_url(url)
+    return _attach_telemetry(create_async_engine(url, **engine_options(url, env)), url, env)
+
+
+# ──────────────────────────────────────────────
+# Read-replica routing
+# ──────────────────────────────────────────────
+
+# Postgres standby: 0 when fully replayed, otherwise seconds since the last replayed commit
+POSTGRES_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+async def postgres_replica_lag(session) -> float:
+    return float((await session.execute(text(POSTGRES_LAG_SQL))).scalar() or 0)
+
+
+class ReadRouter:
+    """
+    Picks the session factory for a read-only request. Reads go to the replica
+    unless the same client wrote within `read_your_writes_seconds` (so they see
+    their own change) or the replica's measured lag exceeds `max_lag_seconds`.
+    Lag is probed at most once per `lag_check_seconds`; a failed probe counts as
+    lagging.
+    """
+
+    def __init__(self, primary, replica=None, read_your_writes_seconds: float = 5.0,
+                 max_lag_seconds: float = 5.0, lag_check_seconds: float = 1.0, lag_probe=None,
+                 max_tracked_clients: int = 10000):
+        self.primary = primary
+        self.replica = replica
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_seconds = lag_check_seconds
+        self.lag_probe = lag_probe
+        self.max_tracked_clients = max_tracked_clients
+        self._last_write: "OrderedDict[str, float]" = OrderedDict()
+        self._lag = 0.0
+        self._lag_checked_at = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.read_your_writes = 0
+        self.lag_fallbacks = 0
+
+    def record_write(self, client_key: str):
+        self._last_write[client_key] = time.monotonic()
+        self._last_write.move_to_end(client_key)
+        while len(self._last_write) > self.max_tracked_clients:
+            self._last_write.popitem(last=False)
+
+    def wrote_recently(self, client_key: str) -> bool:
+        wrote_at = self._last_write.get(client_key)
+        return wrote_at is not None and time.monotonic() - wrote_at < self.read_your_writes_seconds
+
+    async def replica_lag(self) -> float:
+        now = time.monotonic()
+        if self._lag_checked_at is not None and now - self._lag_checked_at < self.lag_check_seconds:
+            return self._lag
+        self._lag_checked_at = now
+        if self.lag_probe is None:
+            self._lag = 0.0
+            return self._lag
+        try:
+            async with self.replica() as session:
+                self._lag = await self.lag_probe(session)
+        except Exception as e:
+            logger.warning("Replica lag probe failed: %s", e)
+            self._lag = float("inf")
+        return self._lag
+
+    async def session_factory(self, client_key: str):
+        if self.replica is None:
+            self.primary_reads += 1
+            return self.primary
+        if self.wrote_recently(client_key):
+            self.read_your_writes += 1
+            self.primary_reads += 1
+            return self.primary
+        if await self.replica_lag() > self.max_lag_seconds:
+            self.lag_fallbacks += 1
+            self.primary_reads += 1
+            return self.primary
+        self.replica_reads += 1
+        return self.replica
+
+    def stats(self):
+        return {
+            "replica_configured": self.replica is not None,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "read_your_writes": self.read_your_writes,
+            "lag_fallbacks": self.lag_fallbacks,
+            "replica_lag_seconds": self._lag if self._lag_checked_at is not None else None,
+        }
+
+
+def client_key(request) -> str:
+    """Identifies "the same client" for read-your-writes: its bearer token, else its address."""
+    return request.headers.get("authorization") or (request.client.host if request.client else "anonymous")
+
+
+engine = create_app_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Hot read endpoints run on the event loop instead of FastAPI's threadpool
+async_engine = create_app_async_engine(SQLALCHEMY_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional replica for those reads
+SQLALCHEMY_READ_DATABASE_URL = normalize_database_url(os.getenv("DATABASE_READ_URL"))
+read_async_engine = None
+AsyncReadSessionLocal = None
+if SQLALCHEMY_READ_DATABASE_URL:
+    read_async_engine = create_app_async_engine(SQLALCHEMY_READ_DATABASE_URL)
+    AsyncReadSessionLocal = async_sessionmaker(read_async_engine, autoflush=False, expire_on_commit=False)
+
+read_router = ReadRouter(
+    AsyncSessionLocal,
+    AsyncReadSessionLocal,
+    read_your_writes_seconds=float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5")),
+    max_lag_seconds=float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5")),
+    lag_check_seconds=float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "1")),
+    lag_probe=postgres_replica_lag if SQLALCHEMY_READ_DATABASE_URL and SQLALCHEMY_READ_DATABASE_URL.startswith("postgresql") else None,
+)
+
+
+def pool_stats():
+    return engine.pool_stats.stats()
+
+
+def async_pool_stats():
+    return async_engine.sync_engine.pool_stats.stats()
+
+
+def read_pool_stats():
+    return read_async_engine.sync_engine.pool_stats.stats() if read_async_engine is not None else None
+
 Base = declarative_base()
 
 def get_db():
@@ -29,3 +351,67 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db(request: Request):
+    """Async session for read-only routes: the replica when it's safe, else the primary."""
+    session_factory = await read_router.session_factory(client_key(request))
+    async with session_factory() as db:
+        yield db
+
+def insert_returning(db, model, rows):
+    """One multi-row INSERT ... RETURNING; results come back in the same order as `rows`."""
+    # render_nulls keeps rows with None values in the same batch instead of
+    # splitting them into a separate INSERT per distinct column set
+    stmt = insert(model).execution_options(render_nulls=True)
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite can't batch when asked to sort by parameter order, but it assigns
+        # rowids in VALUES order, so sorting on the primary key is equivalent
+        created = db.scalars(stmt.returning(model), rows).all()
+        return sorted(created, key=lambda obj: obj.id)
+    return db.scalars(stmt.returning(model, sort_by_parameter_order=True), rows).all()
+
+def insert_ignore_conflicts(db, model, rows):
+    """Multi-row INSERT that skips rows hitting a unique constraint (first writer wins)."""
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    db.execute(dialect_insert(model).on_conflict_do_nothing(), rows)
+
+def get_live(db, model, row_id):
+    """The row with this id, or None if it doesn't exist or was soft-deleted."""
+    obj = db.get(model, row_id)
+    if obj is None or getattr(obj, "deleted_at", None) is not None:
+        return None
+    return obj
+
+def soft_delete(db, model, *criteria):
+    """Marks matching live rows deleted (a tombstone for /api/sync) and returns their (id, family_id)."""
+    return db.execute(
+        update(model)
+        .where(*criteria, model.deleted_at.is_(None))
+        .values(deleted_at=datetime.datetime.utcnow(), version=model.version + 1)
+        .returning(model.id, model.family_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+def update_returning(db, model, row_id, values, expected_version=None):
+    """
+    Applies `values` to one row with a single UPDATE ... RETURNING, bumping its
+    `version`. When `expected_version` is given the row only matches if nobody
+    else has written it since. Returns the updated object, or None if no row
+    matched (missing, soft-deleted, or a version conflict - the caller decides which).
+    """
+    stmt = update(model).where(model.id == row_id)
+    if hasattr(model, "deleted_at"):
+        stmt = stmt.where(model.deleted_at.is_(None))
+    if expected_version is not None:
+        stmt = stmt.where(model.version == expected_version)
+    stmt = stmt.values(**values, version=model.version + 1).returning(model)
+    return db.scalars(stmt).first()
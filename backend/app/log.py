@@ -0,0 +1,245 @@
+"""
+Logging setup: structured, non-blocking, correlated by request.
+
+configure_logging() puts a QueueHandler on the root logger. Request handlers
+only enqueue records; a QueueListener thread formats them and does the
+(blocking) write to stdout. If the queue is full, records are dropped and
+counted instead of stalling the request.
+
+Each record carries the request ID of the request that emitted it. It comes
+from the client's X-Request-ID header, or a new one is generated, and it is
+echoed back in the response. Contextvars carry it into threadpool and LLM
+executor work.
+
+Settings:
+    LOG_LEVEL                 INFO
+    LOG_FORMAT                json | text (default json)
+    LOG_QUEUE_SIZE            10000 records
+    LOG_PAYLOAD_SAMPLE_RATE   share of requests whose LLM payloads are logged (0.01)
+    LOG_PAYLOAD_MAX_CHARS     payloads are truncated to this (2000)
+
+Library loggers that are chatty at INFO (SQLAlchemy and its pool events,
+including app.database's instrumented pools, and the HTTP clients) are held
+at WARNING whatever LOG_LEVEL says, so a pool reset or an outgoing request
+doesn't cost a queued record each.
+
+Modules log through logging.getLogger(__name__) as usual. Verbose bodies (raw
+LLM responses, transcripts) go through log_payload(), which is DEBUG-level and
+sampled per request.
+"""
+import atexit
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+REQUEST_ID_HEADER = "x-request-id"
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# LogRecord attributes that aren't user-supplied `extra` fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+# Held at WARNING; app.database's pool subclasses log under their own class names
+QUIET_LOGGERS = (
+    "sqlalchemy",
+    "app.database.TimedQueuePool",
+    "app.database.TimedAsyncQueuePool",
+    "app.database.TimedNullPool",
+    "httpx",
+    "httpcore",
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+
+def request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+# ──────────────────────────────────────────────
+# Handler, filter, formatters
+# ──────────────────────────────────────────────
+
+class RequestIdFilter(logging.Filter):
+    """Stamps the current request ID on the record (runs in the emitting thread)."""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+_traceback_formatter = logging.Formatter()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler over a bounded queue that drops, rather than blocks or raises, when full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Like the stdlib version, resolve the message and traceback here (the
+        # args may not be safe to format later, on another thread), but keep
+        # them separate so the JSON formatter can emit them as fields
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        text = super().format(record)
+        payload = getattr(record, "payload", None)
+        return f"{text}\n{payload}" if payload is not None else text
+
+
+def configure_logging(env=None):
+    """Installs the queue handler on the root logger. Idempotent."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    env = os.environ if env is None else env
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(TextFormatter() if env.get("LOG_FORMAT", "json") == "text" else JsonFormatter())
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=int(env.get("LOG_QUEUE_SIZE", "10000"))))
+    _queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(env.get("LOG_LEVEL", "INFO").upper())
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flushes the queue and stops the listener thread."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+# ──────────────────────────────────────────────
+# Verbose payloads
+# ──────────────────────────────────────────────
+
+def payload_sampled(rate: Optional[float] = None) -> bool:
+    """
+    Whether this request's payloads are logged. Decided from the request ID,
+    so a sampled request logs all of its payloads rather than a random subset.
+    """
+    if rate is None:
+        rate = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+    if rate <= 0:
+        return False
+    if rate >= 1:
+        return True
+    current = _request_id.get()
+    if current is None:
+        return random.random() < rate
+    return zlib.crc32(current.encode()) % 10000 < rate * 10000
+
+
+def log_payload(logger: logging.Logger, message: str, payload) -> None:
+    """Logs a large body (LLM output, transcript) at DEBUG, sampled and truncated."""
+    if not logger.isEnabledFor(logging.DEBUG) or not payload_sampled():
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    limit = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "2000"))
+    if len(text) > limit:
+        text = f"{text[:limit]}... [{len(text) - limit} more chars]"
+    logger.debug(message, extra={"payload": text})
+
+
+# ──────────────────────────────────────────────
+# ASGI middleware
+# ──────────────────────────────────────────────
+
+class RequestIdMiddleware:
+    """Binds a request ID for the request's logs and returns it in X-Request-ID."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        incoming = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        current = incoming if incoming and _VALID_REQUEST_ID.fullmatch(incoming) else uuid.uuid4().hex
+        token = _request_id.set(current)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = current
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _request_id.reset(token)
@@ -1,14 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .routes import events, voice, users, auth, assistant, shopping, todos, families
+from fastapi.concurrency import run_in_threadpool
+from .database import async_engine, client_key, engine, read_async_engine, read_router
+from . import log, migrations, profiler, pubsub, telemetry
+from .routes import events, voice, users, auth, assistant, shopping, todos, families, metrics, profiles, places, sync, stream
 from dotenv import load_dotenv
+import logging
 import os
 
 load_dotenv()
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+log.configure_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Family Calendar API")
 
@@ -20,21 +22,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Auto-run migrations on startup
-from alembic.config import Config
-from alembic import command
+@app.middleware("http")
+async def track_writes(request: Request, call_next):
+    """Successful writes open the client's read-your-writes window (reads go to the primary)."""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        read_router.record_write(client_key(request))
+    return response
+
+# Wraps the routes and other middleware so its timings include them. Every SQL
+# statement (any engine) is attributed to the request that ran it. The
+# profiler sits just inside it and marks those statements in its profiles.
+telemetry.instrument_queries()
+app.add_middleware(profiler.ProfilerMiddleware)
+app.add_middleware(telemetry.RequestMetricsMiddleware)
+# Outermost: everything below, including the telemetry above, logs with the request ID
+app.add_middleware(log.RequestIdMiddleware)
 
+# Bring the schema to head on startup. Cheap when it already is (one SELECT);
+# otherwise one worker migrates under a lock while the others wait and skip.
 @app.on_event("startup")
 async def startup_event():
-    if os.path.exists("alembic.ini"):
-        try:
-            alembic_cfg = Config("alembic.ini")
-            command.upgrade(alembic_cfg, "head")
-            print("Migrations applied successfully.")
-        except Exception as e:
-            print(f"Migration failed: {e}")
-    else:
-        print("alembic.ini not found, skipping migration.")
+    if os.getenv("MIGRATE_ON_STARTUP", "1") in ("0", "false", "False"):
+        return
+    try:
+        await run_in_threadpool(migrations.run, engine)
+    except Exception as e:
+        logger.exception("Migration failed")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await pubsub.hub.close()
+    await async_engine.dispose()
+    if read_async_engine is not None:
+        await read_async_engine.dispose()
 
 app.include_router(events.router, prefix="/api/events", tags=["events"])
 app.include_router(voice.router, prefix="/api/voice", tags=["voice"])
@@ -44,6 +65,12 @@ app.include_router(assistant.router, prefix="/api/assistant", tags=["assistant"]
 app.include_router(shopping.router, prefix="/api/shopping", tags=["shopping"])
 app.include_router(todos.router, prefix="/api/todos", tags=["todos"])
 app.include_router(families.router, prefix="/api/families", tags=["families"])
+app.include_router(places.router, prefix="/api/places", tags=["places"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
+app.include_router(stream.router, prefix="/api/stream", tags=["stream"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
+app.include_router(metrics.prometheus_router, tags=["metrics"])
+app.include_router(profiles.router, prefix="/api/profiles", tags=["profiles"])
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,153 @@
+"""
+Migration coordinator.
+
+Every worker calls ensure_schema() on boot. The common case - the database is
+already at head - costs one SELECT against alembic_version. Otherwise one
+process takes a lock (a transaction-scoped advisory lock on Postgres, a file
+lock next to the database on SQLite), re-checks, and runs `alembic upgrade
+head`; the others wait on the lock, see the new revision and go straight to
+serving.
+
+    python -m app.migrations    # same thing from the command line (Procfile)
+"""
+import contextlib
+import logging
+import os
+import re
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+VERSIONS_DIR = os.path.join(BACKEND_DIR, "alembic", "versions")
+
+# Arbitrary, but fixed: every process must ask for the same advisory lock
+ADVISORY_LOCK_KEY = 0x43414C4D  # "CALM"
+
+logger = logging.getLogger(__name__)
+
+_head_revision = None
+
+
+def _alembic_config(connection=None):
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    if connection is not None:
+        config.attributes["connection"] = connection
+    # Don't let alembic.ini's logging config replace the server's
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def _scan_head():
+    """
+    Finds the head by reading `revision` / `down_revision` straight out of the
+    version files, which is far cheaper than importing Alembic and every
+    migration module. Returns None if the graph doesn't have exactly one head.
+    """
+    revisions, parents = set(), set()
+    for name in os.listdir(VERSIONS_DIR):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(VERSIONS_DIR, name)) as f:
+            source = f.read()
+        revision = re.search(r"^revision(?:\s*:\s*str)?\s*=\s*['\"]([^'\"]+)['\"]", source, re.M)
+        down = re.search(r"^down_revision\b[^=]*=\s*(.+)$", source, re.M)
+        if revision:
+            revisions.add(revision.group(1))
+        if down:
+            parents.update(re.findall(r"['\"]([^'\"]+)['\"]", down.group(1)))
+    heads = revisions - parents
+    return heads.pop() if len(heads) == 1 else None
+
+
+def head_revision() -> str:
+    """Latest revision in alembic/versions (read once per process)."""
+    global _head_revision
+    if _head_revision is None:
+        _head_revision = _scan_head()
+    if _head_revision is None:
+        # Branches/merges: let Alembic work it out (and complain about multiple heads)
+        from alembic.script import ScriptDirectory
+
+        _head_revision = ScriptDirectory.from_config(_alembic_config()).get_current_head()
+    return _head_revision
+
+
+def current_revision(connection):
+    """Revision recorded in the database, or None if it has never been migrated."""
+    try:
+        with connection.begin_nested() if connection.in_transaction() else connection.begin():
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        return None
+
+
+@contextlib.contextmanager
+def _sqlite_file_lock(database):
+    if not database or database == ":memory:":
+        # Private in-memory database: nobody else can race us
+        yield
+        return
+    import fcntl
+
+    with open(f"{database}.migrate.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _upgrade(connection):
+    from alembic import command
+
+    command.upgrade(_alembic_config(connection), "head")
+
+
+def ensure_schema(engine) -> str:
+    """
+    Brings the database to head if needed. Returns "current" (nothing to do),
+    "migrated" (this process ran the upgrade) or "skipped" (another process
+    migrated while we waited for the lock).
+    """
+    head = head_revision()
+    with engine.connect() as connection:
+        if current_revision(connection) == head:
+            return "current"
+
+        if engine.dialect.name == "postgresql":
+            # Transaction-scoped so it also works through PgBouncer's transaction
+            # pooling; released by the commit that ends the migration.
+            with connection.begin():
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                if current_revision(connection) == head:
+                    return "skipped"
+                _upgrade(connection)
+            return "migrated"
+
+        with _sqlite_file_lock(engine.url.database):
+            if current_revision(connection) == head:
+                return "skipped"
+            _upgrade(connection)
+            connection.commit()
+        return "migrated"
+
+
+def run(engine=None) -> str:
+    if engine is None:
+        from .database import engine
+    started = time.perf_counter()
+    result = ensure_schema(engine)
+    logger.info("Schema %s at %s (%.0f ms)", result, head_revision(), (time.perf_counter() - started) * 1000)
+    return result
+
+
+if __name__ == "__main__":
+    from .log import configure_logging
+
+    configure_logging()
+    run()
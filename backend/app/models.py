@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, JSON, Table, Float
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, JSON, Table, Float, Index, func, text
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
@@ -6,7 +6,10 @@ import datetime
 # Association table for Event attendees
 event_attendees = Table('event_attendees', Base.metadata,
     Column('event_id', Integer, ForeignKey('events.id')),
-    Column('user_id', Integer, ForeignKey('users.id'))
+    Column('user_id', Integer, ForeignKey('users.id')),
+    # Attendees of an event (selectinload), and events a user attends
+    Index('ix_event_attendees_event_id_user_id', 'event_id', 'user_id'),
+    Index('ix_event_attendees_user_id', 'user_id'),
 )
 
 class Family(Base):
@@ -28,7 +31,7 @@ class User(Base):
     role = Column(String, default="member") # 'admin' or 'member'
     is_active = Column(Boolean, default=True)
     phone_number = Column(String, nullable=True)
-    family_id = Column(Integer, ForeignKey("families.id"))
+    family_id = Column(Integer, ForeignKey("families.id"), index=True)
     
     # [NEW] Profile fields
     avatar_url = Column(String, nullable=True)
@@ -42,10 +45,18 @@ class User(Base):
     preferences = Column(JSON, default={})
 
     # [NEW] Invite & Status
-    invite_token = Column(String, nullable=True)
+    invite_token = Column(String, nullable=True, index=True)
     invite_expires_at = Column(DateTime, nullable=True)
     status = Column(String, default="active") # 'active', 'pending_invite', 'requested_join'
 
+    # Optimistic concurrency: bumped by every UPDATE, checked when the client sends it back
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+
+    __table_args__ = (
+        # Login and invites match emails case-insensitively
+        Index("ix_users_email_lower", func.lower(email)),
+    )
+
 class Event(Base):
     __tablename__ = "events"
 
@@ -66,12 +77,40 @@ class Event(Base):
 
     # [NEW] Logistics fields
     driver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    latitude = Column(String, nullable=True)
-    longitude = Column(String, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    # logistics.grid_cell(latitude, longitude): prunes "near me" queries to a few cells
+    geo_cell = Column(Integer, nullable=True)
     commute_time_minutes = Column(Integer, default=0)
     
     driver = relationship("User", foreign_keys=[driver_id])
 
+    # Recurring series (services/recurrence.py): start/end_time are the first occurrence
+    rrule = Column(String, nullable=True)
+    exdates = Column(JSON, nullable=True) # Cancelled occurrence starts (ISO strings)
+    recurrence_end = Column(DateTime, nullable=True) # End of the last occurrence; NULL: forever
+
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+    # Delta sync (routes/sync.py): bumped on every write; deletes only set deleted_at
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Nearby events: geo_cell IN (...) plus a time window
+        Index("ix_events_geo_cell_start_time", "geo_cell", "start_time"),
+        # Commute chaining: a driver's previous/next event around a time
+        Index("ix_events_driver_id_start_time", "driver_id", "start_time"),
+        # A family's events in a time window: batch conflict checks, driver planning
+        Index("ix_events_family_id_start_time", "family_id", "start_time"),
+        # Windowed reads: single events by end, series (few rows) by start
+        Index("ix_events_end_time", "end_time"),
+        Index("ix_events_series_start_time", "start_time",
+              sqlite_where=text("rrule IS NOT NULL"), postgresql_where=text("rrule IS NOT NULL")),
+        Index("ix_events_family_id_updated_at", "family_id", "updated_at"),
+        # Unfiltered event list: live rows only
+        Index("ix_events_deleted_at", "deleted_at"),
+    )
+
 class Chore(Base):
     __tablename__ = "chores"
 
@@ -103,6 +142,10 @@ class UserProfileAttribute(Base):
     
     user = relationship("User", backref="profile_attributes")
 
+    __table_args__ = (
+        Index("ix_user_profile_attributes_user_id_key", "user_id", "key"),
+    )
+
 class ToDo(Base):
     __tablename__ = "todos"
     
@@ -119,6 +162,17 @@ class ToDo(Base):
     assigned_to = relationship("User", foreign_keys=[assigned_to_user_id])
     created_by = relationship("User", foreign_keys=[created_by_user_id])
 
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+    # Delta sync (routes/sync.py): bumped on every write; deletes only set deleted_at
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Family list, optionally filtered by assignee
+        Index("ix_todos_family_id_assigned_to_user_id", "family_id", "assigned_to_user_id"),
+        Index("ix_todos_family_id_updated_at", "family_id", "updated_at"),
+    )
+
 # Update ShoppingItem to include created_at
 class ShoppingItem(Base):
     __tablename__ = "shopping_items"
@@ -134,3 +188,49 @@ class ShoppingItem(Base):
 
     family = relationship("Family")
     added_by = relationship("User")
+
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+    # Delta sync (routes/sync.py): bumped on every write; deletes only set deleted_at
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Family list, and "clear bought" (family_id + is_bought)
+        Index("ix_shopping_items_family_id_is_bought", "family_id", "is_bought"),
+        Index("ix_shopping_items_family_id_updated_at", "family_id", "updated_at"),
+    )
+
+class TravelTime(Base):
+    """Routed travel times between rounded "lat,lng" keys (see services/logistics.py)."""
+    __tablename__ = "travel_times"
+
+    id = Column(Integer, primary_key=True)
+    origin_key = Column(String, nullable=False)
+    dest_key = Column(String, nullable=False)
+    profile = Column(String, nullable=False)
+    minutes = Column(Float, nullable=False)
+    source = Column(String, nullable=False)
+    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_travel_times_route", "origin_key", "dest_key", "profile", unique=True),
+    )
+
+class GeocodedPlace(Base):
+    """
+    Geocoder results by normalized query ("lincoln fields"). Rows without
+    coordinates record that the provider found nothing, so it isn't asked again.
+    """
+    __tablename__ = "geocoded_places"
+
+    id = Column(Integer, primary_key=True)
+    query_key = Column(String, nullable=False)
+    display_name = Column(String, nullable=False)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    provider = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_geocoded_places_query_key", "query_key", unique=True),
+    )
@@ -0,0 +1,322 @@
+"""
+On-demand request profiler.
+
+A request carrying `X-Profile-Token: <PROFILER_TOKEN>` is profiled by a
+sampling profiler: a background thread snapshots the interpreter's stacks
+every PROFILE_INTERVAL_MS while the request runs. SQL statements and LLM
+calls made by the request (see telemetry.py) appear as "SQL: ..." / "LLM: ..."
+frames on top of the stack they ran on, and as a separate timeline per thread.
+
+The result is written as speedscope JSON (https://www.speedscope.app) into a
+ring buffer of the last PROFILE_KEEP files under PROFILE_DIR, and its id is
+returned in an `X-Profile-Id` response header:
+
+    curl -H "X-Profile-Token: $PROFILER_TOKEN" -D - https://.../api/events/
+    curl -H "X-Profile-Token: $PROFILER_TOKEN" https://.../api/profiles/<id> > p.json
+
+Profiling is off unless PROFILER_TOKEN is set. Stacks are sampled from every
+thread that is running app code, so other requests served concurrently by the
+same worker can show up in the profile.
+"""
+import hmac
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from . import telemetry
+
+PROFILE_HEADER = "x-profile-token"
+# Fetching a profile with the token shouldn't record (and rotate out) another one
+UNPROFILED_PREFIX = "/api/profiles"
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# Span labels are SQL statements; keep frames readable
+MAX_LABEL_CHARS = 120
+
+
+def profiler_token() -> Optional[str]:
+    return os.getenv("PROFILER_TOKEN") or None
+
+
+def token_matches(candidate: Optional[str]) -> bool:
+    token = profiler_token()
+    return bool(token and candidate) and hmac.compare_digest(candidate.encode(), token.encode())
+
+
+def _label(text: str) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    return text if len(text) <= MAX_LABEL_CHARS else text[:MAX_LABEL_CHARS - 3] + "..."
+
+
+# ──────────────────────────────────────────────
+# Sampling
+# ──────────────────────────────────────────────
+
+class Span:
+    def __init__(self, session: "ProfileSession", label: str):
+        self.session = session
+        self.label = _label(label)
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.ended = None
+        session._open(self)
+
+    def end(self):
+        if self.ended is None:
+            self.ended = time.perf_counter()
+            self.session._close(self)
+
+
+class ProfileSession:
+    """Samples stacks until stop(); SQL/LLM calls are marked with begin()."""
+
+    def __init__(self, interval: float = 0.005, max_seconds: float = 30.0):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.started = time.perf_counter()
+        self.stopped = None
+        self.frames: List[Dict] = []
+        self._frame_index: Dict[tuple, int] = {}
+        # thread id -> [(stack, weight)]
+        self.samples: Dict[int, List] = {}
+        self.spans: List[Span] = []
+        self._open_spans: Dict[int, List[Span]] = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._done.set()
+        self._thread.join()
+        self.stopped = time.perf_counter()
+        # Spans still open (a stream cut short) end with the profile
+        with self._lock:
+            still_open = [span for spans in self._open_spans.values() for span in spans]
+        for span in still_open:
+            span.end()
+
+    def begin(self, label: str) -> Span:
+        return Span(self, label)
+
+    def _open(self, span: Span):
+        with self._lock:
+            self._open_spans.setdefault(span.thread_id, []).append(span)
+
+    def _close(self, span: Span):
+        with self._lock:
+            spans = self._open_spans.get(span.thread_id, [])
+            if span in spans:
+                spans.remove(span)
+            self.spans.append(span)
+
+    def _frame(self, key: tuple) -> int:
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            name, path, line = key
+            frame = {"name": name}
+            if path:
+                frame["file"] = path
+                frame["line"] = line
+            self.frames.append(frame)
+        return index
+
+    def _run(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._done.wait(self.interval):
+            now = time.perf_counter()
+            if now - self.started > self.max_seconds:
+                break
+            weight, last = now - last, now
+            with self._lock:
+                open_spans = {tid: spans[-1].label for tid, spans in self._open_spans.items() if spans}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                in_app = False
+                while frame is not None:
+                    code = frame.f_code
+                    in_app = in_app or code.co_filename.startswith(APP_DIR)
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                span_label = open_spans.get(thread_id)
+                # Idle pool threads (nothing from app/ on the stack) are noise
+                if not in_app and span_label is None:
+                    continue
+                stack.reverse()
+                if span_label is not None:
+                    stack.append((span_label, None, None))
+                indices = [self._frame(key) for key in stack]
+                self.samples.setdefault(thread_id, []).append((indices, weight))
+
+    def to_speedscope(self, name: str) -> Dict:
+        """Speedscope file: one sampled profile per thread plus one SQL/LLM timeline per thread."""
+        end_ms = ((self.stopped or time.perf_counter()) - self.started) * 1000
+        profiles = []
+        for thread_id, samples in self.samples.items():
+            profiles.append({
+                "type": "sampled",
+                "name": f"{name} (thread {thread_id})",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": end_ms,
+                "samples": [stack for stack, _ in samples],
+                "weights": [weight * 1000 for _, weight in samples],
+            })
+
+        by_thread: Dict[int, List[Span]] = {}
+        for span in self.spans:
+            by_thread.setdefault(span.thread_id, []).append(span)
+        for thread_id, spans in by_thread.items():
+            points = []
+            for span in spans:
+                frame = self._frame((span.label, None, None))
+                # Closes sort before opens at the same instant; nested spans stay nested
+                points.append((span.started, 1, -span.ended, "O", frame))
+                points.append((span.ended, 0, -span.started, "C", frame))
+            events = [
+                {"type": kind, "frame": frame, "at": (at - self.started) * 1000}
+                for at, _, _, kind, frame in sorted(points)
+            ]
+            profiles.append({
+                "type": "evented",
+                "name": f"SQL + LLM (thread {thread_id})",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": end_ms,
+                "events": events,
+            })
+
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "calendarapp-profiler",
+            "shared": {"frames": self.frames},
+            "profiles": profiles,
+        }
+
+
+# ──────────────────────────────────────────────
+# On-disk ring buffer
+# ──────────────────────────────────────────────
+
+class ProfileStore:
+    """Keeps the newest `keep` profiles in `directory`; older files are deleted on write."""
+
+    SUFFIX = ".speedscope.json"
+
+    def __init__(self, directory: str, keep: int = 20):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, profile_id + self.SUFFIX)
+
+    def new_id(self) -> str:
+        # Sorts by creation time
+        return f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+
+    def save(self, profile_id: str, document: Dict):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(profile_id)
+        with open(path + ".tmp", "w") as f:
+            json.dump(document, f)
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            for stale in self.list()[self.keep:]:
+                try:
+                    os.unlink(self._path(stale))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[str]:
+        """Profile ids, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        ids = [name[:-len(self.SUFFIX)] for name in os.listdir(self.directory) if name.endswith(self.SUFFIX)]
+        return sorted(ids, reverse=True)
+
+    def path(self, profile_id: str) -> Optional[str]:
+        if not re.fullmatch(r"[0-9]+-[0-9a-f]{8}", profile_id):
+            return None
+        path = self._path(profile_id)
+        return path if os.path.exists(path) else None
+
+
+store = ProfileStore(
+    os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "calendarapp-profiles"),
+    keep=int(os.getenv("PROFILE_KEEP", "20")),
+)
+
+# One profiled request at a time per worker: the sampler sees every thread
+_active = threading.Lock()
+
+
+# ──────────────────────────────────────────────
+# ASGI middleware
+# ──────────────────────────────────────────────
+
+class ProfilerMiddleware:
+    """
+    Profiles requests that carry a valid X-Profile-Token. Must sit inside
+    telemetry.RequestMetricsMiddleware, whose RequestTiming it attaches the
+    session to so SQL and LLM calls get marked.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(UNPROFILED_PREFIX)
+            or not token_matches(Headers(scope=scope).get(PROFILE_HEADER))
+        ):
+            await self.app(scope, receive, send)
+            return
+        if not _active.acquire(blocking=False):
+            # Another profile is running; serve this one normally
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = store.new_id()
+        session = ProfileSession(
+            interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+            max_seconds=float(os.getenv("PROFILE_MAX_SECONDS", "30")),
+        )
+        timing = telemetry.current_timing()
+        if timing is not None:
+            timing.profile = session
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        session.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            session.stop()
+            if timing is not None:
+                timing.profile = None
+            _active.release()
+            name = f"{scope['method']} {scope['path']}"
+            await run_in_threadpool(store.save, profile_id, session.to_speedscope(name))
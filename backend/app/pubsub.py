@@ -0,0 +1,400 @@
+"""
+Live change push: routes record what they wrote, and when the session
+commits a compact message per family ({"type": "change", "changed":
+{"todos": [3]}, "deleted": {"shopping_items": [7]}}) goes through a broker
+to every /api/stream connection of that family. Messages carry ids only;
+clients fetch the rows with their /api/sync token, so a message is never
+too big or visible to the wrong user, and a lost one costs a little latency.
+
+Each connection has a bounded queue. One that falls behind (a stalled phone)
+doesn't hold up anyone else or grow without limit: its backlog is dropped
+and replaced with a single {"type": "resync"}, after which the client does
+one delta sync. An idle connection is one small queue and one waiting task.
+
+Brokers:
+- memory: in-process, for a single worker (the default).
+- redis: PUBLISH/SUBSCRIBE over the Redis protocol, so every worker's
+  clients see every worker's writes. Works with Redis or a compatible
+  server, e.g. the stand-in in app/pubsub_server.py. Each worker subscribes
+  only to the families that have connections on it.
+
+Settings:
+    STREAM_BROKER      memory | redis (default memory)
+    STREAM_BROKER_URL  redis://[:password@]host[:port] (redis://localhost:6379)
+    STREAM_QUEUE_SIZE  messages buffered per connection before it is told to resync (64)
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "calendar:family:"
+RESYNC = json.dumps({"type": "resync"}, separators=(",", ":"))
+
+
+def _channel(family_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{family_id}"
+
+
+# ──────────────────────────────────────────────
+# Recording changes
+# ──────────────────────────────────────────────
+
+def record_change(db: Session, collection: str, rows, deleted: bool = False) -> None:
+    """
+    Queues a change message for `rows` (anything with .id and .family_id) of
+    `collection` ("events", "todos", "shopping_items"), published when `db`
+    commits and dropped if it rolls back.
+    """
+    pending = db.info.setdefault("stream_changes", {})
+    for row in rows:
+        if row.family_id is None:
+            continue
+        family = pending.setdefault(row.family_id, {"changed": {}, "deleted": {}})
+        family["deleted" if deleted else "changed"].setdefault(collection, set()).add(row.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_on_commit(session):
+    for family_id, changes in session.info.pop("stream_changes", {}).items():
+        message = {"type": "change"}
+        for kind in ("changed", "deleted"):
+            if changes[kind]:
+                message[kind] = {name: sorted(ids) for name, ids in changes[kind].items()}
+        hub.publish(family_id, message)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("stream_changes", None)
+
+
+# ──────────────────────────────────────────────
+# Connections
+# ──────────────────────────────────────────────
+
+class Subscription:
+    """One client connection's bounded queue. Only touched on the event loop."""
+
+    def __init__(self, hub: "Hub", family_id: int, size: int):
+        self.hub = hub
+        self.family_id = family_id
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(size)
+        self._behind = False
+
+    def offer(self, payload: str) -> None:
+        if self._behind:
+            # A resync is already queued; it covers this change too
+            return
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC)
+            self._behind = True
+            self.hub.overflows += 1
+
+    async def get(self) -> str:
+        payload = await self._queue.get()
+        if payload == RESYNC:
+            self._behind = False
+        return payload
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """
+    Fans messages out to this worker's connections, by family. publish() may
+    be called from any thread (sync routes run in the threadpool);
+    subscribe() and delivery happen on the event loop.
+    """
+
+    def __init__(self, broker, queue_size: int = 64):
+        self.broker = broker
+        self.queue_size = queue_size
+        self._families: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        broker.attach(self._on_message, self._on_reconnect)
+
+    def subscribe(self, family_id: int) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self, family_id, self.queue_size)
+        subscribers = self._families.setdefault(family_id, set())
+        if not subscribers:
+            self.broker.listen(_channel(family_id))
+        subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._families.get(subscription.family_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._families[subscription.family_id]
+            self.broker.unlisten(_channel(subscription.family_id))
+
+    def publish(self, family_id: int, message: dict) -> None:
+        self.published += 1
+        self.broker.publish(_channel(family_id), json.dumps(message, separators=(",", ":")))
+
+    def _on_message(self, channel: str, payload: str) -> None:
+        """Broker callback, from any thread."""
+        family_id = int(channel[len(CHANNEL_PREFIX):])
+        loop = self._loop
+        if family_id not in self._families or loop is None or loop.is_closed():
+            return
+        if _on_loop(loop):
+            self._deliver(family_id, payload)
+        else:
+            loop.call_soon_threadsafe(self._deliver, family_id, payload)
+
+    def _deliver(self, family_id: int, payload: str) -> None:
+        for subscription in list(self._families.get(family_id, ())):
+            subscription.offer(payload)
+            self.delivered += 1
+
+    def _on_reconnect(self) -> None:
+        """The broker lost its subscriptions for a while: everyone may have missed changes."""
+        for subscribers in list(self._families.values()):
+            for subscription in list(subscribers):
+                subscription.offer(RESYNC)
+
+    async def close(self) -> None:
+        await self.broker.close()
+
+    def stats(self) -> dict:
+        return {
+            "broker": self.broker.name,
+            "connections": sum(len(subscribers) for subscribers in self._families.values()),
+            "families": len(self._families),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            **self.broker.stats(),
+        }
+
+
+def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+# ──────────────────────────────────────────────
+# Brokers
+# ──────────────────────────────────────────────
+
+class MemoryBroker:
+    """Single worker: a publish is delivered straight to this worker's hub."""
+
+    name = "memory"
+
+    def attach(self, on_message: Callable[[str, str], None], on_reconnect: Callable[[], None]) -> None:
+        self._on_message = on_message
+
+    def publish(self, channel: str, payload: str) -> None:
+        self._on_message(channel, payload)
+
+    def listen(self, channel: str) -> None:
+        pass
+
+    def unlisten(self, channel: str) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class BrokerError(Exception):
+    pass
+
+
+def encode_command(*args: str) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg.encode() if isinstance(arg, str) else arg
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def _parse_line(line: bytes):
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return "simple", body.decode()
+    if kind == b"-":
+        raise BrokerError(body.decode())
+    if kind == b":":
+        return "int", int(body)
+    if kind in (b"$", b"*"):
+        return kind.decode(), int(body)
+    raise BrokerError(f"Unexpected reply {line[:20]!r}")
+
+
+async def read_reply(reader: asyncio.StreamReader):
+    """One RESP value: str, int, None or a list of them."""
+    kind, value = _parse_line(await reader.readline())
+    if kind == "$":
+        return None if value < 0 else (await reader.readexactly(value + 2))[:-2].decode()
+    if kind == "*":
+        return None if value < 0 else [await read_reply(reader) for _ in range(value)]
+    return value
+
+
+def _read_reply_sync(stream):
+    kind, value = _parse_line(stream.readline())
+    if kind == "$":
+        return None if value < 0 else stream.read(value + 2)[:-2].decode()
+    if kind == "*":
+        return None if value < 0 else [_read_reply_sync(stream) for _ in range(value)]
+    return value
+
+
+class RedisBroker:
+    """
+    Redis-protocol pub/sub without a client library. Publishing uses one
+    blocking connection shared by the route threads; subscribing uses one
+    asyncio connection per worker that reconnects (with backoff) and
+    re-subscribes on its own.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = "redis://localhost:6379", timeout: float = 2.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.timeout = timeout
+        self._channels: Set[str] = set()
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._stream = None
+        self._task: Optional[asyncio.Task] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self.publish_errors = 0
+        self.reconnects = 0
+
+    def attach(self, on_message: Callable[[str, str], None], on_reconnect: Callable[[], None]) -> None:
+        self._on_message = on_message
+        self._on_reconnect = on_reconnect
+
+    # ── publishing (any thread) ──
+
+    def publish(self, channel: str, payload: str) -> None:
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect_sync()
+                    self._sock.sendall(encode_command("PUBLISH", channel, payload))
+                    _read_reply_sync(self._stream)
+                    return
+                except (OSError, ConnectionError, BrokerError) as e:
+                    self._close_sync()
+                    if attempt:
+                        # The change is committed either way; clients catch up on their next sync
+                        self.publish_errors += 1
+                        logger.warning("Stream publish failed: %s", e)
+
+    def _connect_sync(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._stream = self._sock.makefile("rb")
+        if self.password:
+            self._sock.sendall(encode_command("AUTH", self.password))
+            _read_reply_sync(self._stream)
+
+    def _close_sync(self) -> None:
+        if self._sock is not None:
+            self._stream.close()
+            self._sock.close()
+        self._sock = self._stream = None
+
+    # ── subscribing (event loop) ──
+
+    def listen(self, channel: str) -> None:
+        self._channels.add(channel)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+        elif self._writer is not None:
+            self._writer.write(encode_command("SUBSCRIBE", channel))
+
+    def unlisten(self, channel: str) -> None:
+        self._channels.discard(channel)
+        if self._writer is not None:
+            self._writer.write(encode_command("UNSUBSCRIBE", channel))
+
+    async def _run(self) -> None:
+        backoff, connected_before = 0.5, False
+        while True:
+            try:
+                reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+                if self.password:
+                    self._writer.write(encode_command("AUTH", self.password))
+                    await read_reply(reader)
+                if self._channels:
+                    self._writer.write(encode_command("SUBSCRIBE", *sorted(self._channels)))
+                if connected_before:
+                    self.reconnects += 1
+                    self._on_reconnect()
+                connected_before, backoff = True, 0.5
+                while True:
+                    reply = await read_reply(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == "message":
+                        self._on_message(reply[1], reply[2])
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, BrokerError) as e:
+                logger.warning("Stream broker connection lost (%s); retrying in %.1fs", e, backoff)
+            finally:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        with self._lock:
+            self._close_sync()
+
+    def stats(self) -> dict:
+        return {"publish_errors": self.publish_errors, "reconnects": self.reconnects}
+
+
+def _default_hub() -> Hub:
+    if os.getenv("STREAM_BROKER", "memory") == "redis":
+        broker = RedisBroker(os.getenv("STREAM_BROKER_URL") or "redis://localhost:6379")
+    else:
+        broker = MemoryBroker()
+    return Hub(broker, queue_size=int(os.getenv("STREAM_QUEUE_SIZE", "64")))
+
+
+hub = _default_hub()
@@ -0,0 +1,125 @@
+"""
+Local Redis-compatible pub/sub server for STREAM_BROKER=redis when there is
+no Redis: enough of the protocol for app.pubsub (SUBSCRIBE, UNSUBSCRIBE,
+PUBLISH, PING, AUTH, QUIT). Nothing is stored. Run one per host and point
+every worker's STREAM_BROKER_URL at it:
+
+    python -m app.pubsub_server --port 6379
+
+A subscriber whose socket is not draining (more than `max_buffer` bytes
+queued) misses messages instead of growing the server's memory; its clients
+catch up through /api/sync.
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, Set
+
+from .pubsub import BrokerError, encode_command, read_reply
+
+logger = logging.getLogger(__name__)
+
+
+class PubSubServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, max_buffer: int = 1 << 20):
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self._channels: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self._server = None
+        self.dropped = 0
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 picks a free one
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        subscribed: Set[str] = set()
+        try:
+            while True:
+                try:
+                    command = await read_reply(reader)
+                except BrokerError:
+                    break
+                if not isinstance(command, list) or not command:
+                    writer.write(b"-ERR expected a command array\r\n")
+                    continue
+                name, args = str(command[0]).upper(), [str(arg) for arg in command[1:]]
+                if name == "SUBSCRIBE":
+                    for channel in args:
+                        self._channels.setdefault(channel, set()).add(writer)
+                        subscribed.add(channel)
+                        writer.write(_push("subscribe", channel, len(subscribed)))
+                elif name == "UNSUBSCRIBE":
+                    for channel in args or sorted(subscribed):
+                        self._leave(channel, writer)
+                        subscribed.discard(channel)
+                        writer.write(_push("unsubscribe", channel, len(subscribed)))
+                elif name == "PUBLISH" and len(args) == 2:
+                    writer.write(b":%d\r\n" % self.publish(*args))
+                elif name == "PING":
+                    writer.write(b"+PONG\r\n")
+                elif name in ("AUTH", "SELECT"):
+                    writer.write(b"+OK\r\n")
+                elif name == "QUIT":
+                    writer.write(b"+OK\r\n")
+                    break
+                else:
+                    writer.write(b"-ERR unknown command '%s'\r\n" % name.encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in subscribed:
+                self._leave(channel, writer)
+            writer.close()
+
+    def publish(self, channel: str, payload: str) -> int:
+        message = encode_command("message", channel, payload)
+        receivers = 0
+        for subscriber in list(self._channels.get(channel, ())):
+            if subscriber.is_closing() or subscriber.transport.get_write_buffer_size() > self.max_buffer:
+                self.dropped += 1
+                continue
+            subscriber.write(message)
+            receivers += 1
+        return receivers
+
+    def _leave(self, channel: str, writer: asyncio.StreamWriter) -> None:
+        subscribers = self._channels.get(channel)
+        if subscribers is not None:
+            subscribers.discard(writer)
+            if not subscribers:
+                del self._channels[channel]
+
+
+def _push(kind: str, channel: str, count: int) -> bytes:
+    """[un]subscribe confirmation: [kind, channel, channels still subscribed]."""
+    return b"*3\r\n%s%s:%d\r\n" % (_bulk(kind), _bulk(channel), count)
+
+
+def _bulk(text: str) -> bytes:
+    data = text.encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+async def _serve(host: str, port: int) -> None:
+    server = PubSubServer(host, port)
+    await server.start()
+    logger.info("Pub/sub server listening on %s:%d", host, server.port)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    options = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(options.host, options.port))
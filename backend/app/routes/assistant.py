@@ -1,17 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..database import get_db
-from .. import models
+from .. import models, schemas
+from ..pubsub import record_change
 from pydantic import BaseModel
-from openai import OpenAI
-import os
 import json
 from datetime import datetime, date
 from ..services.ticketmaster import TicketmasterService
 from ..services.ai_learning import AILearningService
+from ..services.singleflight import SingleFlight, normalize_key
+from ..services import commute
+from ..services.intents import apply_parsed_intents
+from ..services.llm import genai_types, require_client
+from ..telemetry import llm_call
+from ..log import log_payload
+from starlette.concurrency import run_in_threadpool
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 class SearchRequest(BaseModel):
     query: str
@@ -32,52 +41,66 @@ class EventSuggestion(BaseModel):
 class SearchResponse(BaseModel):
     suggestions: List[EventSuggestion]
 
+# Identical searches from several tabs/family members share one Gemini call
+_search_flight = SingleFlight("assistant_search")
+
 @router.post("/search", response_model=SearchResponse)
 async def search_events(request: SearchRequest = Body(...), db: Session = Depends(get_db)):
-    from google import genai
-    from google.genai import types
+    try:
+        # The Gemini SDK call is blocking, so run it off the event loop
+        return await _search_flight.do_async(
+            normalize_key(request.query),
+            lambda: run_in_threadpool(_gemini_search, request.query),
+        )
+    except Exception as e:
+        logger.exception("Error in Gemini search")
+        # For now, just raise 500
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _gemini_search(query: str) -> dict:
+    types = genai_types()
     
-    # Initialize Client
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    # Shared client from the registry (SDK imported on first use)
+    client = require_client("gemini")
     
-    try:
-        # Construct a detailed system prompt
-        system_instruction = """
-        You are a helpful event planning assistant for a family.
-        Your goal is to find REAL events based on the user's query.
-        
-        CRITICAL INSTRUCTIONS:
-        1.  **USE GOOGLE SEARCH**: You MUST use the Google Search tool to find and VALIDATE events. Do not hallucinate.
-        2.  **VERIFY DETAILS**: For every event, verify the date, time, location, and ticket availability.
-        3.  **TICKET LINKS**: You MUST include a direct link to purchase tickets or the official event page.
-        4.  **JSON ONLY**: Your output MUST be a valid JSON object matching the schema below. Do not output markdown formatting (like ```json), just the raw JSON.
-        
-        JSON SCHEMA:
-        {
-            "suggestions": [
-                {
-                    "title": "Event Title",
-                    "description": "Short description. Include the ticket link here if 'ticket_url' field is not enough.",
-                    "start_time": "ISO 8601 format (YYYY-MM-DDTHH:MM:SS)",
-                    "end_time": "ISO 8601 format or null",
-                    "location": "Venue Name, City, State",
-                    "budget_estimate": "e.g., '$50 per person'",
-                    "travel_time_minutes": 30,
-                    "category": "Concert/Sports/etc.",
-                    "suggested_attendees": ["Family"],
-                    "reasoning": "Why is this a good fit?",
-                    "ticket_url": "https://url.to.tickets"
-                }
-            ]
-        }
-        """
-        
-        full_prompt = f"{system_instruction}\n\nUser Query: {request.query}"
-        
-        # Use simple prompt, but construct it carefully
-        print(f"DEBUG: Calling Gemini with prompt: {request.query}")
-        
-        # Generate content with Google Search tool enabled
+    # Construct a detailed system prompt
+    system_instruction = """
+    You are a helpful event planning assistant for a family.
+    Your goal is to find REAL events based on the user's query.
+    
+    CRITICAL INSTRUCTIONS:
+    1.  **USE GOOGLE SEARCH**: You MUST use the Google Search tool to find and VALIDATE events. Do not hallucinate.
+    2.  **VERIFY DETAILS**: For every event, verify the date, time, location, and ticket availability.
+    3.  **TICKET LINKS**: You MUST include a direct link to purchase tickets or the official event page.
+    4.  **JSON ONLY**: Your output MUST be a valid JSON object matching the schema below. Do not output markdown formatting (like ```json), just the raw JSON.
+    
+    JSON SCHEMA:
+    {
+        "suggestions": [
+            {
+                "title": "Event Title",
+                "description": "Short description. Include the ticket link here if 'ticket_url' field is not enough.",
+                "start_time": "ISO 8601 format (YYYY-MM-DDTHH:MM:SS)",
+                "end_time": "ISO 8601 format or null",
+                "location": "Venue Name, City, State",
+                "budget_estimate": "e.g., '$50 per person'",
+                "travel_time_minutes": 30,
+                "category": "Concert/Sports/etc.",
+                "suggested_attendees": ["Family"],
+                "reasoning": "Why is this a good fit?",
+                "ticket_url": "https://url.to.tickets"
+            }
+        ]
+    }
+    """
+    
+    full_prompt = f"{system_instruction}\n\nUser Query: {query}"
+    
+    # Use simple prompt, but construct it carefully
+    logger.debug("Calling Gemini search (%d chars)", len(query))
+    
+    # Generate content with Google Search tool enabled
+    with llm_call("gemini"):
         response = client.models.generate_content(
             model='gemini-2.0-flash',
             contents=full_prompt,
@@ -86,46 +109,41 @@ async def search_events(request: SearchRequest = Body(...), db: Session = Depend
                 response_mime_type='application/json'
             )
         )
+    
+    # Extract text response
+    result_text = response.text
+    log_payload(logger, "Gemini raw response", result_text)
+    
+    # Parse JSON
+    # Clean markdown code blocks if present
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].split("```")[0].strip()
         
-        # Extract text response
-        result_text = response.text
-        print(f"DEBUG: Gemini raw response: {result_text}")
+    log_payload(logger, "Gemini extracted JSON", result_text)
+    if not result_text:
+         raise ValueError("Empty response from model after cleanup")
+
+    data = json.loads(result_text)
+    
+    # Basic validation
+    final_suggestions = []
+    # Support both 'suggestions' key or direct list if model messes up
+    items = data.get("suggestions", []) if isinstance(data, dict) else data
+    if not isinstance(items, list):
+         items = []
+
+    for item in items:
+        # Ensure description contains the link if ticket_url is present, for UI visibility
+        url = item.get("ticket_url")
+        desc = item.get("description", "")
+        if url and "http" in url and "Buy Tickets" not in desc:
+           item["description"] = f"{desc}\n\n[Buy Tickets]({url})"
         
-        # Parse JSON
-        # Clean markdown code blocks if present
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-        print(f"DEBUG: Extracted JSON text: {result_text}")
-        if not result_text:
-             raise ValueError("Empty response from model after cleanup")
-
-        data = json.loads(result_text)
+        final_suggestions.append(item)
         
-        # Basic validation
-        final_suggestions = []
-        # Support both 'suggestions' key or direct list if model messes up
-        items = data.get("suggestions", []) if isinstance(data, dict) else data
-        if not isinstance(items, list):
-             items = []
-
-        for item in items:
-            # Ensure description contains the link if ticket_url is present, for UI visibility
-            url = item.get("ticket_url")
-            desc = item.get("description", "")
-            if url and "http" in url and "Buy Tickets" not in desc:
-               item["description"] = f"{desc}\n\n[Buy Tickets]({url})"
-            
-            final_suggestions.append(item)
-            
-        return {"suggestions": final_suggestions}
-
-    except Exception as e:
-        print(f"Error in Gemini search: {e}")
-        # For now, just raise 500
-        raise HTTPException(status_code=500, detail=str(e))
+    return {"suggestions": final_suggestions}
 
 class InteractRequest(BaseModel):
     query: str
@@ -153,9 +171,99 @@ async def interact(request: InteractRequest = Body(...), db: Session = Depends(g
         }
         
     except Exception as e:
-        print(f"Error in interaction: {e}")
+        logger.exception("Error in interaction")
         raise HTTPException(status_code=500, detail=str(e))
     
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/interact/stream")
+def interact_stream(request: InteractRequest = Body(...), db: Session = Depends(get_db)):
+    """
+    Server-sent events version of /interact. Emits an `item` event for each
+    event / shopping item / todo as soon as the model finishes generating it,
+    then a `done` event with per-type counts (or an `error` event).
+    """
+    service = AILearningService(db)
+    items = service.stream_multi_intent(request.user_id, request.query)
+
+    def event_stream():
+        counts = {"events": 0, "shopping_list": 0, "todos": 0}
+        try:
+            for key, item in items:
+                counts[key] += 1
+                yield _sse("item", {"type": key, "item": item})
+        except Exception as e:
+            logger.exception("Error in streaming interaction")
+            yield _sse("error", {"detail": str(e)})
+            return
+        yield _sse("done", counts)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class ApplyEvent(BaseModel):
+    title: str
+    description: Optional[str] = None
+    location: Optional[str] = None
+    start_time: datetime
+    end_time: Optional[datetime] = None # Defaults to start + 1h
+    category: str = "General"
+    attendees: List[str] = [] # Names as parsed by the assistant
+    attendee_ids: List[int] = []
+
+class ApplyShoppingItem(BaseModel):
+    name: str
+    category: str = "General"
+
+class ApplyTodo(BaseModel):
+    title: str
+    due_date: Optional[datetime] = None
+    assigned_to: Optional[str] = None # Name as parsed by the assistant
+    assigned_to_user_id: Optional[int] = None
+
+class ApplyRequest(BaseModel):
+    user_id: int
+    events: List[ApplyEvent] = []
+    shopping_list: List[ApplyShoppingItem] = []
+    todos: List[ApplyTodo] = []
+
+class ApplyResponse(BaseModel):
+    events: List[schemas.Event]
+    shopping_list: List[schemas.ShoppingItem]
+    todos: List[schemas.ToDo]
+    conflicts: List[schemas.EventConflict] = []
+
+@router.post("/apply", response_model=ApplyResponse)
+def apply_intents(background_tasks: BackgroundTasks, request: ApplyRequest = Body(...), db: Session = Depends(get_db)):
+    """
+    Saves a whole /interact payload (events + attendees, shopping items, todos)
+    in one request and one transaction instead of one POST per card.
+    """
+    user = db.query(models.User).filter(models.User.id == request.user_id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    created = apply_parsed_intents(
+        db,
+        user,
+        events=[e.model_dump() for e in request.events],
+        shopping_list=[i.model_dump() for i in request.shopping_list],
+        todos=[t.model_dump() for t in request.todos],
+    )
+    # Serialise before committing: commit expires the returned rows and would reload each one
+    response = ApplyResponse.model_validate(created, from_attributes=True)
+    record_change(db, "events", created["events"])
+    record_change(db, "shopping_items", created["shopping_list"])
+    record_change(db, "todos", created["todos"])
+    db.commit()
+    if response.events:
+        background_tasks.add_task(commute.recompute_after_change, db.get_bind(), [e.id for e in response.events])
+    return response
+
 @router.post("/learn")
 async def learn_interaction(
     user_id: int = Body(...),
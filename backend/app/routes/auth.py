@@ -1,10 +1,13 @@
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from .. import database, models, schemas, auth
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.get("/me", response_model=schemas.User)
 def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
@@ -12,7 +15,7 @@ def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
 
 @router.post("/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username.lower()).first()
+    user = db.query(models.User).filter(func.lower(models.User.email) == form_data.username.lower()).first()
     if not user or not auth.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,7 +56,7 @@ def request_password_reset(email_data: schemas.UserEmail, db: Session = Depends(
     
     # Generate a fake token for this prototype (in prod, sign a JWT)
     reset_token = f"reset-{user.id}-token"
-    print(f"\n[DEV] Password Reset Link: http://localhost:3000/reset-password?token={reset_token}\n")
+    logger.info("[DEV] Password reset link: http://localhost:3000/reset-password?token=%s", reset_token)
     
     return {"message": "Password reset link sent (check console for dev mode)"}
 
@@ -1,22 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
 from .. import models, schemas
-from ..database import get_db
-from ..services.logistics import LogisticsService
+from ..pubsub import record_change
+from ..database import get_async_read_db, get_db, get_live, soft_delete, update_returning
+from ..services import commute, conflicts, recurrence
+from ..services.driver_planner import plan_day
+from ..services.logistics import LogisticsService, grid_cells_within, haversine_km
+import datetime
 
 router = APIRouter()
 
-@router.post("/", response_model=schemas.Event)
-def create_event(event: schemas.EventCreate, db: Session = Depends(get_db)):
-    event_data = event.dict()
+# Keeps the cell list (and the IN clause) to ~100 cells
+MAX_NEARBY_RADIUS_KM = 100.0
+# Local search time budget cap for /plan-drivers
+MAX_PLAN_BUDGET_MS = 2000
+# Longest window a windowed read (and so a series expansion) may cover
+MAX_WINDOW_DAYS = 366
+
+def _prepare_series(event_data: dict):
+    try:
+        recurrence.prepare_series(event_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _series_clauses(start: datetime.datetime, end: datetime.datetime):
+    """Live series that may have an occurrence overlapping [start, end)."""
+    return (
+        models.Event.deleted_at.is_(None),
+        models.Event.rrule.is_not(None),
+        models.Event.start_time < end,
+        or_(models.Event.recurrence_end.is_(None), models.Event.recurrence_end > start),
+    )
+
+def _occurrences(event: models.Event, start: datetime.datetime, end: datetime.datetime, schema=schemas.Event):
+    """A series' occurrences overlapping [start, end), each a copy of the series with its own times."""
+    base = schema.model_validate(event, from_attributes=True)
+    return [
+        base.model_copy(update={"start_time": occurrence, "end_time": stop, "recurrence_id": occurrence})
+        for occurrence, stop in recurrence.occurrences(event.rrule, event.start_time, event.end_time, start, end, event.exdates)
+    ]
+
+@router.post("/", response_model=schemas.EventWithConflicts)
+def create_event(event: schemas.EventCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    event_data = event.model_dump()
     attendee_ids = event_data.pop("attendee_ids", [])
+    event_data.pop("version", None)
+    # Derived from the travellers' previous events, after the response (services/commute.py)
+    event_data.pop("commute_time_minutes", None)
+    _prepare_series(event_data)
     
-    # [NEW] Calculate Commute Logic
-    if event_data.get("location"):
-        # For simplicity, we assume "Home" as start or previous event. 
-        # In a real app, we'd find the user's previous location.
-        event_data["commute_time_minutes"] = LogisticsService.get_drive_time("Home", event_data["location"])
+    LogisticsService.locate_event(event_data, db)
     
     db_event = models.Event(**event_data)
     
@@ -25,57 +61,271 @@ def create_event(event: schemas.EventCreate, db: Session = Depends(get_db)):
         db_event.attendees = attendees
         
     db.add(db_event)
+    db.flush()
+    # Double-bookings are reported, not refused
+    people = {user.id for user in db_event.attendees} | ({db_event.driver_id} if db_event.driver_id else set())
+    warnings = conflicts.find_conflicts(
+        db, db_event.id, people, db_event.start_time, db_event.end_time, db_event.rrule, db_event.exdates
+    )
+    record_change(db, "events", [db_event])
     db.commit()
     db.refresh(db_event)
+    db_event.conflicts = warnings
+    background_tasks.add_task(commute.recompute_after_change, db.get_bind(), [db_event.id])
     return db_event
 
 @router.get("/", response_model=List[schemas.Event])
-def read_events(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    events = db.query(models.Event).offset(skip).limit(limit).all()
-    return events
+async def read_events(
+    skip: int = 0,
+    limit: int = 100,
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Stored rows, or with start & end the events overlapping that window in
+    time order, recurring series expanded into their occurrences there.
+    """
+    # Relationships the response serialises must be loaded up front: no lazy loads on the async path
+    loaders = (selectinload(models.Event.attendees), selectinload(models.Event.driver))
+    if start is None and end is None:
+        events = await db.scalars(
+            select(models.Event).where(models.Event.deleted_at.is_(None)).options(*loaders).offset(skip).limit(limit)
+        )
+        return events.all()
+    if start is None or end is None or end <= start:
+        raise HTTPException(status_code=400, detail="Give both start and end, with end after start")
+    if end - start > datetime.timedelta(days=MAX_WINDOW_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window can be at most {MAX_WINDOW_DAYS} days")
+
+    singles = select(models.Event).where(
+        models.Event.rrule.is_(None), models.Event.end_time > start, models.Event.start_time < end, models.Event.deleted_at.is_(None)
+    )
+    series = select(models.Event).where(*_series_clauses(start, end))
+    listed = list((await db.scalars(singles.options(*loaders))).all())
+    for event in (await db.scalars(series.options(*loaders))).all():
+        listed.extend(_occurrences(event, start, end))
+    listed.sort(key=lambda event: (event.start_time, event.id))
+    return listed[skip:skip + limit]
+
+@router.get("/nearby", response_model=List[schemas.NearbyEvent])
+async def read_nearby_events(
+    lat: float,
+    lon: float,
+    radius: float = 10.0,
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Events within `radius` km of (lat, lon), nearest first, optionally only
+    those overlapping [start, end). The geo_cell index narrows the scan to the
+    grid cells around the point; exact distances are checked on that handful.
+    With both start and end, recurring series are listed as their occurrences
+    in the window (recurrence_id set), as in GET /events.
+    """
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(status_code=400, detail="lat/lon out of range")
+    if not (0 < radius <= MAX_NEARBY_RADIUS_KM):
+        raise HTTPException(status_code=400, detail=f"radius must be between 0 and {MAX_NEARBY_RADIUS_KM} km")
+
+    if start is not None and end is not None and end - start > datetime.timedelta(days=MAX_WINDOW_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window can be at most {MAX_WINDOW_DAYS} days")
+
+    query = (
+        select(models.Event)
+        .where(models.Event.geo_cell.in_(grid_cells_within((lat, lon), radius)), models.Event.deleted_at.is_(None))
+        .options(selectinload(models.Event.attendees), selectinload(models.Event.driver))
+    )
+    windowed = start is not None and end is not None
+    if windowed:
+        query = query.where(or_(
+            and_(models.Event.rrule.is_(None), models.Event.end_time > start, models.Event.start_time < end),
+            and_(*_series_clauses(start, end)),
+        ))
+    else:
+        # Half-open windows can't be expanded: series are matched on their first occurrence
+        if start is not None:
+            query = query.where(models.Event.end_time > start)
+        if end is not None:
+            query = query.where(models.Event.start_time < end)
+
+    nearby = []
+    for event in (await db.scalars(query)).all():
+        # Transient attribute, read by the response model
+        event.distance_km = round(haversine_km((lat, lon), (event.latitude, event.longitude)), 3)
+        if event.distance_km > radius:
+            continue
+        if windowed and event.rrule:
+            nearby.extend(_occurrences(event, start, end, schemas.NearbyEvent))
+        else:
+            nearby.append(event)
+    nearby.sort(key=lambda event: (event.distance_km, event.start_time))
+    return nearby[:limit]
+
+@router.post("/plan-drivers", response_model=schemas.DriverPlan)
+def plan_drivers(
+    date: datetime.date,
+    background_tasks: BackgroundTasks,
+    request: Optional[schemas.DriverPlanRequest] = None,
+    family_id: int = 1,
+    apply: bool = False,
+    budget_ms: int = 200,
+    db: Session = Depends(get_db),
+):
+    """
+    Suggests who drives to each of the family's events on `date`: fewest
+    events left without a driver, then least total driving. Occurrences of
+    recurring series that day are planned too (recurrence_id set). With
+    apply=true the assignment is saved (and commutes re-chained) for single
+    events only: a series has one driver for every occurrence, so one day's
+    plan is never written onto it.
+    """
+    driver_ids = request.driver_ids if request and request.driver_ids is not None else None
+    if driver_ids is None:
+        driver_ids = db.scalars(
+            select(models.User.id).where(models.User.family_id == family_id, models.User.status == "active").order_by(models.User.id)
+        ).all()
+    if not driver_ids:
+        raise HTTPException(status_code=400, detail="No drivers available")
+
+    day_start = datetime.datetime.combine(date, datetime.time.min)
+    day_end = day_start + datetime.timedelta(days=1)
+    events = db.scalars(
+        select(models.Event)
+        .where(
+            models.Event.family_id == family_id,
+            models.Event.rrule.is_(None),
+            models.Event.start_time >= day_start,
+            models.Event.start_time < day_end,
+            models.Event.deleted_at.is_(None),
+        )
+        .order_by(models.Event.start_time)
+    ).all()
+    occurrences = {}
+    for series in db.scalars(select(models.Event).where(models.Event.family_id == family_id, *_series_clauses(day_start, day_end))):
+        # The day's first occurrence: the plan has one stop per event
+        starting = [occurrence for occurrence in _occurrences(series, day_start, day_end) if occurrence.start_time >= day_start]
+        if starting:
+            occurrences[series.id] = starting[0]
+    stops = sorted([*events, *occurrences.values()], key=lambda event: event.start_time)
+    plan = plan_day(stops, driver_ids, date, budget_seconds=min(max(budget_ms, 0), MAX_PLAN_BUDGET_MS) / 1000)
+
+    def recurrence_id(event_id):
+        return occurrences[event_id].recurrence_id if event_id in occurrences else None
+
+    assignments = [
+        schemas.DriverAssignment(
+            event_id=stop.event_id, recurrence_id=recurrence_id(stop.event_id),
+            driver_id=driver, drive_minutes=round(plan.legs[stop.event_id]),
+        )
+        for driver, route in plan.routes.items()
+        for stop in route
+    ]
+    assignments += [schemas.DriverAssignment(event_id=stop.event_id, recurrence_id=recurrence_id(stop.event_id)) for stop in plan.unassigned]
+    assignments.sort(key=lambda a: a.event_id)
+
+    if apply:
+        by_driver = {}
+        for assignment in assignments:
+            # Events the planner couldn't place keep whatever driver they already have
+            if assignment.recurrence_id is None and assignment.driver_id is not None:
+                by_driver.setdefault(assignment.driver_id, []).append(assignment.event_id)
+        for driver_id, event_ids in by_driver.items():
+            db.execute(
+                update(models.Event)
+                .where(models.Event.id.in_(event_ids))
+                .values(driver_id=driver_id, version=models.Event.version + 1)
+            )
+        planned = {event_id for event_ids in by_driver.values() for event_id in event_ids}
+        record_change(db, "events", [event for event in events if event.id in planned])
+        db.commit()
+        if planned:
+            background_tasks.add_task(commute.recompute_after_change, db.get_bind(), sorted(planned))
+
+    return schemas.DriverPlan(
+        day=date,
+        assignments=assignments,
+        unassigned_event_ids=sorted(stop.event_id for stop in plan.unassigned),
+        total_drive_minutes=round(plan.total_minutes),
+        greedy_drive_minutes=round(plan.greedy_minutes),
+        minutes_by_driver={driver: round(minutes) for driver, minutes in plan.minutes_by_driver.items()},
+        timed_out=plan.timed_out,
+        applied=apply,
+    )
 
 @router.get("/{event_id}", response_model=schemas.Event)
 def read_event(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
+    event = get_live(db, models.Event, event_id)
     if event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
 
-@router.put("/{event_id}", response_model=schemas.Event)
-def update_event(event_id: int, event_update: schemas.EventCreate, db: Session = Depends(get_db)):
-    db_event = db.query(models.Event).filter(models.Event.id == event_id).first()
-    if db_event is None:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    event_data = event_update.dict()
+@router.put("/{event_id}", response_model=schemas.EventWithConflicts)
+def update_event(event_id: int, event_update: schemas.EventCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    event_data = event_update.model_dump()
     attendee_ids = event_data.pop("attendee_ids", [])
+    expected_version = event_data.pop("version", None)
+    event_data.pop("commute_time_minutes", None)
+    _prepare_series(event_data)
     
-    # [NEW] Recalculate Commute if location changed
-    if event_data.get("location") and event_data["location"] != db_event.location:
-        event_data["commute_time_minutes"] = LogisticsService.get_drive_time("Home", event_data["location"])
+    LogisticsService.locate_event(event_data, db)
+    # Where the event was, so the event that used to follow it gets re-chained too
+    before = commute.snapshot(db, event_id)
     
-    # Update basic fields
-    for key, value in event_data.items():
-        setattr(db_event, key, value)
+    # Update basic fields in one UPDATE ... RETURNING
+    db_event = update_returning(db, models.Event, event_id, event_data, expected_version)
+    if db_event is None:
+        if get_live(db, models.Event, event_id) is None:
+            raise HTTPException(status_code=404, detail="Event not found")
+        raise HTTPException(status_code=409, detail="Event was changed by someone else, reload and retry")
     
     # Update attendees
-    # Clear existing
+    # Replace only if a new list is provided, otherwise keep existing
     if attendee_ids:
-        db_event.attendees = [] # Clear only if we are sending new list, otherwise might want to keep?
-                               # Actually better to replace if list provided.
-        attendees = db.query(models.User).filter(models.User.id.in_(attendee_ids)).all()
-        db_event.attendees = attendees
+        db.execute(delete(models.event_attendees).where(models.event_attendees.c.event_id == event_id))
+        valid_ids = db.scalars(select(models.User.id).where(models.User.id.in_(attendee_ids))).all()
+        if valid_ids:
+            db.execute(insert(models.event_attendees), [{"event_id": event_id, "user_id": uid} for uid in valid_ids])
         
+    people = conflicts.participant_ids(db, event_id, db_event.driver_id)
+    warnings = conflicts.find_conflicts(
+        db, event_id, people, db_event.start_time, db_event.end_time, db_event.rrule, db_event.exdates
+    )
+    record_change(db, "events", [db_event])
     db.commit()
-    db.refresh(db_event)
+    db_event.conflicts = warnings
+    background_tasks.add_task(commute.recompute_after_change, db.get_bind(), [event_id], [before] if before else [])
     return db_event
 
-@router.delete("/{event_id}")
-def delete_event(event_id: int, db: Session = Depends(get_db)):
-    db_event = db.query(models.Event).filter(models.Event.id == event_id).first()
+@router.delete("/{event_id}/occurrences/{occurrence_start}", response_model=schemas.Event)
+def cancel_occurrence(event_id: int, occurrence_start: datetime.datetime, db: Session = Depends(get_db)):
+    """Cancels one occurrence of a recurring series (adds it to the series' exdates)."""
+    db_event = get_live(db, models.Event, event_id)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    
-    db.delete(db_event)
+    if not db_event.rrule:
+        raise HTTPException(status_code=400, detail="Event is not recurring")
+    window_end = occurrence_start + datetime.timedelta(seconds=1)
+    if occurrence_start not in recurrence.expand(db_event.rrule, db_event.start_time, db_event.end_time, occurrence_start, window_end):
+        raise HTTPException(status_code=404, detail="No occurrence starts at that time")
+
+    exdates = recurrence.normalize_exdates([*(db_event.exdates or []), occurrence_start])
+    db_event = update_returning(db, models.Event, event_id, {"exdates": exdates})
+    record_change(db, "events", [db_event])
+    db.commit()
+    return db_event
+
+@router.delete("/{event_id}")
+def delete_event(event_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    before = commute.snapshot(db, event_id)
+    # Soft delete: the row stays as a tombstone so /api/sync can report it
+    deleted = soft_delete(db, models.Event, models.Event.id == event_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Event not found")
+    record_change(db, "events", deleted, deleted=True)
     db.commit()
+    if before:
+        background_tasks.add_task(commute.recompute_after_change, db.get_bind(), before=[before])
     return {"message": "Event deleted successfully"}
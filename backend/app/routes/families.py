@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
+from typing import List, Optional
 from .. import database, models, schemas
 from ..auth import get_current_user
+from ..services import availability
 import uuid
 from datetime import datetime, timedelta
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Longest window /free-slots searches in one call
+MAX_FREE_SLOT_DAYS = 31
 
 @router.post("/", response_model=schemas.Family)
 def create_family(
@@ -37,7 +45,7 @@ def request_to_join_family(
     if current_user.family_id:
         raise HTTPException(status_code=400, detail="User already belongs to a family")
         
-    admin_user = db.query(models.User).filter(models.User.email == request.admin_email.lower()).first()
+    admin_user = db.query(models.User).filter(func.lower(models.User.email) == request.admin_email.lower()).first()
     if not admin_user or not admin_user.family_id:
         # Don't reveal exact details, but valid admin is needed
         raise HTTPException(status_code=404, detail="Family Admin not found")
@@ -47,7 +55,7 @@ def request_to_join_family(
     current_user.status = "requested_join"
     db.commit()
     
-    print(f"\n[DEV] JOIN REQUEST: User {current_user.email} wants to join Family {admin_user.family_id} (Admin: {admin_user.email})\n")
+    logger.info("[DEV] Join request: user %s wants to join family %s (admin: %s)", current_user.email, admin_user.family_id, admin_user.email)
     
     return {"message": "Request sent to family admin"}
 
@@ -64,7 +72,7 @@ def invite_member(
         raise HTTPException(status_code=403, detail="Only admins can invite members")
         
     # Check if user exists
-    existing_user = db.query(models.User).filter(models.User.email == invite.email.lower()).first()
+    existing_user = db.query(models.User).filter(func.lower(models.User.email) == invite.email.lower()).first()
     
     # Generate token
     invite_token = str(uuid.uuid4())
@@ -87,7 +95,7 @@ def invite_member(
         existing_user.family_id = current_user.family_id 
         db.commit()
         
-        print(f"\n[DEV] INVITE LINK (Existing User): http://localhost:3000/invite?token={invite_token}\n")
+        logger.info("[DEV] Invite link (existing user): http://localhost:3000/invite?token=%s", invite_token)
         return {"message": "Invite sent to existing user"}
         
     else:
@@ -110,6 +118,41 @@ def invite_member(
         db.add(new_user)
         db.commit()
         
-        print(f"\n[DEV] INVITE LINK (New User): http://localhost:3000/invite?token={invite_token}\n")
+        logger.info("[DEV] Invite link (new user): http://localhost:3000/invite?token=%s", invite_token)
         
         return {"message": "Invite created for new user"}
+
+@router.get("/{family_id}/free-slots", response_model=List[schemas.FreeSlot])
+def read_free_slots(
+    family_id: int,
+    start: datetime,
+    end: datetime,
+    members: Optional[List[int]] = Query(None),
+    min_minutes: int = 30,
+    from_hour: int = availability.DAY_START_HOUR,
+    to_hour: int = availability.DAY_END_HOUR,
+    db: Session = Depends(database.get_db),
+):
+    """
+    Windows between `start` and `end` when every one of `members` (default:
+    all active family members) is free, during from_hour-to_hour each day.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > timedelta(days=MAX_FREE_SLOT_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window can be at most {MAX_FREE_SLOT_DAYS} days")
+    if not (0 <= from_hour < to_hour <= 24):
+        raise HTTPException(status_code=400, detail="Hours must satisfy 0 <= from_hour < to_hour <= 24")
+
+    family_members = set(db.scalars(
+        select(models.User.id).where(models.User.family_id == family_id, models.User.status == "active")
+    ))
+    if not family_members:
+        raise HTTPException(status_code=404, detail="Family not found")
+    if members:
+        outsiders = set(members) - family_members
+        if outsiders:
+            raise HTTPException(status_code=400, detail=f"Not active members of this family: {sorted(outsiders)}")
+        family_members = set(members)
+
+    return availability.find_free_slots(db, family_id, family_members, start, end, max(min_minutes, 1), from_hour, to_hour)
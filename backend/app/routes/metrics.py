@@ -0,0 +1,72 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..database import async_pool_stats, pool_stats, read_pool_stats, read_router
+from ..services import geocoding, llm, logistics, recurrence, singleflight
+from .. import log, pubsub, telemetry
+
+router = APIRouter()
+prometheus_router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/")
+def read_metrics():
+    """Operational counters for the backend (JSON)."""
+    return {
+        "singleflight": singleflight.stats(),
+        "llm_providers": llm.stats(),
+        "db_pool": pool_stats(),
+        "db_pool_async": async_pool_stats(),
+        "db_pool_replica": read_pool_stats(),
+        "db_read_routing": read_router.stats(),
+        "routing": logistics.engine.stats(),
+        "geocoding": geocoding.geocoder.stats(),
+        "recurrence": recurrence.cache.stats(),
+        "stream": pubsub.hub.stats(),
+    }
+
+
+def _collect_stats():
+    """Exposes the counters behind /api/metrics as Prometheus families."""
+    pools = {"primary": pool_stats(), "async": async_pool_stats(), "replica": read_pool_stats()}
+    pools = {name: stats for name, stats in pools.items() if stats}
+    yield ("db_pool_in_use", "gauge", "Connections currently checked out.",
+           [({"pool": name}, s["in_use"]) for name, s in pools.items()])
+    yield ("db_pool_overflow", "gauge", "Connections open beyond pool_size.",
+           [({"pool": name}, s["overflow"]) for name, s in pools.items()])
+    yield ("db_pool_checkouts_total", "counter", "Connection checkouts.",
+           [({"pool": name}, s["checkouts"]) for name, s in pools.items()])
+    yield ("db_pool_checkout_timeouts_total", "counter", "Checkouts that gave up waiting for a connection.",
+           [({"pool": name}, s["timeouts"]) for name, s in pools.items()])
+
+    providers = llm.stats()
+    yield ("llm_provider_errors_total", "counter", "Failed LLM provider calls.",
+           [({"provider": name}, s["errors"]) for name, s in providers.items()])
+    yield ("llm_provider_hedges_total", "counter", "Hedged requests sent to the provider.",
+           [({"provider": name}, s["hedges"]) for name, s in providers.items()])
+    yield ("llm_provider_breaker_open", "gauge", "1 while the provider's circuit breaker is not closed.",
+           [({"provider": name}, int(s["breaker"] != "closed")) for name, s in providers.items()])
+
+    yield ("log_records_dropped_total", "counter", "Log records dropped because the log queue was full.",
+           [({}, log.dropped_records())])
+
+    flights = singleflight.stats()
+    yield ("singleflight_calls_total", "counter", "Calls that ran (leaders).",
+           [({"flight": name}, s["calls"]) for name, s in flights.items()])
+    yield ("singleflight_coalesced_total", "counter", "Calls that shared a leader's result.",
+           [({"flight": name}, s["coalesced"]) for name, s in flights.items()])
+
+    stream = pubsub.hub.stats()
+    yield ("stream_connections", "gauge", "Open /api/stream connections on this worker.",
+           [({"broker": stream["broker"]}, stream["connections"])])
+    yield ("stream_overflows_total", "counter", "Times a slow stream connection's queue was replaced by a resync.",
+           [({"broker": stream["broker"]}, stream["overflows"])])
+
+
+telemetry.REGISTRY.register_collector(_collect_stats)
+
+
+@prometheus_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """Request latency, DB/LLM time and pool/breaker state in Prometheus text format."""
+    return PlainTextResponse(telemetry.REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from .. import schemas
+from ..database import get_db
+from ..services.geocoding import geocoder
+
+router = APIRouter()
+
+# A batch is one table read plus provider calls for new names only, but
+# Nominatim allows one call a second: keep batches to what a day's events need
+MAX_BATCH = 100
+
+def _place(place, query=None):
+    return schemas.Place(query=query, display_name=place.display_name, latitude=place.latitude, longitude=place.longitude)
+
+@router.get("/autocomplete", response_model=List[schemas.Place])
+def autocomplete(q: str = "", limit: int = 5, db: Session = Depends(get_db)):
+    """Suggestions from places already geocoded; never calls the geocoding provider."""
+    return [_place(place) for place in geocoder.autocomplete(q, db, limit=min(max(limit, 1), 20))]
+
+@router.get("/resolve", response_model=schemas.Place)
+def resolve_place(q: str, db: Session = Depends(get_db)):
+    place = geocoder.resolve(q, db)
+    db.commit()
+    if place is None:
+        raise HTTPException(status_code=404, detail="Place not found")
+    return _place(place, q)
+
+@router.post("/resolve", response_model=List[Optional[schemas.Place]])
+def resolve_places(body: schemas.PlaceQueries, db: Session = Depends(get_db)):
+    """Geocodes many names at once; results line up with `queries` (null where nothing was found)."""
+    if len(body.queries) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH} queries per request")
+    places = geocoder.resolve_many(body.queries, db)
+    db.commit()
+    return [_place(places[q], q) if places.get(q) is not None else None for q in body.queries]
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from typing import Optional
+from datetime import datetime
+import os
+from .. import profiler
+
+router = APIRouter()
+
+def require_profiler_token(x_profile_token: Optional[str] = Header(None)):
+    """Profiles expose SQL and code paths: same admin token that turns profiling on."""
+    if profiler.profiler_token() is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not profiler.token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiler token")
+
+@router.get("/", dependencies=[Depends(require_profiler_token)])
+def list_profiles():
+    """Stored profiles, newest first."""
+    profiles = []
+    for profile_id in profiler.store.list():
+        path = profiler.store.path(profile_id)
+        if path is None:
+            continue
+        created = datetime.utcfromtimestamp(int(profile_id.split("-")[0]) / 1000)
+        profiles.append({"id": profile_id, "created_at": created, "bytes": os.path.getsize(path)})
+    return profiles
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profiler_token)])
+def download_profile(profile_id: str):
+    """Speedscope JSON; open it at https://www.speedscope.app."""
+    path = profiler.store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=f"{profile_id}.speedscope.json")
@@ -1,19 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
+from sqlalchemy import not_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List
-from ..database import get_db
+from ..database import get_async_read_db, get_db, get_live, insert_returning, soft_delete, update_returning
 from .. import models, schemas
+from ..pubsub import record_change
 import datetime
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.ShoppingItem])
-def get_shopping_items(
+async def get_shopping_items(
     family_id: int = 1, # Default to 1 for now until full auth context passing
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    items = db.query(models.ShoppingItem).filter(models.ShoppingItem.family_id == family_id).all()
-    return items
+    items = await db.scalars(
+        select(models.ShoppingItem)
+        .where(models.ShoppingItem.family_id == family_id, models.ShoppingItem.deleted_at.is_(None))
+        .options(selectinload(models.ShoppingItem.added_by))
+    )
+    return items.all()
 
 @router.post("/", response_model=schemas.ShoppingItem)
 def create_shopping_item(
@@ -23,49 +30,105 @@ def create_shopping_item(
     db: Session = Depends(get_db)
 ):
     db_item = models.ShoppingItem(
-        **item.dict(),
+        **item.model_dump(),
         family_id=family_id,
         added_by_user_id=user_id,
         created_at=datetime.datetime.utcnow()
     )
     db.add(db_item)
+    db.flush()
+    record_change(db, "shopping_items", [db_item])
     db.commit()
     db.refresh(db_item)
     return db_item
 
+@router.post("/bulk", response_model=List[schemas.ShoppingItem])
+def create_shopping_items(
+    items: List[schemas.ShoppingItemCreate],
+    family_id: int = 1,
+    user_id: int = 1,
+    db: Session = Depends(get_db)
+):
+    now = datetime.datetime.utcnow()
+    db_items = insert_returning(db, models.ShoppingItem, [
+        {**item.model_dump(), "family_id": family_id, "added_by_user_id": user_id, "created_at": now}
+        for item in items
+    ])
+    record_change(db, "shopping_items", db_items)
+    db.commit()
+    return db_items
+
+@router.post("/bulk/toggle")
+def toggle_bought_bulk(
+    toggle: schemas.BulkToggleBought,
+    family_id: int = 1,
+    db: Session = Depends(get_db)
+):
+    # Single set-based UPDATE; flips each row unless an explicit value is given
+    new_value = not_(models.ShoppingItem.is_bought) if toggle.is_bought is None else toggle.is_bought
+    rows = db.execute(
+        update(models.ShoppingItem)
+        .where(
+            models.ShoppingItem.id.in_(toggle.ids),
+            models.ShoppingItem.family_id == family_id,
+            models.ShoppingItem.deleted_at.is_(None),
+        )
+        .values(is_bought=new_value, version=models.ShoppingItem.version + 1)
+        .returning(models.ShoppingItem.id, models.ShoppingItem.family_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    record_change(db, "shopping_items", rows)
+    db.commit()
+    return {"status": "success", "updated": len(rows)}
+
+@router.delete("/bought")
+def clear_bought(family_id: int = 1, db: Session = Depends(get_db)):
+    deleted = soft_delete(db, models.ShoppingItem, models.ShoppingItem.family_id == family_id, models.ShoppingItem.is_bought == True)
+    record_change(db, "shopping_items", deleted, deleted=True)
+    db.commit()
+    return {"status": "success", "deleted": len(deleted)}
+
 @router.put("/{item_id}", response_model=schemas.ShoppingItem)
 def update_shopping_item(
     item_id: int,
-    item_update: schemas.ShoppingItemCreate,
+    item_update: schemas.ShoppingItemUpdate,
     db: Session = Depends(get_db)
 ):
-    db_item = db.query(models.ShoppingItem).filter(models.ShoppingItem.id == item_id).first()
+    values = item_update.model_dump(exclude_unset=True)
+    expected_version = values.pop("version", None)
+
+    # One UPDATE ... RETURNING instead of select + mutate + refresh
+    db_item = update_returning(db, models.ShoppingItem, item_id, values, expected_version)
     if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    for key, value in item_update.dict(exclude_unset=True).items():
-        setattr(db_item, key, value)
+        if get_live(db, models.ShoppingItem, item_id) is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        raise HTTPException(status_code=409, detail="Item was changed by someone else, reload and retry")
     
+    record_change(db, "shopping_items", [db_item])
     db.commit()
-    db.refresh(db_item)
     return db_item
 
 @router.delete("/{item_id}")
 def delete_shopping_item(item_id: int, db: Session = Depends(get_db)):
-    db_item = db.query(models.ShoppingItem).filter(models.ShoppingItem.id == item_id).first()
-    if not db_item:
+    deleted = soft_delete(db, models.ShoppingItem, models.ShoppingItem.id == item_id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Item not found")
-    
-    db.delete(db_item)
+    record_change(db, "shopping_items", deleted, deleted=True)
     db.commit()
     return {"status": "success"}
 
 @router.post("/{item_id}/toggle")
 def toggle_bought(item_id: int, db: Session = Depends(get_db)):
-    db_item = db.query(models.ShoppingItem).filter(models.ShoppingItem.id == item_id).first()
-    if not db_item:
+    # Flip in the database so two people toggling at once can't lose an update
+    row = db.execute(
+        update(models.ShoppingItem)
+        .where(models.ShoppingItem.id == item_id, models.ShoppingItem.deleted_at.is_(None))
+        .values(is_bought=not_(models.ShoppingItem.is_bought), version=models.ShoppingItem.version + 1)
+        .returning(models.ShoppingItem.id, models.ShoppingItem.family_id, models.ShoppingItem.is_bought, models.ShoppingItem.version)
+    ).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    db_item.is_bought = not db_item.is_bought
+    record_change(db, "shopping_items", [row])
     db.commit()
-    return {"status": "success", "is_bought": db_item.is_bought}
+    return {"status": "success", "is_bought": row.is_bought, "version": row.version}
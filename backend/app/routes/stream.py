@@ -0,0 +1,84 @@
+"""
+Live updates for a family, instead of polling:
+
+- GET /api/stream?family_id=1      Server-Sent Events
+- WS  /api/stream/ws?family_id=1   WebSocket (same messages, as text frames)
+
+The first message is {"type": "ready"}: the connection is subscribed, so the
+client runs one /api/sync now and then again on every {"type": "change"} or
+{"type": "resync"} (see app/pubsub.py). Idle connections get a keep-alive
+every STREAM_HEARTBEAT_SECONDS so proxies don't close them.
+"""
+import asyncio
+import json
+import os
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from ..pubsub import hub
+
+router = APIRouter()
+
+HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+READY = json.dumps({"type": "ready"}, separators=(",", ":"))
+PING = json.dumps({"type": "ping"}, separators=(",", ":"))
+
+
+async def _events(family_id: int):
+    subscription = hub.subscribe(family_id)
+    try:
+        yield f"data: {READY}\n\n"
+        while True:
+            try:
+                payload = await asyncio.wait_for(subscription.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield f"data: {payload}\n\n"
+    finally:
+        # Starlette cancels the stream when the client disconnects
+        subscription.close()
+
+
+@router.get("/")
+async def stream_events(family_id: int = 1):
+    return StreamingResponse(
+        _events(family_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def stream_websocket(websocket: WebSocket, family_id: int = 1):
+    await websocket.accept()
+    subscription = hub.subscribe(family_id)
+    # Clients don't send anything; this only notices them leaving
+    closed = asyncio.ensure_future(_until_closed(websocket))
+    try:
+        await websocket.send_text(READY)
+        while True:
+            message = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({message, closed}, timeout=HEARTBEAT_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+            if closed in done:
+                message.cancel()
+                break
+            if message in done:
+                await websocket.send_text(message.result())
+            else:
+                message.cancel()
+                await websocket.send_text(PING)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
+        subscription.close()
+
+
+async def _until_closed(websocket: WebSocket) -> None:
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
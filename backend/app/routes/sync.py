@@ -0,0 +1,108 @@
+"""
+Delta sync: GET /api/sync?since=<token> returns the family's events, todos
+and shopping items written since the token, plus the ids of rows deleted
+since then (tombstones), and a new token to send next time. Without a token
+it returns every live row.
+
+Each collection is read in (updated_at, id) order through its
+(family_id, updated_at) index, so a poll with nothing new reads nothing.
+
+A write stamps updated_at before it commits, so a row can become visible
+after a later-stamped one was already synced. The token therefore never
+moves past "now - SYNC_LAG_SECONDS" (which must cover the longest write
+transaction and replica lag): rows from the last few seconds are sent again
+on the next poll, and clients apply rows by id and version, so repeats are
+harmless.
+"""
+import base64
+import binascii
+import datetime
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from .. import models, schemas
+from ..database import get_async_read_db
+
+router = APIRouter()
+
+SYNC_LAG = datetime.timedelta(seconds=float(os.getenv("SYNC_LAG_SECONDS", "5")))
+# Rows per collection per response; has_more asks the client to call again
+MAX_SYNC_PAGE = 1000
+
+COLLECTIONS = {
+    "events": (models.Event, (selectinload(models.Event.attendees), selectinload(models.Event.driver))),
+    "todos": (models.ToDo, (selectinload(models.ToDo.assigned_to), selectinload(models.ToDo.created_by))),
+    "shopping_items": (models.ShoppingItem, (selectinload(models.ShoppingItem.added_by),)),
+}
+
+Cursor = Tuple[datetime.datetime, int]
+
+
+def encode_token(family_id: int, cursors: Dict[str, Cursor]) -> str:
+    payload = {"f": family_id, "c": {name: [at.isoformat(), row_id] for name, (at, row_id) in cursors.items()}}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_token(token: str, family_id: int) -> Dict[str, Cursor]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        cursors = {name: (datetime.datetime.fromisoformat(at), int(row_id)) for name, (at, row_id) in payload["c"].items()}
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    if payload.get("f") != family_id or set(cursors) != set(COLLECTIONS):
+        raise HTTPException(status_code=400, detail="Sync token is for a different family")
+    return cursors
+
+
+@router.get("/", response_model=schemas.SyncResponse)
+async def sync(
+    family_id: int = 1,
+    since: Optional[str] = None,
+    limit: int = MAX_SYNC_PAGE,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    cursors = decode_token(since, family_id) if since else {}
+    limit = min(max(limit, 1), MAX_SYNC_PAGE)
+    horizon: Cursor = (datetime.datetime.utcnow() - SYNC_LAG, 0)
+
+    changed, deleted, next_cursors = {}, {}, {}
+    has_more = False
+    for name, (model, loaders) in COLLECTIONS.items():
+        query = (
+            select(model)
+            .where(model.family_id == family_id)
+            .options(*loaders)
+            .order_by(model.updated_at, model.id)
+            .limit(limit)
+        )
+        cursor = cursors.get(name)
+        if cursor is None:
+            # First sync: the client has nothing, so it needs no tombstones
+            query = query.where(model.deleted_at.is_(None))
+            cursor = (datetime.datetime.min, 0)
+        else:
+            at, row_id = cursor
+            query = query.where(or_(model.updated_at > at, and_(model.updated_at == at, model.id > row_id)))
+        rows = (await db.scalars(query)).all()
+
+        changed[name] = [row for row in rows if row.deleted_at is None]
+        deleted[name] = [row.id for row in rows if row.deleted_at is not None]
+        if len(rows) == limit:
+            # Page full: continue right after it
+            has_more = True
+            next_cursors[name] = (rows[-1].updated_at, rows[-1].id)
+        else:
+            next_cursors[name] = max(cursor, horizon)
+
+    return {
+        "token": encode_token(family_id, next_cursors),
+        "has_more": has_more,
+        **changed,
+        "deleted": deleted,
+    }
@@ -1,22 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List
-from ..database import get_db
+from ..database import get_async_read_db, get_db, get_live, insert_returning, soft_delete, update_returning
 from .. import models, schemas
+from ..pubsub import record_change
 import datetime
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.ToDo])
-def get_todos(
+async def get_todos(
     family_id: int = 1,
     user_id: int = None, # Optional filter
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    query = db.query(models.ToDo).filter(models.ToDo.family_id == family_id)
+    query = (
+        select(models.ToDo)
+        .where(models.ToDo.family_id == family_id, models.ToDo.deleted_at.is_(None))
+        .options(selectinload(models.ToDo.assigned_to), selectinload(models.ToDo.created_by))
+    )
     if user_id:
-        query = query.filter(models.ToDo.assigned_to_user_id == user_id)
-    return query.all()
+        query = query.where(models.ToDo.assigned_to_user_id == user_id)
+    return (await db.scalars(query)).all()
 
 @router.post("/", response_model=schemas.ToDo)
 def create_todo(
@@ -26,38 +33,76 @@ def create_todo(
     db: Session = Depends(get_db)
 ):
     db_todo = models.ToDo(
-        **todo.dict(),
+        **todo.model_dump(),
         family_id=family_id,
         created_by_user_id=user_id
     )
     db.add(db_todo)
+    db.flush()
+    record_change(db, "todos", [db_todo])
     db.commit()
     db.refresh(db_todo)
     return db_todo
 
+@router.post("/bulk", response_model=List[schemas.ToDo])
+def create_todos(
+    todos: List[schemas.ToDoCreate],
+    family_id: int = 1,
+    user_id: int = 1,
+    db: Session = Depends(get_db)
+):
+    db_todos = insert_returning(db, models.ToDo, [
+        {**todo.model_dump(), "family_id": family_id, "created_by_user_id": user_id}
+        for todo in todos
+    ])
+    record_change(db, "todos", db_todos)
+    db.commit()
+    return db_todos
+
+@router.post("/bulk/complete")
+def complete_todos(bulk: schemas.BulkIds, family_id: int = 1, db: Session = Depends(get_db)):
+    rows = db.execute(
+        update(models.ToDo)
+        .where(models.ToDo.id.in_(bulk.ids), models.ToDo.family_id == family_id, models.ToDo.deleted_at.is_(None))
+        .values(status="completed", version=models.ToDo.version + 1)
+        .returning(models.ToDo.id, models.ToDo.family_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    record_change(db, "todos", rows)
+    db.commit()
+    return {"status": "success", "updated": len(rows)}
+
+@router.post("/bulk/delete")
+def delete_todos(bulk: schemas.BulkIds, family_id: int = 1, db: Session = Depends(get_db)):
+    deleted = soft_delete(db, models.ToDo, models.ToDo.id.in_(bulk.ids), models.ToDo.family_id == family_id)
+    record_change(db, "todos", deleted, deleted=True)
+    db.commit()
+    return {"status": "success", "deleted": len(deleted)}
+
 @router.put("/{todo_id}", response_model=schemas.ToDo)
 def update_todo(
     todo_id: int,
-    todo_update: schemas.ToDoCreate,
+    todo_update: schemas.ToDoUpdate,
     db: Session = Depends(get_db)
 ):
-    db_todo = db.query(models.ToDo).filter(models.ToDo.id == todo_id).first()
+    values = todo_update.model_dump(exclude_unset=True)
+    expected_version = values.pop("version", None)
+
+    db_todo = update_returning(db, models.ToDo, todo_id, values, expected_version)
     if not db_todo:
-        raise HTTPException(status_code=404, detail="ToDo not found")
-    
-    for key, value in todo_update.dict(exclude_unset=True).items():
-        setattr(db_todo, key, value)
+        if get_live(db, models.ToDo, todo_id) is None:
+            raise HTTPException(status_code=404, detail="ToDo not found")
+        raise HTTPException(status_code=409, detail="ToDo was changed by someone else, reload and retry")
     
+    record_change(db, "todos", [db_todo])
     db.commit()
-    db.refresh(db_todo)
     return db_todo
 
 @router.delete("/{todo_id}")
 def delete_todo(todo_id: int, db: Session = Depends(get_db)):
-    db_todo = db.query(models.ToDo).filter(models.ToDo.id == todo_id).first()
-    if not db_todo:
+    deleted = soft_delete(db, models.ToDo, models.ToDo.id == todo_id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="ToDo not found")
-    
-    db.delete(db_todo)
+    record_change(db, "todos", deleted, deleted=True)
     db.commit()
     return {"status": "success"}
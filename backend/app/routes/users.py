@@ -1,24 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from .. import models, schemas, auth
-from ..database import get_db
+from ..database import get_async_read_db, get_db, update_returning
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.User])
-def read_users(
+async def read_users(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: models.User = Depends(auth.get_current_user_async)
 ):
     if not current_user.family_id:
         # If user has no family, return only themselves
         return [current_user]
         
-    users = db.query(models.User).filter(models.User.family_id == current_user.family_id).offset(skip).limit(limit).all()
-    return users
+    users = await db.scalars(
+        select(models.User).where(models.User.family_id == current_user.family_id).offset(skip).limit(limit)
+    )
+    return users.all()
 
 @router.post("/", response_model=schemas.User)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -52,20 +56,23 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
 @router.put("/{user_id}", response_model=schemas.User)
 
 def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
-    if db_user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    db_user.name = user.name
-    db_user.email = user.email
-    db_user.phone_number = user.phone_number
-    db_user.role = user.role
-    db_user.preferences = user.preferences
+    values = {
+        "name": user.name,
+        "email": user.email,
+        "phone_number": user.phone_number,
+        "role": user.role,
+        "preferences": user.preferences,
+    }
 
     if user.password:
         from ..auth import get_password_hash
-        db_user.hashed_password = get_password_hash(user.password)
+        values["hashed_password"] = get_password_hash(user.password)
+    
+    db_user = update_returning(db, models.User, user_id, values, user.version)
+    if db_user is None:
+        if db.get(models.User, user_id) is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=409, detail="User was changed by someone else, reload and retry")
     
     db.commit()
-    db.refresh(db_user)
     return db_user
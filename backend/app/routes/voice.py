@@ -1,14 +1,14 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
-from openai import OpenAI
-import os
 import shutil
-import requests
 from pathlib import Path
 from ..services.nlp import parse_natural_query, parse_voice_command
+from ..services.llm import require_client
 from ..auth import get_current_user
 from .. import models
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.post("/process")
 async def process_voice(
@@ -21,7 +21,7 @@ async def process_voice(
     2. Delegate to NLP service for transcription (mock or real) and parsing
     3. Return structured data (events, chores, shopping)
     """
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = require_client("openai")
     
     # Save temp file
     temp_file = Path(f"temp_{file.filename}")
@@ -47,7 +47,7 @@ async def process_voice(
         }
         
     except Exception as e:
-        print(f"ERROR: General failure in process_voice: {str(e)}")
+        logger.exception("process_voice failed")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         if temp_file.exists():
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import date, datetime
 
 class EventBase(BaseModel):
     title: str
@@ -10,13 +10,17 @@ class EventBase(BaseModel):
     end_time: datetime
     category: str = "General"
     # [NEW] Logistics
-    latitude: Optional[str] = None
-    longitude: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     commute_time_minutes: int = 0
     driver_id: Optional[int] = None
+    # Recurring series: RFC 5545 RRULE ("FREQ=WEEKLY;BYDAY=TU"); start/end_time are the first occurrence
+    rrule: Optional[str] = None
+    exdates: Optional[List[datetime]] = None # Cancelled occurrence starts
 
 class EventCreate(EventBase):
     attendee_ids: List[int] = []
+    version: Optional[int] = None # On update: reject with 409 unless this matches the stored version
 
 class Event(EventBase):
     id: int
@@ -24,10 +28,31 @@ class Event(EventBase):
     created_by_user_id: Optional[int] = None
     attendees: List['User'] = []
     driver: Optional['User'] = None
+    version: int = 1
+    recurrence_end: Optional[datetime] = None
+    recurrence_id: Optional[datetime] = None # Windowed reads: the occurrence's original start
+    updated_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
 
+class NearbyEvent(Event):
+    distance_km: float
+
+class EventConflict(BaseModel):
+    event_id: int # The event being saved
+    conflicting_event_id: int
+    title: str
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    user_ids: List[int] # Driver/attendees booked in both
+
+    class Config:
+        orm_mode = True
+
+class EventWithConflicts(Event):
+    conflicts: List[EventConflict] = [] # Warnings only: the event was saved
+
 class UserBase(BaseModel):
     name: str
     email: str
@@ -52,10 +77,12 @@ class UserCreate(UserBase):
 
 class UserUpdate(UserBase):
     password: Optional[str] = None
+    version: Optional[int] = None
 
 class User(UserBase):
     id: int
     family_id: Optional[int] = None
+    version: int = 1
 
     class Config:
         orm_mode = True
@@ -88,12 +115,17 @@ class ShoppingItemBase(BaseModel):
 class ShoppingItemCreate(ShoppingItemBase):
     pass
 
+class ShoppingItemUpdate(ShoppingItemBase):
+    version: Optional[int] = None
+
 class ShoppingItem(ShoppingItemBase):
     id: int
     family_id: Optional[int] = None
     added_by_user_id: Optional[int] = None
     added_by: Optional[User] = None
     created_at: Optional[datetime] = None
+    version: int = 1
+    updated_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
@@ -101,6 +133,12 @@ class ShoppingItem(ShoppingItemBase):
     class Config:
         orm_mode = True
 
+class BulkIds(BaseModel):
+    ids: List[int]
+
+class BulkToggleBought(BulkIds):
+    is_bought: Optional[bool] = None # None flips each item
+
 class FamilyBase(BaseModel):
     name: str
 
@@ -123,6 +161,14 @@ class Family(FamilyBase):
     class Config:
         orm_mode = True
 
+class FreeSlot(BaseModel):
+    start: datetime
+    end: datetime
+    minutes: int
+
+    class Config:
+        orm_mode = True
+
 class ToDoBase(BaseModel):
     title: str
     status: str = "pending"
@@ -132,12 +178,17 @@ class ToDoBase(BaseModel):
 class ToDoCreate(ToDoBase):
     pass
 
+class ToDoUpdate(ToDoBase):
+    version: Optional[int] = None
+
 class ToDo(ToDoBase):
     id: int
     family_id: Optional[int] = None
     created_by_user_id: Optional[int] = None
     assigned_to: Optional[User] = None
     created_by: Optional[User] = None
+    version: int = 1
+    updated_at: Optional[datetime] = None
     
     class Config:
         orm_mode = True
@@ -154,3 +205,44 @@ class UserProfileAttribute(UserProfileAttributeBase):
     
     class Config:
         orm_mode = True
+
+class Place(BaseModel):
+    query: Optional[str] = None
+    display_name: str
+    latitude: float
+    longitude: float
+
+class PlaceQueries(BaseModel):
+    queries: List[str]
+
+class DriverPlanRequest(BaseModel):
+    driver_ids: Optional[List[int]] = None # Default: every active family member
+
+class DriverAssignment(BaseModel):
+    event_id: int
+    recurrence_id: Optional[datetime] = None # A series' occurrence that day: suggested, never applied
+    driver_id: Optional[int] = None
+    drive_minutes: int = 0 # Leg from home or the driver's previous event
+
+class DriverPlan(BaseModel):
+    day: date
+    assignments: List[DriverAssignment]
+    unassigned_event_ids: List[int]
+    total_drive_minutes: int
+    greedy_drive_minutes: int
+    minutes_by_driver: Dict[int, int]
+    timed_out: bool
+    applied: bool
+
+class SyncDeleted(BaseModel):
+    events: List[int] = []
+    todos: List[int] = []
+    shopping_items: List[int] = []
+
+class SyncResponse(BaseModel):
+    token: str # Send as ?since= next time
+    has_more: bool # A page was full: call again with the new token
+    events: List[Event]
+    todos: List[ToDo]
+    shopping_items: List[ShoppingItem]
+    deleted: SyncDeleted # Ids removed since the token
@@ -1,16 +1,32 @@
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple
 from .. import models, schemas
-import os
-from google import genai
-from google.genai import types
+from starlette.concurrency import run_in_threadpool
+from .availability import find_free_slots
+from .llm import GeminiProvider, HedgedLLM, OpenAIProvider, ProviderNotConfigured, get_client, hedging_enabled
+from .stream_parser import IncrementalIntentParser
+
+# Free-time context for the prompt: this many days ahead, at most this many windows
+FREE_TIME_DAYS = 7
+FREE_TIME_SLOTS = 8
 
 class AILearningService:
     def __init__(self, db: Session):
         self.db = db
-        self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        gemini, openai = get_client("gemini"), get_client("openai")
+        # Gemini first; hedge to OpenAI when Gemini is slow or its breaker is open.
+        # With only an OpenAI key, OpenAI serves alone.
+        providers = []
+        if gemini is not None:
+            providers.append(GeminiProvider(gemini))
+        if openai is not None and (gemini is None or hedging_enabled()):
+            providers.append(OpenAIProvider(openai))
+        if not providers:
+            raise ProviderNotConfigured("no LLM API key is configured")
+        self.llm = HedgedLLM(providers)
 
     def get_user_profile_context(self, user_id: int) -> str:
         """Retrieves active profile attributes for the user."""
@@ -25,6 +41,23 @@ class AILearningService:
             
         return "\n".join(context_lines)
 
+    def get_free_time_context(self, user_id: int, now: datetime = None) -> str:
+        """The next windows when the user's whole family is free, one per line."""
+        user = self.db.get(models.User, user_id)
+        if user is None or not user.family_id:
+            return ""
+        members = self.db.scalars(
+            select(models.User.id).where(models.User.family_id == user.family_id, models.User.status == "active")
+        ).all()
+        if not members:
+            return ""
+        start = (now or datetime.now()).replace(second=0, microsecond=0)
+        slots = find_free_slots(
+            self.db, user.family_id, members, start, start + timedelta(days=FREE_TIME_DAYS),
+            min_minutes=60, limit=FREE_TIME_SLOTS,
+        )
+        return "\n".join(f"- {slot.start:%a %Y-%m-%d %H:%M} to {slot.end:%H:%M}" for slot in slots)
+
     def learn_from_interaction(self, user_id: int, user_input: str, actual_action: Dict[str, Any]):
         """
         Analyzes the discrepancy between what was implied and what actually happened.
@@ -70,18 +103,18 @@ class AILearningService:
         
         self.db.commit()
 
-    async def parse_multi_intent(self, user_id: int, query: str) -> Dict[str, Any]:
-        """
-        Parses a natural language query into multiple intents (Events, Shopping, ToDos)
-        using the user's profile context.
-        """
+    def _multi_intent_prompt(self, user_id: int, query: str) -> str:
         profile_context = self.get_user_profile_context(user_id)
+        free_time = self.get_free_time_context(user_id)
         
         prompt = f"""
         You are a smart family assistant. 
         User Context:
         {profile_context}
         
+        Times when the whole family is free (when the query gives no time, pick one of these):
+        {free_time or "- unknown"}
+        
         User Query: "{query}"
         
         Extract the following intents:
@@ -98,13 +131,32 @@ class AILearningService:
             "todos": [ {{ "title": "...", "due_date": "ISO", "assigned_to": "..." }} ]
         }}
         """
+        return prompt
+
+    async def parse_multi_intent(self, user_id: int, query: str) -> Dict[str, Any]:
+        """
+        Parses a natural language query into multiple intents (Events, Shopping, ToDos)
+        using the user's profile context.
+        """
+        # Profile and free-slot lookups are blocking DB reads: build the prompt off the event loop too
+        prompt = await run_in_threadpool(self._multi_intent_prompt, user_id, query)
         
-        response = self.client.models.generate_content(
-            model='gemini-2.0-flash',
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type='application/json'
-            )
-        )
+        # Blocking SDK calls (plus a possible hedge) run off the event loop
+        response_text = await run_in_threadpool(self.llm.generate, prompt)
         
-        return json.loads(response.text)
+        return json.loads(response_text)
+
+    def stream_multi_intent(self, user_id: int, query: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of parse_multi_intent: yields ("events" | "shopping_list" | "todos", item)
+        as soon as each item's JSON object closes in the provider's token stream.
+        """
+        # Build the prompt (DB access) now, while the request's session is still open
+        prompt = self._multi_intent_prompt(user_id, query)
+        return self._stream_items(prompt)
+
+    def _stream_items(self, prompt: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        parser = IncrementalIntentParser()
+        for key, item in parser.iter_items(self.llm.stream(prompt)):
+            if key in ("events", "shopping_list", "todos"):
+                yield key, item
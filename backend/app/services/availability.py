@@ -0,0 +1,149 @@
+"""
+Common free time: when are all of these family members free?
+
+One range query pulls the family's events overlapping the window together
+with who drives/attends each; recurring series are expanded into their
+occurrences in the window. Each member's busy intervals are sorted and
+merged, then a sweep line over all members' start/end points finds the
+stretches where nobody is busy. Only daytime hours count (a 2am slot is free
+but useless), and windows shorter than `min_minutes` are dropped.
+
+Used by GET /api/families/{id}/free-slots and by AILearningService, which
+hands the next few free windows to the model so it proposes real times.
+"""
+import datetime
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import recurrence
+
+Interval = Tuple[datetime.datetime, datetime.datetime]
+
+DAY_START_HOUR = 7
+DAY_END_HOUR = 22
+
+
+@dataclass(frozen=True)
+class FreeSlot:
+    start: datetime.datetime
+    end: datetime.datetime
+
+    @property
+    def minutes(self) -> int:
+        return int((self.end - self.start).total_seconds() // 60)
+
+
+def busy_intervals(db: Session, family_id: int, member_ids: Iterable[int],
+                   start: datetime.datetime, end: datetime.datetime) -> Dict[int, List[Interval]]:
+    """member id -> intervals (clipped to [start, end)) of events they drive or attend."""
+    members = set(member_ids)
+    busy: Dict[int, List[Interval]] = {member: [] for member in members}
+    event = models.Event
+    event_end = func.coalesce(event.end_time, event.start_time)
+    rows = db.execute(
+        select(event.start_time, event_end, event.driver_id, models.event_attendees.c.user_id, event.rrule, event.exdates)
+        .outerjoin(models.event_attendees, models.event_attendees.c.event_id == event.id)
+        .where(
+            event.family_id == family_id,
+            event.deleted_at.is_(None),
+            event.start_time < end,
+            or_(
+                and_(event.rrule.is_(None), event_end > start),
+                and_(event.rrule.is_not(None), or_(event.recurrence_end.is_(None), event.recurrence_end > start)),
+            ),
+        )
+    )
+    for event_start, event_stop, driver_id, attendee_id, rule, exdates in rows:
+        people = {driver_id, attendee_id} & members
+        if not people:
+            continue
+        if rule:
+            length = event_stop - event_start
+            intervals = [(occurrence, occurrence + length) for occurrence in recurrence.expand(rule, event_start, event_stop, start, end, exdates)]
+        else:
+            intervals = [(event_start, event_stop)]
+        for busy_start, busy_end in intervals:
+            for member in people:
+                busy[member].append((max(busy_start, start), min(busy_end, end)))
+    return busy
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sorted, non-overlapping union; touching intervals are joined."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _daytime(start: datetime.datetime, end: datetime.datetime, from_hour: int, to_hour: int) -> List[Interval]:
+    """The daytime parts of [start, end), one per calendar day."""
+    windows = []
+    day = start.date()
+    while day <= end.date():
+        opens = datetime.datetime.combine(day, datetime.time(from_hour))
+        closes = datetime.datetime.combine(day, datetime.time.min) + datetime.timedelta(hours=to_hour)
+        opens, closes = max(opens, start), min(closes, end)
+        if opens < closes:
+            windows.append((opens, closes))
+        day += datetime.timedelta(days=1)
+    return windows
+
+
+def common_free(busy: Sequence[List[Interval]], start: datetime.datetime, end: datetime.datetime,
+                min_minutes: int = 30, from_hour: int = DAY_START_HOUR, to_hour: int = DAY_END_HOUR) -> List[FreeSlot]:
+    """
+    Windows within [start, end) and daytime hours where nobody in `busy` (one
+    interval list per member) is busy, at least `min_minutes` long.
+    """
+    # Nights count as busy for everyone
+    lanes = [merge_intervals(intervals) for intervals in busy] + [_nights(start, end, from_hour, to_hour)]
+    # Sweep: +1 when someone becomes busy, -1 when they're free again; ends sort before starts
+    points = sorted(
+        (point, step)
+        for lane in lanes
+        for busy_start, busy_end in lane
+        if busy_start < busy_end
+        for point, step in ((busy_start, 1), (busy_end, -1))
+    )
+
+    slots = []
+    shortest = datetime.timedelta(minutes=min_minutes)
+    depth, free_since = 0, start
+    for moment, step in points:
+        if depth == 0 and moment > free_since and moment - free_since >= shortest:
+            slots.append(FreeSlot(free_since, moment))
+        depth += step
+        if depth == 0:
+            free_since = moment
+    if end > free_since and end - free_since >= shortest:
+        slots.append(FreeSlot(free_since, end))
+    return slots
+
+
+def _nights(start: datetime.datetime, end: datetime.datetime, from_hour: int, to_hour: int) -> List[Interval]:
+    """Complement of _daytime() within [start, end)."""
+    nights, cursor = [], start
+    for opens, closes in _daytime(start, end, from_hour, to_hour):
+        if cursor < opens:
+            nights.append((cursor, opens))
+        cursor = closes
+    if cursor < end:
+        nights.append((cursor, end))
+    return nights
+
+
+def find_free_slots(db: Session, family_id: int, member_ids: Sequence[int], start: datetime.datetime,
+                    end: datetime.datetime, min_minutes: int = 30, from_hour: int = DAY_START_HOUR,
+                    to_hour: int = DAY_END_HOUR, limit: Optional[int] = None) -> List[FreeSlot]:
+    busy = busy_intervals(db, family_id, member_ids, start, end)
+    slots = common_free(list(busy.values()), start, end, min_minutes, from_hour, to_hour)
+    return slots[:limit] if limit is not None else slots
@@ -3,8 +3,12 @@ import logging
 import os
 import time
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence
-from openai import OpenAI
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+from .singleflight import SingleFlight, normalize_key
+from .llm import HedgedLLM, OpenAIProvider, alternate_provider, require_client
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 DEFAULT_MODEL = os.getenv("OPENAI_EVENT_MODEL", "gpt-4o-mini")
 DEFAULT_LABELS: Sequence[str] = (
@@ -20,16 +24,37 @@ DEFAULT_LABELS: Sequence[str] = (
     "Film & Entertainment",
 )
 
+# Parallel scrapes often classify the same event at the same time
+_classify_flight = SingleFlight("classify_event")
+
 def classify_event(
     event: Dict[str, str],
     *,
     labels: Sequence[str] | None = None,
     model: str | None = None,
-    openai_client: OpenAI | None = None,
+    openai_client: "OpenAI | None" = None,
     max_retries: int = 3,
 ) -> str:
     
-    client = openai_client or OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    key = normalize_key(
+        model or DEFAULT_MODEL,
+        list(labels or DEFAULT_LABELS),
+        event.get("title", ""),
+        event.get("description", ""),
+    )
+    return _classify_flight.do(
+        key,
+        lambda: _classify_event(event, labels, model, openai_client, max_retries),
+    )
+
+def _classify_event(
+    event: Dict[str, str],
+    labels: Sequence[str] | None,
+    model: str | None,
+    openai_client: "OpenAI | None",
+    max_retries: int,
+) -> str:
+    client = openai_client or require_client("openai")
     
     label_instructions = (
         "Choose a single category from this list: \n- "
@@ -48,23 +73,15 @@ def classify_event(
         + "\nRespond with JUST the category name."
     )
 
+    llm = HedgedLLM([OpenAIProvider(client, model or DEFAULT_MODEL), alternate_provider("openai")])
+    system = (
+        "You are a short, highly accurate event categorisation engine. "
+        "Always respond with exactly one category name."
+    )
+
     for attempt in range(max_retries):
         try:
-            completion = client.chat.completions.create(
-                model=model or DEFAULT_MODEL,
-                temperature=0.0,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a short, highly accurate event categorisation engine. "
-                            "Always respond with exactly one category name."
-                        ),
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-            )
-            category = completion.choices[0].message.content.strip()
+            category = llm.generate(prompt, system=system, json_mode=False).strip()
             return category
         except Exception as exc:
             sleep_for = 2 ** attempt
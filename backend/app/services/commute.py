@@ -0,0 +1,192 @@
+"""
+Commute chaining: an event's commute_time_minutes is the drive from wherever
+its travellers were just before (their previous event that day), instead of
+always from "Home".
+
+Travellers are the event's driver, or its attendees when nobody is driving.
+With several travellers, the longest drive wins. A traveller with no earlier
+event that day starts from "Home". Occurrences of recurring series count as
+that day's events; a series' own commute is chained from its first occurrence.
+
+Moving, re-assigning or deleting an event changes only its own commute and,
+for each traveller, the commute of the next event after its old and new
+position. Routes take a snapshot() of an event before updating or deleting
+it and hand it to recompute_after_change(), which runs as a background task
+so the write itself doesn't wait on routing.
+"""
+import datetime
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..pubsub import record_change
+from . import recurrence
+from .logistics import LogisticsService
+
+logger = logging.getLogger(__name__)
+
+HOME = "Home"
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Where an event sat before a write: enough to find the event that followed it."""
+    event_id: int
+    start_time: datetime.datetime
+    traveller_ids: Tuple[int, ...]
+
+
+def _day_bounds(moment: datetime.datetime) -> Tuple[datetime.datetime, datetime.datetime]:
+    start = datetime.datetime.combine(moment.date(), datetime.time.min)
+    return start, start + datetime.timedelta(days=1)
+
+
+def traveller_ids(db: Session, event_id: int, driver_id: Optional[int]) -> Tuple[int, ...]:
+    if driver_id is not None:
+        return (driver_id,)
+    rows = db.scalars(
+        select(models.event_attendees.c.user_id).where(models.event_attendees.c.event_id == event_id)
+    )
+    return tuple(sorted(rows))
+
+
+def snapshot(db: Session, event_id: int) -> Optional[Snapshot]:
+    row = db.execute(
+        select(models.Event.start_time, models.Event.driver_id)
+        .where(models.Event.id == event_id, models.Event.deleted_at.is_(None))
+    ).first()
+    if row is None or row.start_time is None:
+        return None
+    return Snapshot(event_id, row.start_time, traveller_ids(db, event_id, row.driver_id))
+
+
+def _neighbour(db: Session, user_id: int, moment: datetime.datetime, exclude_id: int, before: bool) -> Optional[models.Event]:
+    """
+    The user's closest event before (or after) `moment` on the same day, as
+    driver or attendee. Each half is one indexed, LIMIT 1 range scan:
+    events(driver_id, start_time), and event_attendees(user_id) joined to
+    events by primary key. The user's series running that day are expanded
+    and their occurrences compete too.
+    """
+    day_start, day_end = _day_bounds(moment)
+    if before:
+        window = (models.Event.start_time >= day_start, models.Event.start_time < moment)
+        order = models.Event.start_time.desc()
+    else:
+        window = (models.Event.start_time > moment, models.Event.start_time < day_end)
+        order = models.Event.start_time.asc()
+    window += (models.Event.deleted_at.is_(None), models.Event.rrule.is_(None))
+
+    driven = (
+        select(models.Event)
+        .where(models.Event.driver_id == user_id, models.Event.id != exclude_id, *window)
+        .order_by(order).limit(1)
+    )
+    attended = (
+        select(models.Event)
+        .join(models.event_attendees, models.event_attendees.c.event_id == models.Event.id)
+        .where(models.event_attendees.c.user_id == user_id, models.Event.id != exclude_id, *window)
+        .order_by(order).limit(1)
+    )
+    candidates = [(event.start_time, event) for event in (db.scalars(driven).first(), db.scalars(attended).first()) if event is not None]
+
+    running = (
+        models.Event.rrule.is_not(None),
+        models.Event.id != exclude_id,
+        models.Event.deleted_at.is_(None),
+        models.Event.start_time < day_end,
+        or_(models.Event.recurrence_end.is_(None), models.Event.recurrence_end > day_start),
+    )
+    series = set(db.scalars(select(models.Event).where(models.Event.driver_id == user_id, *running)))
+    series.update(db.scalars(
+        select(models.Event)
+        .join(models.event_attendees, models.event_attendees.c.event_id == models.Event.id)
+        .where(models.event_attendees.c.user_id == user_id, *running)
+    ))
+    for event in series:
+        for start, _ in recurrence.occurrences(event.rrule, event.start_time, event.end_time, day_start, day_end, event.exdates):
+            if day_start <= start < day_end and (start < moment if before else start > moment):
+                candidates.append((start, event))
+    if not candidates:
+        return None
+    pick = max if before else min
+    return pick(candidates, key=lambda candidate: candidate[0])[1]
+
+
+def previous_event(db: Session, user_id: int, moment: datetime.datetime, exclude_id: int) -> Optional[models.Event]:
+    return _neighbour(db, user_id, moment, exclude_id, before=True)
+
+
+def next_event(db: Session, user_id: int, moment: datetime.datetime, exclude_id: int) -> Optional[models.Event]:
+    return _neighbour(db, user_id, moment, exclude_id, before=False)
+
+
+def event_point(event: Optional[models.Event]) -> Optional[str]:
+    """What LogisticsService routes to/from: "lat,lng" when known, else the location text."""
+    if event is None:
+        return None
+    if event.latitude is not None and event.longitude is not None:
+        return f"{event.latitude},{event.longitude}"
+    return event.location or None
+
+
+def commute_minutes(db: Session, event: models.Event) -> int:
+    destination = event_point(event)
+    if destination is None or event.start_time is None:
+        return 0
+    origins: List[str] = []
+    for user_id in traveller_ids(db, event.id, event.driver_id):
+        origins.append(event_point(previous_event(db, user_id, event.start_time, event.id)) or HOME)
+    if not origins:
+        origins = [HOME]
+    # One routed batch for every traveller's leg
+    legs = LogisticsService.get_drive_time_matrix(list(dict.fromkeys(origins)), [destination])
+    return max(row[0] for row in legs)
+
+
+def recompute(db: Session, event_ids) -> None:
+    for event_id in event_ids:
+        event = db.get(models.Event, event_id)
+        if event is None or event.deleted_at is not None:
+            continue
+        minutes = commute_minutes(db, event)
+        if minutes == event.commute_time_minutes:
+            continue
+        # Derived data: no version bump, or a client holding the event would get a spurious 409
+        db.execute(update(models.Event).where(models.Event.id == event_id).values(commute_time_minutes=minutes))
+        # Open calendars still need to hear about it, once the caller commits
+        record_change(db, "events", [event])
+
+
+def following(db: Session, state: Snapshot) -> List[int]:
+    """For each traveller, the event right after `state` on that day."""
+    ids = []
+    for user_id in state.traveller_ids:
+        event = next_event(db, user_id, state.start_time, state.event_id)
+        if event is not None:
+            ids.append(event.id)
+    return ids
+
+
+def recompute_after_change(bind, event_ids: Sequence[int] = (), before: Sequence[Snapshot] = ()) -> None:
+    """
+    Background task: re-chains the commutes that writing `event_ids` (created or
+    updated) and the `before` snapshots (updated or deleted) may have changed.
+    """
+    try:
+        with Session(bind) as db:
+            affected = []
+            for event_id in event_ids:
+                current = snapshot(db, event_id)
+                if current is not None:
+                    affected += [event_id, *following(db, current)]
+            for state in before:
+                affected += following(db, state)
+            recompute(db, dict.fromkeys(affected))
+            db.commit()
+    except Exception:
+        logger.exception("Recomputing commutes after events %s changed failed", [*event_ids, *(s.event_id for s in before)])
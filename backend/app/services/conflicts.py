@@ -0,0 +1,253 @@
+"""
+Double-booking warnings: does saving an event put one of its people (driver
+or attendees) in two places at once?
+
+Two events overlap when a.start < b.end and a.end > b.start; an event with no
+end counts as a moment. Overlaps are warnings, not errors: the event is saved
+and the response lists who is double-booked and by which events.
+
+- One event (create/update): find_conflicts() asks the database directly,
+  two indexed range queries for all of the event's people together
+  (events(driver_id, start_time) and event_attendees(user_id)).
+- A batch (assistant apply): check_batch() reads the family's events in the
+  batch's overall time window once, puts them and the batch into an
+  IntervalTree, and checks each new event against that in memory, so events
+  in the same batch are checked against each other too.
+
+Recurring series (services/recurrence.py) are expanded into their
+occurrences in the window, so a weekly practice conflicts every week, not
+only on its first date. A series being saved is checked occurrence by
+occurrence over its next SERIES_HORIZON_DAYS.
+"""
+import datetime
+from dataclasses import dataclass, field
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import recurrence
+
+T = TypeVar("T")
+
+# How far ahead a series being saved is checked
+SERIES_HORIZON_DAYS = 56
+
+
+def _end(start: datetime.datetime, end: Optional[datetime.datetime]) -> datetime.datetime:
+    return end if end is not None and end > start else start
+
+
+# ──────────────────────────────────────────────
+# Interval tree
+# ──────────────────────────────────────────────
+
+@dataclass
+class _Node(Generic[T]):
+    center: datetime.datetime
+    # Intervals containing `center`, sorted by start and by end (descending)
+    by_start: List[Tuple[datetime.datetime, datetime.datetime, T]]
+    by_end: List[Tuple[datetime.datetime, datetime.datetime, T]]
+    left: Optional["_Node[T]"] = None
+    right: Optional["_Node[T]"] = None
+
+
+class IntervalTree(Generic[T]):
+    """
+    Static centered interval tree over (start, end, value) triples. overlapping()
+    returns the values whose interval overlaps [start, end) in O(log n + k).
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[datetime.datetime, datetime.datetime, T]] = ()):
+        items = [(start, _end(start, end), value) for start, end, value in intervals]
+        self._size = len(items)
+        self._root = self._build(items)
+
+    def __len__(self):
+        return self._size
+
+    @classmethod
+    def _build(cls, items):
+        if not items:
+            return None
+        points = sorted(point for start, end, _ in items for point in (start, end))
+        center = points[len(points) // 2]
+        here, left, right = [], [], []
+        for item in items:
+            if item[0] > center:
+                right.append(item)
+            elif item[1] < center:
+                left.append(item)
+            else:
+                here.append(item)
+        return _Node(
+            center,
+            sorted(here, key=lambda item: item[0]),
+            sorted(here, key=lambda item: item[1], reverse=True),
+            cls._build(left),
+            cls._build(right),
+        )
+
+    def overlapping(self, start: datetime.datetime, end: Optional[datetime.datetime]) -> List[T]:
+        end = _end(start, end)
+        found = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            if end <= node.center:
+                # Right subtree starts after center >= end; here, only the start can rule an interval out
+                for s, e, value in node.by_start:
+                    if s >= end:
+                        break
+                    if e > start:
+                        found.append(value)
+                if node.left:
+                    stack.append(node.left)
+            elif start > node.center:
+                # Left subtree ends before center < start; here, only the end can rule an interval out
+                for s, e, value in node.by_end:
+                    if e <= start:
+                        break
+                    found.append(value)
+                if node.right:
+                    stack.append(node.right)
+            else:
+                found.extend(value for s, e, value in node.by_start if e > start)
+                stack.extend(child for child in (node.left, node.right) if child)
+        return found
+
+
+# ──────────────────────────────────────────────
+# Conflict checks
+# ──────────────────────────────────────────────
+
+@dataclass
+class Conflict:
+    event_id: int  # The event being saved
+    conflicting_event_id: int
+    title: str
+    start_time: datetime.datetime
+    end_time: Optional[datetime.datetime]
+    user_ids: List[int] = field(default_factory=list)  # Booked in both
+
+
+def _overlap_clauses(start: datetime.datetime, end: datetime.datetime):
+    """Single events overlapping [start, end), and series that may have an occurrence there."""
+    event = models.Event
+    return (
+        event.deleted_at.is_(None),
+        event.start_time < end,
+        or_(
+            and_(event.rrule.is_(None), func.coalesce(event.end_time, event.start_time) > start),
+            and_(event.rrule.is_not(None), or_(event.recurrence_end.is_(None), event.recurrence_end > start)),
+        ),
+    )
+
+
+def _times(event, start: datetime.datetime, end: datetime.datetime) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """When `event` (a row with start/end_time, rrule, exdates) takes place in [start, end)."""
+    if event.rrule:
+        return recurrence.occurrences(event.rrule, event.start_time, event.end_time, start, end, event.exdates)
+    return [(event.start_time, _end(event.start_time, event.end_time))]
+
+
+def participant_ids(db: Session, event_id: int, driver_id: Optional[int]) -> Set[int]:
+    """Everyone an event occupies: its driver and its attendees."""
+    people = set(db.scalars(
+        select(models.event_attendees.c.user_id).where(models.event_attendees.c.event_id == event_id)
+    ))
+    if driver_id is not None:
+        people.add(driver_id)
+    return people
+
+
+def find_conflicts(db: Session, event_id: int, user_ids: Iterable[int],
+                   start: Optional[datetime.datetime], end: Optional[datetime.datetime],
+                   rrule: Optional[str] = None, exdates: Optional[Sequence[str]] = None) -> List[Conflict]:
+    """
+    Other events that any of `user_ids` drives or attends during [start, end),
+    or during any occurrence of the series `rrule` in the next SERIES_HORIZON_DAYS.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids or start is None:
+        return []
+    if rrule:
+        mine = recurrence.occurrences(rrule, start, end, start, start + datetime.timedelta(days=SERIES_HORIZON_DAYS), exdates)
+    else:
+        mine = [(start, _end(start, end))]
+    if not mine:
+        return []
+    window_start, window_end = mine[0][0], max(stop for _, stop in mine)
+    window = (models.Event.id != event_id, *_overlap_clauses(window_start, window_end))
+
+    booked: Dict[int, Tuple[models.Event, Set[int]]] = {}
+    driven = select(models.Event).where(models.Event.driver_id.in_(user_ids), *window)
+    for event in db.scalars(driven):
+        booked.setdefault(event.id, (event, set()))[1].add(event.driver_id)
+    attended = (
+        select(models.Event, models.event_attendees.c.user_id)
+        .join(models.event_attendees, models.event_attendees.c.event_id == models.Event.id)
+        .where(models.event_attendees.c.user_id.in_(user_ids), *window)
+    )
+    for event, user_id in db.execute(attended):
+        booked.setdefault(event.id, (event, set()))[1].add(user_id)
+
+    conflicts = []
+    for other, people in booked.values():
+        # The other event's first occurrence that overlaps one of ours
+        clash = next((
+            (other_start, other_end) for other_start, other_end in _times(other, window_start, window_end)
+            if any(my_start < other_end and my_end > other_start for my_start, my_end in mine)
+        ), None)
+        if clash is not None:
+            other_end = clash[1] if other.end_time is not None else None
+            conflicts.append(Conflict(event_id, other.id, other.title, clash[0], other_end, sorted(people)))
+    conflicts.sort(key=lambda c: (c.start_time, c.conflicting_event_id))
+    return conflicts
+
+
+def check_batch(db: Session, family_id: Optional[int], events: Sequence[models.Event]) -> List[Conflict]:
+    """
+    Conflicts for a batch of just-written (flushed) events of one family:
+    against the family's other events and against each other.
+    """
+    events = [event for event in events if event.start_time is not None]
+    if not events:
+        return []
+    window_start = min(event.start_time for event in events)
+    window_end = max(_end(event.start_time, event.end_time) for event in events)
+
+    rows = db.execute(
+        select(
+            models.Event.id, models.Event.title, models.Event.start_time, models.Event.end_time, models.Event.driver_id,
+            models.Event.rrule, models.Event.exdates,
+        )
+        .where(models.Event.family_id == family_id, *_overlap_clauses(window_start, window_end))
+    ).all()
+    if len(rows) < 2:
+        return []
+    people: Dict[int, Set[int]] = {row.id: ({row.driver_id} if row.driver_id is not None else set()) for row in rows}
+    links = select(models.event_attendees.c.event_id, models.event_attendees.c.user_id).where(
+        models.event_attendees.c.event_id.in_(people)
+    )
+    for event_id, user_id in db.execute(links):
+        people[event_id].add(user_id)
+
+    # One interval per occurrence; the value is (row, occurrence start, occurrence end)
+    tree = IntervalTree(
+        (start, stop, (row, start, stop if row.end_time is not None else None))
+        for row in rows for start, stop in _times(row, window_start, window_end)
+    )
+    conflicts = []
+    for event in events:
+        mine = people.get(event.id)
+        if not mine:
+            continue
+        reported = set()
+        for other, start, stop in sorted(tree.overlapping(event.start_time, event.end_time), key=lambda hit: (hit[1], hit[0].id)):
+            shared = mine & people[other.id]
+            if other.id != event.id and other.id not in reported and shared:
+                reported.add(other.id)
+                conflicts.append(Conflict(event.id, other.id, other.title, start, stop, sorted(shared)))
+    return conflicts
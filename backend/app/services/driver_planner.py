@@ -0,0 +1,264 @@
+"""
+Daily driver assignment: who drives to which of a family's events.
+
+Each driver leaves home, drives to their events in time order and comes
+back. A driver can take an event if they can get there from the end of
+their previous one in time. The plan minimizes events nobody can drive to,
+then total drive time (home legs included).
+
+Solved as a small vehicle-routing problem:
+1. Greedy: events in start order, each one given to the driver for whom it
+   adds the least drive time.
+2. Local search, until no move improves the plan or the time budget runs out:
+   - insert unassigned events, directly or by handing a conflicting event
+     to another driver;
+   - move one event to another driver;
+   - swap two events between drivers.
+
+Travel times come from one LogisticsService.get_drive_time_matrix() call.
+"""
+import datetime
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .commute import HOME, event_point
+from .logistics import LogisticsService
+
+HOME_NODE = 0
+# Only events this close (minutes) to an unassigned one are tried as blockers
+MAKE_ROOM_WINDOW = 180
+
+
+@dataclass(frozen=True)
+class Stop:
+    event_id: int
+    # Minutes since midnight
+    start: float
+    end: float
+    # Row/column of this event in the travel matrix; HOME_NODE is home
+    node: int
+
+
+@dataclass
+class Plan:
+    routes: Dict[int, List[Stop]]
+    unassigned: List[Stop]
+    total_minutes: float
+    greedy_minutes: float = 0.0
+    moves: int = 0
+    timed_out: bool = False
+    # event id -> minutes driven to reach it
+    legs: Dict[int, float] = field(default_factory=dict)
+
+    minutes_by_driver: Dict[int, float] = field(default_factory=dict)
+
+    def cost(self) -> Tuple[int, float]:
+        return len(self.unassigned), self.total_minutes
+
+
+class DriverPlanner:
+    def __init__(self, travel: Sequence[Sequence[float]], drivers: Sequence[int], budget_seconds: float = 0.2):
+        # Staying put is free; insertion deltas subtract t[a][a] for an empty route
+        self.travel = [[0 if i == j else minutes for j, minutes in enumerate(row)] for i, row in enumerate(travel)]
+        self.drivers = list(drivers)
+        self.budget_seconds = budget_seconds
+
+    # ── route arithmetic ──
+
+    def route_minutes(self, route: List[Stop]) -> float:
+        if not route:
+            return 0.0
+        t = self.travel
+        total = t[HOME_NODE][route[0].node] + t[route[-1].node][HOME_NODE]
+        for a, b in zip(route, route[1:]):
+            total += t[a.node][b.node]
+        return total
+
+    def _fits(self, before: Optional[Stop], stop: Stop, after: Optional[Stop]) -> bool:
+        t = self.travel
+        if before is not None and before.end + t[before.node][stop.node] > stop.start:
+            return False
+        if after is not None and stop.end + t[stop.node][after.node] > after.start:
+            return False
+        return True
+
+    def feasible(self, route: List[Stop]) -> bool:
+        return all(self._fits(a, b, None) for a, b in zip(route, route[1:]))
+
+    def _insertion(self, route: List[Stop], stop: Stop) -> Optional[Tuple[int, float]]:
+        """(position, added minutes) for putting `stop` into `route`, or None if it can't be reached in time."""
+        position = 0
+        while position < len(route) and route[position].start < stop.start:
+            position += 1
+        before = route[position - 1] if position > 0 else None
+        after = route[position] if position < len(route) else None
+        if not self._fits(before, stop, after):
+            return None
+        t = self.travel
+        prev_node = before.node if before else HOME_NODE
+        next_node = after.node if after else HOME_NODE
+        added = t[prev_node][stop.node] + t[stop.node][next_node] - t[prev_node][next_node]
+        return position, added
+
+    def _removal(self, route: List[Stop], index: int) -> Optional[float]:
+        """Minutes saved by taking route[index] out, or None if its neighbours then don't connect in time."""
+        before = route[index - 1] if index > 0 else None
+        after = route[index + 1] if index + 1 < len(route) else None
+        if before is not None and after is not None and not self._fits(before, after, None):
+            return None
+        t = self.travel
+        prev_node = before.node if before else HOME_NODE
+        next_node = after.node if after else HOME_NODE
+        stop = route[index]
+        return t[prev_node][stop.node] + t[stop.node][next_node] - t[prev_node][next_node]
+
+    # ── solver ──
+
+    def greedy(self, stops: Sequence[Stop]) -> Plan:
+        routes: Dict[int, List[Stop]] = {driver: [] for driver in self.drivers}
+        unassigned = []
+        for stop in sorted(stops, key=lambda s: (s.start, s.end, s.event_id)):
+            best = None
+            for driver in self.drivers:
+                insertion = self._insertion(routes[driver], stop)
+                if insertion is not None and (best is None or insertion[1] < best[2]):
+                    best = (driver, insertion[0], insertion[1])
+            if best is None:
+                unassigned.append(stop)
+                continue
+            driver, position, _ = best
+            routes[driver].insert(position, stop)
+        total = sum(self.route_minutes(route) for route in routes.values())
+        return Plan(routes, unassigned, total, greedy_minutes=total)
+
+    def _try_insert_unassigned(self, plan: Plan) -> bool:
+        for stop in list(plan.unassigned):
+            best = None
+            for driver, route in plan.routes.items():
+                insertion = self._insertion(route, stop)
+                if insertion is not None and (best is None or insertion[1] < best[2]):
+                    best = (driver, insertion[0], insertion[1])
+            if best is not None:
+                driver, position, added = best
+                plan.routes[driver].insert(position, stop)
+                plan.unassigned.remove(stop)
+                plan.total_minutes += added
+                return True
+        return False
+
+    def _try_make_room(self, plan: Plan) -> bool:
+        """Hands one event to another driver so an unassigned event fits in its place."""
+        for stop in list(plan.unassigned):
+            for driver, route in plan.routes.items():
+                for index, blocker in enumerate(route):
+                    if blocker.start > stop.end + MAKE_ROOM_WINDOW or blocker.end < stop.start - MAKE_ROOM_WINDOW:
+                        continue
+                    shortened = route[:index] + route[index + 1:]
+                    insertion = self._insertion(shortened, stop)
+                    if insertion is None:
+                        continue
+                    shortened.insert(insertion[0], stop)
+                    if not self.feasible(shortened):
+                        continue
+                    for other_driver, other in plan.routes.items():
+                        if other_driver == driver:
+                            continue
+                        moved = self._insertion(other, blocker)
+                        if moved is None:
+                            continue
+                        before = self.route_minutes(route) + self.route_minutes(other)
+                        other.insert(moved[0], blocker)
+                        plan.routes[driver] = shortened
+                        plan.unassigned.remove(stop)
+                        plan.total_minutes += self.route_minutes(shortened) + self.route_minutes(other) - before
+                        return True
+        return False
+
+    def _try_relocate(self, plan: Plan) -> bool:
+        for source, route in plan.routes.items():
+            for index in range(len(route)):
+                saved = self._removal(route, index)
+                if saved is None:
+                    continue
+                stop = route[index]
+                for target, other in plan.routes.items():
+                    if target == source:
+                        continue
+                    insertion = self._insertion(other, stop)
+                    if insertion is not None and insertion[1] - saved < -1e-9:
+                        del route[index]
+                        other.insert(insertion[0], stop)
+                        plan.total_minutes += insertion[1] - saved
+                        return True
+        return False
+
+    def _try_swap(self, plan: Plan) -> bool:
+        drivers = list(plan.routes)
+        for a_pos, a in enumerate(drivers):
+            for b in drivers[a_pos + 1:]:
+                route_a, route_b = plan.routes[a], plan.routes[b]
+                for i in range(len(route_a)):
+                    for j in range(len(route_b)):
+                        new_a = route_a[:i] + route_a[i + 1:]
+                        new_b = route_b[:j] + route_b[j + 1:]
+                        insert_a = self._insertion(new_a, route_b[j])
+                        insert_b = self._insertion(new_b, route_a[i])
+                        if insert_a is None or insert_b is None:
+                            continue
+                        new_a.insert(insert_a[0], route_b[j])
+                        new_b.insert(insert_b[0], route_a[i])
+                        # The gaps left behind must still be drivable
+                        if not (self.feasible(new_a) and self.feasible(new_b)):
+                            continue
+                        before = self.route_minutes(route_a) + self.route_minutes(route_b)
+                        after = self.route_minutes(new_a) + self.route_minutes(new_b)
+                        if after < before - 1e-9:
+                            plan.routes[a], plan.routes[b] = new_a, new_b
+                            plan.total_minutes += after - before
+                            return True
+        return False
+
+    def improve(self, plan: Plan) -> Plan:
+        deadline = time.perf_counter() + self.budget_seconds
+        moves = (self._try_insert_unassigned, self._try_make_room, self._try_relocate, self._try_swap)
+        while True:
+            if time.perf_counter() >= deadline:
+                plan.timed_out = True
+                break
+            # First improving move wins; start over from the cheapest move type
+            if not any(move(plan) for move in moves):
+                break
+            plan.moves += 1
+        return plan
+
+    def solve(self, stops: Sequence[Stop]) -> Plan:
+        plan = self.improve(self.greedy(stops))
+        # Recompute from scratch so float drift from deltas doesn't leak out
+        plan.minutes_by_driver = {driver: self.route_minutes(route) for driver, route in plan.routes.items()}
+        plan.total_minutes = sum(plan.minutes_by_driver.values())
+        for route in plan.routes.values():
+            prev_node = HOME_NODE
+            for stop in route:
+                plan.legs[stop.event_id] = self.travel[prev_node][stop.node]
+                prev_node = stop.node
+        return plan
+
+
+def _minutes_since(day_start: datetime.datetime, moment: datetime.datetime) -> float:
+    return (moment - day_start).total_seconds() / 60
+
+
+def plan_day(events, drivers: Sequence[int], day: datetime.date, budget_seconds: float = 0.2) -> Plan:
+    """Plans one day's events (ORM rows; those without a place are skipped) across `drivers`."""
+    day_start = datetime.datetime.combine(day, datetime.time.min)
+    stops, points = [], [HOME]
+    for event in events:
+        point = event_point(event)
+        if point is None or event.start_time is None:
+            continue
+        end = event.end_time if event.end_time and event.end_time > event.start_time else event.start_time
+        points.append(point)
+        stops.append(Stop(event.id, _minutes_since(day_start, event.start_time), _minutes_since(day_start, end), len(points) - 1))
+    travel = LogisticsService.get_drive_time_matrix(points, points) if stops else [[0]]
+    return DriverPlanner(travel, drivers, budget_seconds).solve(stops)
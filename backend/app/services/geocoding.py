@@ -0,0 +1,361 @@
+"""
+Geocoding: place names -> coordinates, cached by normalized query.
+
+Lookups go LRU -> geocoded_places table -> provider, so a repeated place
+("Lincoln Fields", "lincoln  fields.") is only sent to a provider once.
+Misses are cached too (a row without coordinates). Concurrent lookups of the
+same new place share one provider call. Provider errors are not cached.
+
+Autocomplete is answered only from places already resolved, through an
+in-process prefix index that is rebuilt from the table every
+GEOCODE_INDEX_TTL_SECONDS. That way other workers' places show up.
+
+Only real providers' results are stored in geocoded_places (and read back
+from it), so turning on a provider never serves another provider's points.
+
+Settings:
+    GEOCODER                   none | nominatim | local (default none: places stay
+                               unmapped; local is an offline stand-in for development)
+    GEOCODER_URL               Nominatim-compatible server (https://nominatim.openstreetmap.org)
+    GEOCODER_USER_AGENT        sent to Nominatim, which requires one
+    GEOCODE_LOCAL_CENTER       "lat,lng" the local stand-in places results around
+    GEOCODE_CACHE_SIZE         in-process LRU entries (2048)
+    GEOCODE_INDEX_TTL_SECONDS  autocomplete index refresh (60)
+"""
+import bisect
+import logging
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+from sqlalchemy import select
+
+from .. import models
+from ..database import insert_ignore_conflicts
+from .logistics import EARTH_RADIUS_KM, coords_key, parse_coords
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Concurrent first lookups of the same place share one provider call
+_geocode_flight = SingleFlight("geocode")
+
+
+def normalize_address(text: Optional[str]) -> str:
+    """ "Lincoln Fields, " / "lincoln  fields" -> "lincoln fields" """
+    if not text:
+        return ""
+    return re.sub(r"[\W_]+", " ", text.lower()).strip()
+
+
+@dataclass(frozen=True)
+class Place:
+    query_key: str
+    display_name: str
+    latitude: float
+    longitude: float
+    provider: str
+
+    @property
+    def coords(self) -> Tuple[float, float]:
+        return self.latitude, self.longitude
+
+
+# ──────────────────────────────────────────────
+# Providers
+# ──────────────────────────────────────────────
+
+class NullGeocoder:
+    """No geocoding (the default): places without coordinates stay unmapped."""
+
+    name = "none"
+    persistent = False
+
+    def geocode(self, query: str, key: str) -> Optional[Place]:
+        return None
+
+
+class LocalGeocoder:
+    """
+    Offline stand-in for development and tests. Every name gets a stable
+    point within `radius_km` of `center`, derived from its normalized text,
+    so distances between places are plausible and repeatable. The points are
+    made up, so they are never stored in geocoded_places.
+    """
+
+    name = "local"
+    persistent = False
+
+    def __init__(self, center: Tuple[float, float] = (37.7749, -122.4194), radius_km: float = 25.0):
+        self.center = center
+        self.radius_km = radius_km
+
+    def geocode(self, query: str, key: str) -> Optional[Place]:
+        h = zlib.crc32(key.encode())
+        bearing = math.radians(h % 360)
+        km = self.radius_km * ((h >> 9) % 1000) / 1000
+        lat = self.center[0] + math.degrees(km * math.cos(bearing) / EARTH_RADIUS_KM)
+        lng = self.center[1] + math.degrees(km * math.sin(bearing) / (EARTH_RADIUS_KM * math.cos(math.radians(self.center[0]))))
+        return Place(key, query.strip(), round(lat, 6), round(lng, 6), self.name)
+
+
+class NominatimGeocoder:
+    """
+    OpenStreetMap Nominatim (or a self-hosted instance). The public server
+    allows one request per second, so calls are spaced by `min_interval`.
+    """
+
+    name = "nominatim"
+    persistent = True
+
+    def __init__(self, base_url: str = "https://nominatim.openstreetmap.org", user_agent: str = "calendarapp",
+                 timeout: float = 5.0, min_interval: float = 1.0):
+        self.base_url = base_url.rstrip("/")
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._last_call = 0.0
+
+    def geocode(self, query: str, key: str) -> Optional[Place]:
+        with self._lock:
+            wait = self._last_call + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response = requests.get(
+                    f"{self.base_url}/search",
+                    params={"q": query, "format": "jsonv2", "limit": 1},
+                    headers={"User-Agent": self.user_agent},
+                    timeout=self.timeout,
+                )
+            finally:
+                self._last_call = time.monotonic()
+        response.raise_for_status()
+        results = response.json()
+        if not results:
+            return None
+        top = results[0]
+        return Place(key, top.get("display_name") or query.strip(), float(top["lat"]), float(top["lon"]), self.name)
+
+
+# ──────────────────────────────────────────────
+# Autocomplete index
+# ──────────────────────────────────────────────
+
+class PrefixIndex:
+    """
+    Sorted (term, place key) pairs searched with bisect. Every word of a place
+    is a term, so "fie" finds "lincoln fields" as well as "fields market".
+    """
+
+    def __init__(self, places: Iterable[Place] = ()):
+        self.places: Dict[str, Place] = {}
+        self._terms: List[Tuple[str, str]] = []
+        for place in places:
+            self.add(place)
+
+    def add(self, place: Place):
+        if place.query_key in self.places:
+            return
+        self.places[place.query_key] = place
+        words = place.query_key.split(" ")
+        for i in range(len(words)):
+            bisect.insort(self._terms, (" ".join(words[i:]), place.query_key))
+
+    def search(self, prefix: str, limit: int = 5) -> List[Place]:
+        whole, partial = [], []
+        i = bisect.bisect_left(self._terms, (prefix, ""))
+        while i < len(self._terms) and self._terms[i][0].startswith(prefix):
+            term, key = self._terms[i]
+            # Places whose name starts with the prefix rank above mid-name matches
+            (whole if term == key else partial).append(key)
+            i += 1
+        keys = list(dict.fromkeys(whole + partial))[:limit]
+        return [self.places[key] for key in keys]
+
+    def __len__(self):
+        return len(self.places)
+
+
+# ──────────────────────────────────────────────
+# Geocoder: LRU -> table -> provider
+# ──────────────────────────────────────────────
+
+class Geocoder:
+    def __init__(self, provider=None, cache_size: int = 2048, index_ttl: float = 60.0):
+        self.provider = provider or NullGeocoder()
+        self.cache_size = cache_size
+        self.index_ttl = index_ttl
+        # key -> Place, or None for "provider found nothing"
+        self._cache: "OrderedDict[str, Optional[Place]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._index = PrefixIndex()
+        self._index_loaded_at: Optional[float] = None
+        self.hits = 0
+        self.table_hits = 0
+        self.provider_calls = 0
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._index = PrefixIndex()
+            self._index_loaded_at = None
+            self.hits = self.table_hits = self.provider_calls = 0
+
+    def _remember(self, values: Dict[str, Optional[Place]]):
+        with self._lock:
+            for key, place in values.items():
+                self._cache[key] = place
+                self._cache.move_to_end(key)
+                if place is not None:
+                    self._index.add(place)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _lookup(self, query: str, key: str) -> Optional[Place]:
+        self.provider_calls += 1
+        return self.provider.geocode(query, key)
+
+    def resolve_many(self, queries: Iterable[Optional[str]], db=None) -> Dict[str, Optional[Place]]:
+        """
+        Resolves many place names at once: one table read for all of them,
+        and provider calls only for names never seen before. With `db`, the
+        table is consulted and new results are added in the caller's
+        transaction. Returns {query: Place or None}; blank queries are skipped.
+        """
+        queries_by_key: Dict[str, List[str]] = {}
+        given: Dict[str, Place] = {}
+        for query in queries:
+            coords = parse_coords(query)
+            if coords is not None:
+                # Already a "lat,lng" (e.g. picked on a map): nothing to look up
+                given[query] = Place(coords_key(coords), query, coords[0], coords[1], "coordinates")
+                continue
+            key = normalize_address(query)
+            if key:
+                queries_by_key.setdefault(key, []).append(query)
+
+        found: Dict[str, Optional[Place]] = {}
+        with self._lock:
+            for key in queries_by_key:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+            self.hits += len(found)
+
+        missing = [key for key in queries_by_key if key not in found]
+        persist = db is not None and self.persistent
+        if missing and persist:
+            stored = {}
+            rows = db.scalars(select(models.GeocodedPlace).where(
+                models.GeocodedPlace.query_key.in_(missing), models.GeocodedPlace.provider == self.provider.name,
+            ))
+            for row in rows:
+                stored[row.query_key] = _place_from_row(row)
+            self.table_hits += len(stored)
+            self._remember(stored)
+            found.update(stored)
+            missing = [key for key in missing if key not in found]
+
+        resolved = {}
+        for key in missing:
+            query = queries_by_key[key][0]
+            try:
+                resolved[key] = _geocode_flight.do(key, lambda: self._lookup(query, key))
+            except Exception as e:
+                logger.warning("Geocoding %r with %s failed: %s", query, self.provider.name, e)
+                found[key] = None
+        self._remember(resolved)
+        found.update(resolved)
+
+        if resolved and persist:
+            insert_ignore_conflicts(db, models.GeocodedPlace, [
+                {
+                    "query_key": key,
+                    "display_name": place.display_name if place else queries_by_key[key][0].strip(),
+                    "latitude": place.latitude if place else None,
+                    "longitude": place.longitude if place else None,
+                    "provider": self.provider.name,
+                }
+                for key, place in resolved.items()
+            ])
+
+        results = {query: found[key] for key, queries_for_key in queries_by_key.items() for query in queries_for_key}
+        results.update(given)
+        return results
+
+    @property
+    def persistent(self) -> bool:
+        """Whether this provider's points are real enough to store (table rows, event coordinates)."""
+        return getattr(self.provider, "persistent", True)
+
+    def resolve(self, query: Optional[str], db=None) -> Optional[Place]:
+        return self.resolve_many([query], db).get(query)
+
+    def _refresh_index(self, db):
+        if self._index_loaded_at is not None and time.monotonic() - self._index_loaded_at < self.index_ttl:
+            return
+        rows = db.scalars(select(models.GeocodedPlace).where(
+            models.GeocodedPlace.provider == self.provider.name, models.GeocodedPlace.latitude.is_not(None),
+        )) if self.persistent else ()
+        index = PrefixIndex(_place_from_row(row) for row in rows)
+        with self._lock:
+            # Keep places this worker resolved since the read started
+            for place in self._index.places.values():
+                index.add(place)
+            self._index = index
+            self._index_loaded_at = time.monotonic()
+
+    def autocomplete(self, prefix: str, db=None, limit: int = 5) -> List[Place]:
+        """Already-resolved places matching `prefix`; never calls the provider."""
+        key = normalize_address(prefix)
+        if not key:
+            return []
+        if db is not None:
+            self._refresh_index(db)
+        return self._index.search(key, limit)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "provider": self.provider.name,
+            "cached": len(self._cache),
+            "indexed": len(self._index),
+            "hits": self.hits,
+            "table_hits": self.table_hits,
+            "provider_calls": self.provider_calls,
+        }
+
+
+def _place_from_row(row) -> Optional[Place]:
+    if row.latitude is None or row.longitude is None:
+        return None
+    return Place(row.query_key, row.display_name, row.latitude, row.longitude, row.provider)
+
+
+def _default_geocoder() -> Geocoder:
+    name = os.getenv("GEOCODER", "none")
+    if name == "nominatim":
+        provider = NominatimGeocoder(
+            os.getenv("GEOCODER_URL") or "https://nominatim.openstreetmap.org",
+            user_agent=os.getenv("GEOCODER_USER_AGENT") or "calendarapp",
+        )
+    elif name == "local":
+        provider = LocalGeocoder(parse_coords(os.getenv("GEOCODE_LOCAL_CENTER")) or (37.7749, -122.4194))
+    else:
+        provider = NullGeocoder()
+    return Geocoder(
+        provider,
+        cache_size=int(os.getenv("GEOCODE_CACHE_SIZE", "2048")),
+        index_ttl=float(os.getenv("GEOCODE_INDEX_TTL_SECONDS", "60")),
+    )
+
+
+geocoder = _default_geocoder()
@@ -0,0 +1,150 @@
+import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .. import models
+from ..database import insert_returning
+from .conflicts import check_batch
+from .geocoding import geocoder
+from .logistics import LogisticsService, grid_cell
+
+
+def _match_user(name: Optional[str], members: List[models.User]) -> Optional[models.User]:
+    """Resolves a name from the parsed payload ("Jake", "jake smith") to a family member."""
+    if not name:
+        return None
+    wanted = name.strip().lower()
+    for member in members:
+        full = (member.name or "").lower()
+        if wanted == full or wanted == full.split(" ")[0]:
+            return member
+    return None
+
+
+def apply_parsed_intents(
+    db: Session,
+    user: models.User,
+    events: List[Dict[str, Any]],
+    shopping_list: List[Dict[str, Any]],
+    todos: List[Dict[str, Any]],
+) -> Dict[str, List[Any]]:
+    """
+    Inserts everything an assistant utterance produced in one transaction:
+    one multi-row INSERT ... RETURNING per table plus one for attendee links,
+    and a single commit. Nothing is written if any statement fails.
+
+    Relationships on the returned objects are filled in from data we already
+    hold, so serialising the result doesn't trigger per-row lazy loads.
+    New events that double-book someone come back under "conflicts".
+    """
+    members = []
+    if user.family_id:
+        members = db.scalars(select(models.User).where(models.User.family_id == user.family_id)).all()
+    if user not in members:
+        members = list(members) + [user]
+    members_by_id = {m.id: m for m in members}
+
+    try:
+        created_events = []
+        warnings = []
+        if events:
+            event_rows = []
+            event_attendees = []
+            # One geocode batch for every location in the utterance (stand-in points aren't stored)
+            coordinates = {}
+            if geocoder.persistent:
+                coordinates = LogisticsService.resolve_locations([event.get("location") for event in events], db)
+            for event in events:
+                start = event["start_time"]
+                end = event.get("end_time") or start + datetime.timedelta(hours=1)
+                location = event.get("location")
+                latitude, longitude = coordinates.get(location, (None, None))
+                event_rows.append({
+                    "title": event["title"],
+                    "description": event.get("description"),
+                    "location": location,
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "geo_cell": grid_cell(latitude, longitude),
+                    "start_time": start,
+                    "end_time": end,
+                    "category": event.get("category") or "General",
+                    "family_id": user.family_id,
+                    "created_by_user_id": user.id,
+                })
+                attendees = [members_by_id[i] for i in event.get("attendee_ids", []) if i in members_by_id]
+                for name in event.get("attendees", []):
+                    member = _match_user(name, members)
+                    if member and member not in attendees:
+                        attendees.append(member)
+                event_attendees.append(attendees)
+
+            created_events = insert_returning(db, models.Event, event_rows)
+
+            links = [
+                {"event_id": created.id, "user_id": attendee.id}
+                for created, attendees in zip(created_events, event_attendees)
+                for attendee in attendees
+            ]
+            if links:
+                db.execute(insert(models.event_attendees), links)
+
+            for created, attendees in zip(created_events, event_attendees):
+                set_committed_value(created, "attendees", attendees)
+                set_committed_value(created, "driver", None)
+
+            warnings = check_batch(db, user.family_id, created_events)
+
+        created_items = []
+        if shopping_list:
+            now = datetime.datetime.utcnow()
+            created_items = insert_returning(
+                db,
+                models.ShoppingItem,
+                [
+                    {
+                        "name": item["name"],
+                        "category": item.get("category") or "General",
+                        "is_bought": False,
+                        "created_at": now,
+                        "family_id": user.family_id,
+                        "added_by_user_id": user.id,
+                    }
+                    for item in shopping_list
+                ],
+            )
+            for created in created_items:
+                set_committed_value(created, "added_by", user)
+
+        created_todos = []
+        if todos:
+            todo_rows = []
+            assignees = []
+            for todo in todos:
+                assignee = members_by_id.get(todo.get("assigned_to_user_id")) or _match_user(todo.get("assigned_to"), members)
+                assignees.append(assignee)
+                todo_rows.append({
+                    "title": todo["title"],
+                    "status": "pending",
+                    "due_date": todo.get("due_date"),
+                    "family_id": user.family_id,
+                    "assigned_to_user_id": assignee.id if assignee else None,
+                    "created_by_user_id": user.id,
+                })
+            created_todos = insert_returning(db, models.ToDo, todo_rows)
+            for created, assignee in zip(created_todos, assignees):
+                set_committed_value(created, "assigned_to", assignee)
+                set_committed_value(created, "created_by", user)
+    except Exception:
+        db.rollback()
+        raise
+
+    return {
+        "events": created_events,
+        "shopping_list": created_items,
+        "todos": created_todos,
+        "conflicts": warnings,
+    }
@@ -0,0 +1,437 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..telemetry import llm_call
+
+GEMINI_MODEL = "gemini-2.0-flash"
+OPENAI_MODEL = "gpt-4o-mini"
+
+# Shared pool for primary + hedged calls. A losing call can't be cancelled
+# (the SDKs block on HTTP), so it finishes in the background and only feeds stats.
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_MAX_WORKERS", "16")), thread_name_prefix="llm")
+
+
+def hedging_enabled() -> bool:
+    return os.getenv("LLM_HEDGING", "1") not in ("0", "false", "False")
+
+
+# ──────────────────────────────────────────────
+# Client registry
+# ──────────────────────────────────────────────
+
+# The SDKs are heavy (openai and google-genai each take ~0.7s to import) and most
+# requests never touch them, so they're imported on first use, here only.
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+class ProviderNotConfigured(RuntimeError):
+    pass
+
+
+def genai_types():
+    """google.genai.types, imported on first use."""
+    from google.genai import types
+    return types
+
+
+def _build_client(provider: str, api_key: str):
+    if provider == "openai":
+        from openai import OpenAI
+        return OpenAI(api_key=api_key)
+    from google import genai
+    return genai.Client(api_key=api_key)
+
+
+def get_client(provider: str):
+    """
+    Returns a shared SDK client for "openai" or "gemini", or None when the
+    provider has no API key configured.
+    """
+    with _clients_lock:
+        if provider in _clients:
+            return _clients[provider]
+
+        if provider == "openai":
+            api_key = os.getenv("OPENAI_API_KEY")
+        elif provider == "gemini":
+            api_key = os.getenv("GEMINI_API_KEY")
+        else:
+            raise ValueError(f"Unknown LLM provider: {provider}")
+
+        client = _build_client(provider, api_key) if api_key else None
+        _clients[provider] = client
+        return client
+
+
+def require_client(provider: str):
+    """get_client() for callers that can't do without the provider."""
+    client = get_client(provider)
+    if client is None:
+        raise ProviderNotConfigured(f"{provider} API key is not configured")
+    return client
+
+
+def reset_clients():
+    with _clients_lock:
+        _clients.clear()
+
+
+# ──────────────────────────────────────────────
+# Provider health: latency window + circuit breaker
+# ──────────────────────────────────────────────
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures (slow calls count as
+    failures), rejects calls for `reset_timeout` seconds, then lets a single
+    trial call through (half-open) before closing again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, slow_call_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now. Unlike allow(), doesn't take the trial."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not self._trial_in_flight
+
+    def allow(self) -> bool:
+        return self.admit() is not None
+
+    def admit(self) -> Optional[bool]:
+        """
+        None if the call is rejected; otherwise whether it is the half-open
+        trial. Pass that to release() once the call is over.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return None
+
+    def release(self, trial: bool):
+        """Frees the trial slot even if the call never recorded an outcome (cancelled, abandoned stream)."""
+        if trial:
+            with self._lock:
+                self._trial_in_flight = False
+
+    def record_success(self, latency: float):
+        if latency >= self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class ProviderHealth:
+    def __init__(self, window: int = 200):
+        self.latencies = deque(maxlen=window)
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+            slow_call_seconds=float(os.getenv("LLM_SLOW_CALL_SECONDS", "30")),
+        )
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+        self.hedges = 0
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 20:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "wins": self.wins,
+            "hedges": self.hedges,
+            "p95_seconds": self.p95(),
+            "breaker": self.breaker.state,
+        }
+
+
+_health: Dict[str, ProviderHealth] = {}
+
+
+def health(provider: str) -> ProviderHealth:
+    if provider not in _health:
+        _health[provider] = ProviderHealth()
+    return _health[provider]
+
+
+def reset_health():
+    _health.clear()
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: h.stats() for name, h in _health.items()}
+
+
+# ──────────────────────────────────────────────
+# Providers
+# ──────────────────────────────────────────────
+
+class LLMProvider:
+    name = "base"
+
+    def generate(self, prompt: str, system: Optional[str] = None, json_mode: bool = True) -> str:
+        raise NotImplementedError
+
+    def generate_stream(self, prompt: str, system: Optional[str] = None, json_mode: bool = True) -> Iterator[str]:
+        """Yields the response text incrementally as the provider produces it."""
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, client, model: str = GEMINI_MODEL):
+        self.client = client
+        self.model = model
+
+    def generate(self, prompt: str, system: Optional[str] = None, json_mode: bool = True) -> str:
+        contents = f"{system}\n\n{prompt}" if system else prompt
+        config = genai_types().GenerateContentConfig(response_mime_type='application/json') if json_mode else None
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=contents,
+            config=config
+        )
+        return response.text
+
+    def generate_stream(self, prompt: str, system: Optional[str] = None, json_mode: bool = True) -> Iterator[str]:
+        contents = f"{system}\n\n{prompt}" if system else prompt
+        config = genai_types().GenerateContentConfig(response_mime_type='application/json') if json_mode else None
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model,
+            contents=contents,
+            config=config
+        ):
+            if chunk.text:
+                yield chunk.text
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(self, client, model: str = OPENAI_MODEL):
+        self.client = client
+        self.model = model
+
+    def generate(self, prompt: str, system: Optional[str] = None, json_mode: bool = True) -> str:
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            temperature=0.0,
+            messages=messages,
+            **kwargs
+        )
+        return response.choices[0].message.content.strip()
+
+    def generate_stream(self, prompt: str, system: Optional[str] = None, json_mode: bool = True) -> Iterator[str]:
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+        for chunk in self.client.chat.completions.create(
+            model=self.model,
+            temperature=0.0,
+            messages=messages,
+            stream=True,
+            **kwargs
+        ):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+def alternate_provider(primary: str) -> Optional[LLMProvider]:
+    """Builds the provider to hedge against `primary`, if hedging is on and it has credentials."""
+    if not hedging_enabled():
+        return None
+    if primary == "gemini":
+        client = get_client("openai")
+        return OpenAIProvider(client) if client else None
+    client = get_client("gemini")
+    return GeminiProvider(client) if client else None
+
+
+# ──────────────────────────────────────────────
+# Hedged execution
+# ──────────────────────────────────────────────
+
+class AllProvidersFailed(Exception):
+    pass
+
+
+class HedgedLLM:
+    """
+    Sends the request to the first healthy provider. If it hasn't answered
+    within its p95 latency (or fails outright), a second request goes to the
+    next healthy provider and whichever succeeds first wins.
+    """
+
+    def __init__(self, providers: List[Optional[LLMProvider]], default_hedge_delay: Optional[float] = None):
+        self.providers = [p for p in providers if p is not None]
+        if default_hedge_delay is None:
+            default_hedge_delay = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "3.0"))
+        self.default_hedge_delay = default_hedge_delay
+
+    def hedge_delay(self, provider: LLMProvider) -> float:
+        p95 = health(provider.name).p95()
+        return p95 if p95 is not None else self.default_hedge_delay
+
+    @staticmethod
+    def _admit_next(remaining: List[LLMProvider]) -> Optional[Tuple[LLMProvider, bool]]:
+        """
+        Takes the next provider whose breaker admits a call, as (provider,
+        holds the half-open trial). Breakers are only asked right before a
+        launch, so a provider that is never called never holds the trial.
+        """
+        while remaining:
+            provider = remaining.pop(0)
+            trial = health(provider.name).breaker.admit()
+            if trial is not None:
+                return provider, trial
+        return None
+
+    def _call(self, provider: LLMProvider, trial: bool, prompt: str, system: Optional[str], json_mode: bool) -> str:
+        provider_health = health(provider.name)
+        provider_health.calls += 1
+        started = time.perf_counter()
+        try:
+            try:
+                with llm_call(provider.name):
+                    text = provider.generate(prompt, system=system, json_mode=json_mode)
+            except Exception:
+                provider_health.errors += 1
+                provider_health.breaker.record_failure()
+                raise
+            latency = time.perf_counter() - started
+            provider_health.latencies.append(latency)
+            provider_health.breaker.record_success(latency)
+            return text
+        finally:
+            provider_health.breaker.release(trial)
+
+    def generate(self, prompt: str, system: Optional[str] = None, json_mode: bool = True) -> str:
+        remaining = [p for p in self.providers if health(p.name).breaker.available()]
+        first = self._admit_next(remaining)
+        if first is None:
+            raise AllProvidersFailed("All LLM providers are unavailable (circuit open)")
+
+        # Single provider: no point paying for a thread hop
+        if not remaining:
+            result = self._call(*first, prompt, system, json_mode)
+            health(first[0].name).wins += 1
+            return result
+
+        pending = {}
+
+        def launch(admitted):
+            provider, trial = admitted
+            # Run in a copy of this context so the call's time lands on the current request
+            context = contextvars.copy_context()
+            future = _executor.submit(context.run, self._call, provider, trial, prompt, system, json_mode)
+            pending[future] = provider
+
+        launch(first)
+        last_error = None
+        done, _ = wait(list(pending), timeout=self.hedge_delay(first[0]))
+        if not done:
+            hedge = self._admit_next(remaining)
+            if hedge is not None:
+                health(hedge[0].name).hedges += 1
+                launch(hedge)
+
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    # Failed fast: hedge immediately rather than waiting out the delay
+                    fallback = self._admit_next(remaining)
+                    if fallback is not None:
+                        launch(fallback)
+                    continue
+                health(provider.name).wins += 1
+                return result
+
+        raise last_error or AllProvidersFailed("All LLM providers failed")
+
+    def stream(self, prompt: str, system: Optional[str] = None, json_mode: bool = True) -> Iterator[str]:
+        """
+        Streams from the first healthy provider. Streams aren't hedged (the
+        first tokens are already on their way to the client), but failures and
+        latency still feed the provider's breaker.
+        """
+        admitted = self._admit_next([p for p in self.providers if health(p.name).breaker.available()])
+        if admitted is None:
+            raise AllProvidersFailed("All LLM providers are unavailable (circuit open)")
+
+        provider, trial = admitted
+        provider_health = health(provider.name)
+        provider_health.calls += 1
+        started = time.perf_counter()
+        try:
+            try:
+                with llm_call(provider.name):
+                    for text in provider.generate_stream(prompt, system=system, json_mode=json_mode):
+                        yield text
+            except Exception:
+                provider_health.errors += 1
+                provider_health.breaker.record_failure()
+                raise
+            latency = time.perf_counter() - started
+            provider_health.latencies.append(latency)
+            provider_health.breaker.record_success(latency)
+            provider_health.wins += 1
+        finally:
+            # Also runs when the consumer stops early (GeneratorExit)
+            provider_health.breaker.release(trial)
@@ -1,47 +1,493 @@
-import random
-from typing import Optional, Tuple
+import logging
+import math
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Coordinates are rounded to this many decimals (~11 m) for cache/table keys
+KEY_PRECISION = 4
+
+Coords = Tuple[float, float]
+
+
+def parse_coords(value: Optional[str]) -> Optional[Coords]:
+    """"47.61,-122.33" -> (47.61, -122.33); anything else -> None."""
+    if not value or "," not in value:
+        return None
+    try:
+        lat, lng = (float(part) for part in value.split(",", 1))
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def coords_key(coords: Coords) -> str:
+    return f"{coords[0]:.{KEY_PRECISION}f},{coords[1]:.{KEY_PRECISION}f}"
+
+
+def haversine_km(a: Coords, b: Coords) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+
+
+def haversine_matrix_km(origins: Sequence[Coords], destinations: Sequence[Coords]):
+    """Great-circle distances for every origin x destination pair in one NumPy pass."""
+    import numpy as np  # only the batch path needs it
+
+    o = np.radians(np.asarray(origins, dtype=float))
+    d = np.radians(np.asarray(destinations, dtype=float))
+    lat1, lng1 = o[:, 0:1], o[:, 1:2]
+    lat2, lng2 = d[:, 0], d[:, 1]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+# ──────────────────────────────────────────────
+# Grid cells
+# ──────────────────────────────────────────────
+
+# Spatial index for "near me" queries: the globe is cut into GRID_DEGREES
+# squares (~28 km north-south), numbered row by row from (-90, -180)
+GRID_DEGREES = 0.25
+_GRID_ROWS = int(180 / GRID_DEGREES)
+_GRID_COLUMNS = int(360 / GRID_DEGREES)
+
+
+def _grid_row(lat: float) -> int:
+    return min(max(int((lat + 90) // GRID_DEGREES), 0), _GRID_ROWS - 1)
+
+
+def grid_cell(lat: Optional[float], lng: Optional[float]) -> Optional[int]:
+    if lat is None or lng is None:
+        return None
+    return _grid_row(lat) * _GRID_COLUMNS + int((lng + 180) // GRID_DEGREES) % _GRID_COLUMNS
+
+
+def grid_cells_within(center: Coords, radius_km: float) -> List[int]:
+    """Every cell touching the bounding box of the circle around `center`."""
+    lat, lng = center
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lat_lo, lat_hi = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    # Degrees of longitude shrink toward the poles: size the box for its poleward edge
+    poleward = max(abs(lat_lo), abs(lat_hi))
+    cos_lat = math.cos(math.radians(poleward))
+    dlng = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)) if cos_lat > 1e-9 else 180.0
+    if dlng >= 180:
+        columns = range(_GRID_COLUMNS)
+    else:
+        first = int((lng - dlng + 180) // GRID_DEGREES)
+        last = int((lng + dlng + 180) // GRID_DEGREES)
+        # Wraps across the antimeridian
+        columns = sorted({c % _GRID_COLUMNS for c in range(first, last + 1)})
+    return [row * _GRID_COLUMNS + column for row in range(_grid_row(lat_lo), _grid_row(lat_hi) + 1) for column in columns]
+
+
+# ──────────────────────────────────────────────
+# Speed profiles
+# ──────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class SpeedProfile:
+    """
+    Turns straight-line distance into travel time. Road distance is the
+    great-circle distance times `circuity`; it is then covered in tiers (the
+    first few km at city speed, then arterial, then highway), plus a fixed
+    `overhead_minutes` for parking / getting going on any non-zero trip.
+    """
+
+    name: str
+    circuity: float
+    # (tier length in km or None for "the rest", speed in km/h)
+    tiers: Tuple[Tuple[Optional[float], float], ...]
+    overhead_minutes: float = 0.0
+
+    def minutes(self, km: float) -> float:
+        if km <= 0:
+            return 0.0
+        remaining = km * self.circuity
+        hours = 0.0
+        for length, speed in self.tiers:
+            part = remaining if length is None else min(remaining, length)
+            hours += part / speed
+            remaining -= part
+            if remaining <= 0:
+                break
+        return hours * 60 + self.overhead_minutes
+
+    def minutes_array(self, km):
+        """minutes() over a NumPy array of distances."""
+        import numpy as np
+
+        road = np.asarray(km, dtype=float) * self.circuity
+        hours = np.zeros_like(road)
+        start = 0.0
+        for length, speed in self.tiers:
+            span = road - start if length is None else np.clip(road - start, 0.0, length)
+            hours += np.maximum(span, 0.0) / speed
+            if length is None:
+                break
+            start += length
+        return np.where(road > 0, hours * 60 + self.overhead_minutes, 0.0)
+
+
+SPEED_PROFILES: Dict[str, SpeedProfile] = {
+    "driving": SpeedProfile("driving", circuity=1.3, tiers=((5.0, 25.0), (25.0, 45.0), (None, 80.0)), overhead_minutes=3.0),
+    "cycling": SpeedProfile("cycling", circuity=1.2, tiers=((None, 15.0),), overhead_minutes=1.0),
+    "walking": SpeedProfile("walking", circuity=1.2, tiers=((None, 4.8),)),
+}
+
+
+def _whole_minutes(minutes: float) -> int:
+    # Any real trip is at least a minute; identical points are zero
+    return max(int(round(minutes)), 1) if minutes > 0 else 0
+
+
+# ──────────────────────────────────────────────
+# Backends
+# ──────────────────────────────────────────────
+
+class HaversineBackend:
+    """Local, dependency-free estimate. Cheap enough that results aren't persisted."""
+
+    name = "haversine"
+    persist = False
+
+    def table(self, origins: Sequence[Coords], destinations: Sequence[Coords], profile: SpeedProfile) -> List[List[float]]:
+        if len(origins) * len(destinations) == 1:
+            return [[profile.minutes(haversine_km(origins[0], destinations[0]))]]
+        return profile.minutes_array(haversine_matrix_km(origins, destinations)).tolist()
+
+
+class OSRMBackend:
+    """
+    Any server speaking OSRM's /table API (OSRM itself, or a local stand-in),
+    e.g. ROUTING_URL=http://localhost:5000. Errors propagate; RoutingEngine
+    falls back to the haversine estimate.
+    """
+
+    name = "osrm"
+    persist = True
+
+    def __init__(self, base_url: str, timeout: float = 5.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def table(self, origins: Sequence[Coords], destinations: Sequence[Coords], profile: SpeedProfile) -> List[List[float]]:
+        points = list(origins) + list(destinations)
+        coordinates = ";".join(f"{lng},{lat}" for lat, lng in points)
+        params = {
+            "sources": ";".join(str(i) for i in range(len(origins))),
+            "destinations": ";".join(str(i) for i in range(len(origins), len(points))),
+            "annotations": "duration",
+        }
+        response = requests.get(f"{self.base_url}/table/v1/{profile.name}/{coordinates}", params=params, timeout=self.timeout)
+        response.raise_for_status()
+        durations = response.json()["durations"]
+        # OSRM reports seconds, and null for unroutable pairs
+        return [
+            [seconds / 60 if seconds is not None else profile.minutes(haversine_km(o, d)) for seconds, d in zip(row, destinations)]
+            for row, o in zip(durations, origins)
+        ]
+
+
+# ──────────────────────────────────────────────
+# Persistent table
+# ──────────────────────────────────────────────
+
+class TravelTimeStore:
+    """Reads/writes the travel_times table for backends whose results are worth keeping."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    def get_many(self, pairs: Iterable[Tuple[str, str]], profile: str) -> Dict[Tuple[str, str], float]:
+        from sqlalchemy import select
+        from .. import models
+
+        pairs = set(pairs)
+        if not pairs:
+            return {}
+        origins = {o for o, _ in pairs}
+        destinations = {d for _, d in pairs}
+        with self.session_factory() as session:
+            rows = session.execute(
+                select(models.TravelTime.origin_key, models.TravelTime.dest_key, models.TravelTime.minutes).where(
+                    models.TravelTime.profile == profile,
+                    models.TravelTime.origin_key.in_(origins),
+                    models.TravelTime.dest_key.in_(destinations),
+                )
+            ).all()
+        return {(o, d): minutes for o, d, minutes in rows if (o, d) in pairs}
+
+    def put_many(self, values: Dict[Tuple[str, str], float], profile: str, source: str):
+        from .. import models
+        from ..database import insert_ignore_conflicts
+
+        if not values:
+            return
+        rows = [
+            {"origin_key": o, "dest_key": d, "profile": profile, "minutes": minutes, "source": source}
+            for (o, d), minutes in values.items()
+        ]
+        with self.session_factory() as session:
+            # Concurrent workers may route the same pair; first writer wins
+            insert_ignore_conflicts(session, models.TravelTime, rows)
+            session.commit()
+
+
+# ──────────────────────────────────────────────
+# Engine: LRU -> table -> backend
+# ──────────────────────────────────────────────
+
+class RoutingEngine:
+    def __init__(self, backend=None, cache_size: int = 4096, store: Optional[TravelTimeStore] = None):
+        self.backend = backend or HaversineBackend()
+        self.fallback = HaversineBackend()
+        self.cache_size = cache_size
+        self.store = store
+        self._cache: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_put_many(self, values: Dict[Tuple[str, str], float], profile_name: str):
+        with self._lock:
+            for (o_key, d_key), minutes in values.items():
+                key = (o_key, d_key, profile_name)
+                self._cache[key] = minutes
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    def matrix(self, origins: Sequence[Coords], destinations: Sequence[Coords], profile_name: str = "driving") -> List[List[float]]:
+        """Minutes for every origin x destination, computing only what no cache layer has."""
+        profile = SPEED_PROFILES[profile_name]
+        o_keys = [coords_key(o) for o in origins]
+        d_keys = [coords_key(d) for d in destinations]
+
+        result: List[List[Optional[float]]] = [[None] * len(destinations) for _ in origins]
+        # (origin key, destination key) -> cells that need it
+        missing: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+        with self._lock:
+            for i, o_key in enumerate(o_keys):
+                row = result[i]
+                for j, d_key in enumerate(d_keys):
+                    if o_key == d_key:
+                        row[j] = 0.0
+                    elif (o_key, d_key) in missing:
+                        missing[o_key, d_key].append((i, j))
+                    else:
+                        key = (o_key, d_key, profile_name)
+                        minutes = self._cache.get(key)
+                        if minutes is None:
+                            self.misses += 1
+                            missing[o_key, d_key] = [(i, j)]
+                        else:
+                            self.hits += 1
+                            self._cache.move_to_end(key)
+                            row[j] = minutes
+
+        persist = self.store is not None and self.backend.persist
+        if missing and persist:
+            stored = self.store.get_many(missing, profile_name)
+            self._cache_put_many(stored, profile_name)
+            for key, minutes in stored.items():
+                for i, j in missing.pop(key):
+                    result[i][j] = minutes
+
+        if missing:
+            # One backend call covering just the rows/columns that still have gaps
+            rows = sorted({i for cells in missing.values() for i, _ in cells})
+            cols = sorted({j for cells in missing.values() for _, j in cells})
+            sub_origins = [origins[i] for i in rows]
+            sub_destinations = [destinations[j] for j in cols]
+            try:
+                table = self.backend.table(sub_origins, sub_destinations, profile)
+            except Exception as e:
+                logger.warning("Routing backend %s failed, using haversine estimate: %s", self.backend.name, e)
+                table = self.fallback.table(sub_origins, sub_destinations, profile)
+                persist = False
+            row_at = {i: r for r, i in enumerate(rows)}
+            col_at = {j: c for c, j in enumerate(cols)}
+
+            computed = {}
+            for key, cells in missing.items():
+                i, j = cells[0]
+                minutes = computed[key] = table[row_at[i]][col_at[j]]
+                for i, j in cells:
+                    result[i][j] = minutes
+            self._cache_put_many(computed, profile_name)
+            if persist:
+                self.store.put_many(computed, profile_name, self.backend.name)
+
+        return result
+
+    def minutes(self, origin: Coords, destination: Coords, profile_name: str = "driving") -> float:
+        return self.matrix([origin], [destination], profile_name)[0][0]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": self.backend.name,
+            "cached_pairs": len(self._cache),
+            "cache_size": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _default_engine() -> RoutingEngine:
+    cache_size = int(os.getenv("ROUTING_CACHE_SIZE", "4096"))
+    routing_url = os.getenv("ROUTING_URL")
+    if not routing_url:
+        return RoutingEngine(HaversineBackend(), cache_size)
+    from ..database import SessionLocal
+
+    return RoutingEngine(OSRMBackend(routing_url), cache_size, store=TravelTimeStore(SessionLocal))
+
+
+engine = _default_engine()
+
 
 class LogisticsService:
     """
     Service to calculate drive times and distances between locations.
-    Currently uses a mock implementation. In production, swap with OSRM or Google Maps API.
+    "lat,long" endpoints are routed by the module's RoutingEngine (haversine
+    + speed profiles locally, or an OSRM-compatible server via ROUTING_URL),
+    behind an LRU and, for server results, the travel_times table.
     """
-    
+
+    @staticmethod
+    def _placeholder_minutes(origin: str, destination: str) -> int:
+        # Places the geocoder can't put on the map ("Home", "Lincoln High") keep the
+        # old stable 15-45 minute estimate, 0 to themselves and the same both ways;
+        # crc32 instead of seeding the global RNG
+        from .geocoding import normalize_address
+
+        first, second = sorted((normalize_address(origin), normalize_address(destination)))
+        if first == second:
+            return 0
+        return 15 + zlib.crc32(f"{first}|{second}".encode()) % 31
+
     @staticmethod
-    def get_drive_time(origin_coords: str, dest_coords: str) -> int:
+    def _route_points(places: Iterable[Optional[str]]) -> Dict[str, Coords]:
+        """{place: (lat, lng)} for "lat,long" strings and names the geocoder knows (LRU / provider, no table)."""
+        from .geocoding import geocoder
+
+        return {query: place.coords for query, place in geocoder.resolve_many(places).items() if place is not None}
+
+    @staticmethod
+    def get_drive_time(origin_coords: str, dest_coords: str, profile: str = "driving") -> int:
         """
-        Calculate drive time in minutes between two "lat,long" strings.
-        
+        Calculate drive time in minutes between two "lat,long" strings (or
+        place names, geocoded first).
+
         Args:
             origin_coords: "lat,long" string
             dest_coords: "lat,long" string
-            
+            profile: key of SPEED_PROFILES
+
         Returns:
             int: Estimated drive time in minutes
         """
         if not origin_coords or not dest_coords:
             return 0
-            
-        # Mock logic: deterministic hash of strings to get a "random" but stable number
-        # Real logic: call Google Routes API
-        seed = len(origin_coords) + len(dest_coords)
-        random.seed(seed)
-        return random.randint(15, 45)
-    
+
+        points = LogisticsService._route_points((origin_coords, dest_coords))
+        origin, destination = points.get(origin_coords), points.get(dest_coords)
+        if origin is None or destination is None:
+            return LogisticsService._placeholder_minutes(origin_coords, dest_coords)
+        return _whole_minutes(engine.minutes(origin, destination, profile))
+
+    @staticmethod
+    def get_drive_time_matrix(origins: Sequence[str], destinations: Sequence[str], profile: str = "driving") -> List[List[int]]:
+        """
+        Drive times in minutes for every origin x destination ("lat,long"
+        strings), routed in one batch: matrix[i][j] is origins[i] -> destinations[j].
+        Place names are geocoded first; ones that can't be get a placeholder.
+        """
+        points = LogisticsService._route_points([*origins, *destinations])
+        parsed_o = [points.get(o) for o in origins]
+        parsed_d = [points.get(d) for d in destinations]
+        routable_o = [i for i, c in enumerate(parsed_o) if c is not None]
+        routable_d = [j for j, c in enumerate(parsed_d) if c is not None]
+
+        routed = {}
+        if routable_o and routable_d:
+            table = engine.matrix([parsed_o[i] for i in routable_o], [parsed_d[j] for j in routable_d], profile)
+            for r, i in enumerate(routable_o):
+                for c, j in enumerate(routable_d):
+                    routed[i, j] = _whole_minutes(table[r][c])
+
+        return [
+            [
+                0 if not o or not d
+                else routed[i, j] if (i, j) in routed
+                else LogisticsService._placeholder_minutes(o, d)
+                for j, d in enumerate(destinations)
+            ]
+            for i, o in enumerate(origins)
+        ]
+
     @staticmethod
-    def resolve_location(location_query: str) -> Tuple[Optional[str], Optional[str]]:
+    def resolve_location(location_query: str, db=None) -> Tuple[Optional[float], Optional[float]]:
         """
-        Geocodes a location string to lat/long.
-        
+        Geocodes a location string to lat/long, through the geocode cache.
+
         Args:
             location_query: e.g. "Lincoln High School"
-            
+            db: optional session; when given, the geocoded_places table is read and extended
+
         Returns:
             (latitude, longitude) or (None, None)
         """
-        # Mock logic
-        if not location_query:
+        from .geocoding import geocoder
+
+        place = geocoder.resolve(location_query, db)
+        if place is None:
             return None, None
-            
-        # Simulated coordinates for demo purposes
-        return "37.7749", "-122.4194"
+        return place.latitude, place.longitude
+
+    @staticmethod
+    def resolve_locations(location_queries: Sequence[Optional[str]], db=None) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+        """resolve_location() for many strings in one batch: {query: (latitude, longitude)}."""
+        from .geocoding import geocoder
+
+        places = geocoder.resolve_many(location_queries, db)
+        return {
+            query: place.coords if place is not None else (None, None)
+            for query, place in places.items()
+        }
+
+    @staticmethod
+    def locate_event(event_data: Dict, db=None) -> Dict:
+        """
+        Fills an event's latitude/longitude from its location (unless the client
+        sent coordinates) and its grid cell for nearby queries. Mutates and returns `event_data`.
+        Stand-in providers' points are not stored on events.
+        """
+        from .geocoding import geocoder
+
+        if (
+            event_data.get("location") and geocoder.persistent
+            and (event_data.get("latitude") is None or event_data.get("longitude") is None)
+        ):
+            event_data["latitude"], event_data["longitude"] = LogisticsService.resolve_location(event_data["location"], db)
+        event_data["geo_cell"] = grid_cell(event_data.get("latitude"), event_data.get("longitude"))
+        return event_data
@@ -1,23 +1,46 @@
 import json
+import logging
 import re
 from datetime import datetime, timedelta, date
-from typing import Dict, List, Optional, Any
-import openai
-from openai import OpenAI
-import os
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
+from .singleflight import SingleFlight, normalize_key
+from .llm import HedgedLLM, OpenAIProvider, alternate_provider, require_client
+from ..telemetry import llm_call
+from ..log import log_payload
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+# Identical queries from several tabs/family members share one LLM call
+_parse_flight = SingleFlight("parse_natural_query")
 
 def parse_natural_query(
     query: str,
-    openai_client: Optional[OpenAI] = None,
+    openai_client: Optional["OpenAI"] = None,
     model: str = "gpt-4o-mini",
     user_context: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     Parse a natural language query into structured data for a family calendar application.
     Supports "Stream of Consciousness" input containing multiple entities.
+    Concurrent identical requests are coalesced into a single LLM call.
     """
-    
-    client = openai_client or OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    key = normalize_key(query, model, user_context or {}, date.today().isoformat())
+    return _parse_flight.do(
+        key,
+        lambda: _parse_natural_query(query, openai_client, model, user_context),
+    )
+
+
+def _parse_natural_query(
+    query: str,
+    openai_client: Optional["OpenAI"],
+    model: str,
+    user_context: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    client = openai_client or require_client("openai")
     
     today = date.today()
     current_date = today.strftime("%Y-%m-%d")
@@ -87,19 +110,10 @@ def parse_natural_query(
     """
 
     try:
-        print(f"Calling LLM with query: {query}")
-        response = client.chat.completions.create(
-            model=model,
-            temperature=0.0,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Parse this family intent: {query}"}
-            ]
-        )
-        print("LLM response received")
-        
-        result_text = response.choices[0].message.content.strip()
-        print(f"LLM Result Text: {result_text}")
+        logger.debug("Calling LLM for intent parse (%d chars)", len(query))
+        llm = HedgedLLM([OpenAIProvider(client, model), alternate_provider("openai")])
+        result_text = llm.generate(f"Parse this family intent: {query}", system=system_prompt)
+        log_payload(logger, "LLM intent parse result", result_text)
         
         try:
             parsed_result = json.loads(result_text)
@@ -109,7 +123,7 @@ def parse_natural_query(
                 parsed_result = json.loads(json_match.group())
             else:
                 # If completely failed to parse JSON, wrap as a single generic event
-                print("JSON parse failed, using fallback")
+                logger.warning("LLM returned no JSON object, using fallback parse")
                 return _fallback_parse(query)
                 
         # Validate structure
@@ -120,9 +134,7 @@ def parse_natural_query(
         return parsed_result
         
     except Exception as e:
-        print(f"Error parsing query with LLM: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error parsing query with LLM")
         return _fallback_parse(query)
 
 
@@ -163,27 +175,28 @@ def _fallback_parse(query: str) -> Dict[str, Any]:
 
 def parse_voice_command(
     audio_file_path: str,
-    openai_client: Optional[OpenAI] = None,
+    openai_client: Optional["OpenAI"] = None,
     user_context: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     Transcribes audio file using Whisper and then parses the intent.
     """
-    client = openai_client or OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = openai_client or require_client("openai")
     
     # 1. Transcribe
     try:
         with open(audio_file_path, "rb") as audio_file:
-            print(f"Transcribing file: {audio_file_path}")
-            transcription = client.audio.transcriptions.create(
-                model="whisper-1", 
-                file=audio_file
-            )
+            logger.debug("Transcribing %s", audio_file_path)
+            with llm_call("openai"):
+                transcription = client.audio.transcriptions.create(
+                    model="whisper-1", 
+                    file=audio_file
+                )
             text = transcription.text
-            print(f"Transcription result: {text}")
+            log_payload(logger, "Transcription result", text)
             
     except Exception as e:
-        print(f"Transcription failed: {e}")
+        logger.warning("Transcription failed: %s", e)
         # Fallback or re-raise
         raise e
     
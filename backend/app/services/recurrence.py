@@ -0,0 +1,210 @@
+"""
+Recurring events: one row per series, occurrences generated per window.
+
+A series is an Event row with an RFC 5545 `rrule` ("FREQ=WEEKLY;BYDAY=TU,TH")
+and optional `exdates` (occurrence starts that were cancelled). Its
+start_time/end_time are the first occurrence (DTSTART) and give every
+occurrence's time of day and length. `recurrence_end` is when the last
+occurrence ends (NULL: forever), so finished series drop out of window
+queries.
+
+expand() returns the occurrence starts overlapping one window. DAILY and
+WEEKLY rules (nearly every family schedule) are expanded arithmetically with
+NumPy, so the cost depends on the window, not on how old the series is. Any
+other rule goes through dateutil. Results are cached per (series, window);
+the key is the series' own content, so an edited series never hits a stale
+entry.
+
+Settings:
+    RECURRENCE_CACHE_SIZE  cached (series, window) expansions (1024)
+"""
+import datetime
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dateutil import parser as date_parser
+from dateutil.rrule import rrulestr
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+# Parts the arithmetic expansion understands; anything else goes to dateutil
+SIMPLE_PARTS = {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "WKST"}
+# Longest COUNT accepted: keeps recurrence_end cheap to compute
+MAX_COUNT = 5000
+
+
+def rule_parts(rule: str) -> Dict[str, str]:
+    text = rule.strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[len("RRULE:"):]
+    parts = {}
+    for part in filter(None, text.split(";")):
+        name, _, value = part.partition("=")
+        parts[name.strip().upper()] = value.strip().upper()
+    return parts
+
+
+def parse(rule: str, dtstart: datetime.datetime):
+    """dateutil rrule for `rule` starting at `dtstart`; ValueError if it isn't a valid RRULE."""
+    parts = rule_parts(rule)
+    if "FREQ" not in parts:
+        raise ValueError("RRULE needs a FREQ")
+    if "COUNT" in parts and "UNTIL" in parts:
+        raise ValueError("RRULE can't have both COUNT and UNTIL")
+    if "COUNT" in parts and not (parts["COUNT"].isdigit() and 0 < int(parts["COUNT"]) <= MAX_COUNT):
+        raise ValueError(f"COUNT must be between 1 and {MAX_COUNT}")
+    if parts.get("UNTIL", "").endswith("Z"):
+        # Event times are stored naive
+        parts["UNTIL"] = parts["UNTIL"][:-1]
+    try:
+        return rrulestr(";".join(f"{k}={v}" for k, v in parts.items()), dtstart=dtstart)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid RRULE: {e}") from None
+
+
+def normalize_exdates(exdates: Optional[Sequence[Any]]) -> List[str]:
+    """Sorted, de-duplicated ISO strings (what the JSON column stores)."""
+    values = set()
+    for value in exdates or ():
+        if isinstance(value, str):
+            value = datetime.datetime.fromisoformat(value)
+        values.add(value.replace(tzinfo=None, microsecond=0).isoformat())
+    return sorted(values)
+
+
+def prepare_series(event_data: Dict[str, Any]) -> None:
+    """
+    Validates and normalizes the recurrence fields of an event payload in
+    place, filling in recurrence_end. ValueError if the rule is invalid.
+    """
+    rule = (event_data.get("rrule") or "").strip() or None
+    event_data["rrule"] = rule
+    event_data["exdates"] = normalize_exdates(event_data.get("exdates")) if rule else None
+    event_data["recurrence_end"] = None
+    if rule is None:
+        return
+    start = event_data["start_time"]
+    rrule = parse(rule, start)
+    parts = rule_parts(rule)
+    if "COUNT" in parts or "UNTIL" in parts:
+        last = None
+        for last in rrule:
+            pass
+        duration = _duration(start, event_data.get("end_time"))
+        event_data["recurrence_end"] = (last or start) + duration
+
+
+def _duration(start: datetime.datetime, end: Optional[datetime.datetime]) -> datetime.timedelta:
+    return end - start if end is not None and end > start else datetime.timedelta(0)
+
+
+# ──────────────────────────────────────────────
+# Expansion
+# ──────────────────────────────────────────────
+
+def _expand_arithmetic(parts: Dict[str, str], dtstart: datetime.datetime,
+                       after: datetime.datetime, before: datetime.datetime) -> List[datetime.datetime]:
+    """
+    DAILY/WEEKLY without BYxxx parts beyond plain BYDAY. Every occurrence is
+    base + period * w + offset[j] for week (or day group) w; only the periods
+    touching the window are generated.
+    """
+    import numpy as np  # only rule expansion needs it
+
+    interval = int(parts.get("INTERVAL", "1") or 1)
+    day = np.timedelta64(1, "D")
+    start = np.datetime64(dtstart, "s")
+    if parts["FREQ"] == "DAILY":
+        period, offsets, base, skipped = interval * day, np.array([0]), start, 0
+    else:
+        week_start = WEEKDAYS.index(parts.get("WKST", "MO"))
+        days = parts.get("BYDAY")
+        weekdays = sorted({WEEKDAYS.index(d) for d in days.split(",")}) if days else [dtstart.weekday()]
+        offsets = np.array(sorted((d - week_start) % 7 for d in weekdays))
+        start_offset = (dtstart.weekday() - week_start) % 7
+        period, base = 7 * interval * day, start - start_offset * day
+        # BYDAY days earlier in DTSTART's week aren't occurrences
+        skipped = int((offsets < start_offset).sum())
+
+    first = max(0, int((np.datetime64(after, "s") - base) // period))
+    last = max(first, int((np.datetime64(before, "s") - base) // period))
+    periods = np.arange(first, last + 1)
+    starts = (base + periods[:, None] * period + offsets[None, :] * day).ravel()
+    index = (periods[:, None] * len(offsets) + np.arange(len(offsets))[None, :]).ravel() - skipped
+
+    keep = (index >= 0) & (starts > np.datetime64(after, "s")) & (starts < np.datetime64(before, "s"))
+    if "COUNT" in parts:
+        keep &= index < int(parts["COUNT"])
+    if "UNTIL" in parts:
+        until = date_parser.parse(parts["UNTIL"].rstrip("Z"))
+        keep &= starts <= np.datetime64(until, "s")
+    return starts[keep].astype("datetime64[s]").astype(datetime.datetime).tolist()
+
+
+def _simple(parts: Dict[str, str]) -> bool:
+    if parts.get("FREQ") not in ("DAILY", "WEEKLY") or not set(parts) <= SIMPLE_PARTS:
+        return False
+    if "BYDAY" in parts:
+        # Plain weekdays only ("2TU" is a monthly-style rule), and only for WEEKLY
+        return parts["FREQ"] == "WEEKLY" and all(d in WEEKDAYS for d in parts["BYDAY"].split(","))
+    return True
+
+
+class RecurrenceCache:
+    def __init__(self, size: int = 1024):
+        self.size = size
+        self._entries: "OrderedDict[Tuple, Tuple[datetime.datetime, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def expand(self, rule: str, dtstart: datetime.datetime, end: Optional[datetime.datetime],
+               window_start: datetime.datetime, window_end: datetime.datetime,
+               exdates: Optional[Sequence[str]] = None) -> Tuple[datetime.datetime, ...]:
+        """Starts of the series' occurrences overlapping [window_start, window_end), minus exdates."""
+        duration = _duration(dtstart, end)
+        key = (rule, dtstart, duration, tuple(exdates or ()), window_start, window_end)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Occurrences overlapping the window start after `after` and before window_end;
+        # zero-length ones count when they start inside the window
+        after = window_start - (duration or datetime.timedelta(seconds=1))
+        parts = rule_parts(rule)
+        if _simple(parts):
+            starts = _expand_arithmetic(parts, dtstart, after, window_end)
+        else:
+            starts = parse(rule, dtstart).between(after, window_end, inc=False)
+        skip = set(exdates or ())
+        occurrences = tuple(start for start in starts if start.isoformat() not in skip)
+
+        with self._lock:
+            self._entries[key] = occurrences
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return occurrences
+
+    def stats(self) -> Dict[str, int]:
+        return {"cached": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+cache = RecurrenceCache(int(os.getenv("RECURRENCE_CACHE_SIZE", "1024")))
+expand = cache.expand
+
+
+def occurrences(rule: str, dtstart: datetime.datetime, end: Optional[datetime.datetime],
+                window_start: datetime.datetime, window_end: datetime.datetime,
+                exdates: Optional[Sequence[str]] = None) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """(start, end) of the series' occurrences overlapping [window_start, window_end)."""
+    length = _duration(dtstart, end)
+    return [(start, start + length) for start in expand(rule, dtstart, end, window_start, window_end, exdates)]
@@ -0,0 +1,128 @@
+import asyncio
+import copy
+import json
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+# All flights register themselves here so /api/metrics can report on them
+_registry: Dict[str, "SingleFlight"] = {}
+
+# What followers get when the leader's task was cancelled: a signal to retry, not a result
+_LEADER_CANCELLED = object()
+
+
+def normalize_key(*parts: Any) -> str:
+    """
+    Builds a cache/coalescing key from arbitrary parts.
+    Strings are lowercased and whitespace-collapsed so "Concerts  this weekend"
+    and "concerts this weekend" share one in-flight call.
+    """
+    normalized = []
+    for part in parts:
+        if isinstance(part, str):
+            normalized.append(re.sub(r"\s+", " ", part.strip().lower()))
+        else:
+            normalized.append(part)
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller (the leader) runs the
+    function, every caller arriving with the same key while it is in flight waits
+    and receives the same result (or exception). Nothing is cached after the call
+    finishes, so sequential calls still hit the provider.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+        _registry[name] = self
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Runs fn() once per key across threads."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Followers get their own copy so callers can't mutate each other's result
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs await fn() once per key on the current event loop. If the leader's
+        task is cancelled, its followers aren't: the first one to wake up runs
+        fn() again as the new leader and the rest wait on it.
+        """
+        coalesced = False
+        while (future := self._async_calls.get(key)) is not None:
+            if not coalesced:
+                self.coalesced += 1
+                coalesced = True
+            result = await asyncio.shield(future)
+            if result is not _LEADER_CANCELLED:
+                return copy.deepcopy(result)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_calls[key] = future
+        self.calls += 1
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.set_result(_LEADER_CANCELLED)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark as retrieved so an uncontended failure doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            self._async_calls.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._async_calls),
+        }
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """Returns call/coalesced counters for every registered flight."""
+    return {name: flight.stats() for name, flight in _registry.items()}
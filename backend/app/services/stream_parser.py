@@ -0,0 +1,80 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class IncrementalIntentParser:
+    """
+    Incrementally parses a streamed JSON object of the form
+    {"events": [{...}, ...], "shopping_list": [...], "todos": [...]}
+    and yields each array item as soon as its closing brace arrives, without
+    waiting for the rest of the document.
+
+    Anything before the first "{" (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.current_key: Optional[str] = None
+        self._string_chars: List[str] = []
+        self._last_string: Optional[str] = None
+        self._item_chars: Optional[List[str]] = None
+        self._array_depth: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Consumes a chunk of text and returns the (key, item) pairs it completed."""
+        completed = []
+        for char in chunk:
+            if not self.started:
+                if char != "{":
+                    continue
+                self.started = True
+
+            if self._item_chars is not None:
+                self._item_chars.append(char)
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self._last_string = "".join(self._string_chars)
+                elif self.depth == 1:
+                    self._string_chars.append(char)
+                continue
+
+            if char == '"':
+                self.in_string = True
+                self._string_chars = []
+            elif char == ":" and self.depth == 1:
+                self.current_key = self._last_string
+            elif char in "{[":
+                self.depth += 1
+                if char == "[" and self.depth == 2:
+                    self._array_depth = self.depth
+                elif char == "{" and self._array_depth is not None and self.depth == self._array_depth + 1:
+                    self._item_chars = ["{"]
+            elif char in "}]":
+                if (
+                    char == "}"
+                    and self._item_chars is not None
+                    and self._array_depth is not None
+                    and self.depth == self._array_depth + 1
+                ):
+                    item = json.loads("".join(self._item_chars))
+                    self._item_chars = None
+                    completed.append((self.current_key, item))
+                elif char == "]" and self.depth == self._array_depth:
+                    self._array_depth = None
+                self.depth -= 1
+        return completed
+
+    def iter_items(self, chunks: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for chunk in chunks:
+            for pair in self.feed(chunk):
+                yield pair
@@ -1,8 +1,11 @@
+import logging
 import requests
 from datetime import datetime, timedelta
 import os
 from dateutil import parser
 
+logger = logging.getLogger(__name__)
+
 class TicketmasterService:
     def __init__(self):
         self.api_key = os.getenv("TICKETMASTER_API_KEY")
@@ -10,7 +13,7 @@ class TicketmasterService:
 
     def search_events(self, keyword=None, city="Seattle", radius=50, classification_name=None):
         if not self.api_key:
-            print("Warning: TICKETMASTER_API_KEY not set")
+            logger.warning("TICKETMASTER_API_KEY not set")
             return []
 
         # Default to next 14 days
@@ -36,7 +39,7 @@ class TicketmasterService:
         try:
             response = requests.get(self.base_url, params=params)
             if response.status_code != 200:
-                print(f"Ticketmaster API Error: {response.status_code} {response.text}")
+                logger.warning("Ticketmaster API error %s: %.500s", response.status_code, response.text)
                 return []
             
             data = response.json()
@@ -44,7 +47,7 @@ class TicketmasterService:
             return self._format_events(events)
             
         except Exception as e:
-            print(f"Error fetching Ticketmaster events: {e}")
+            logger.exception("Error fetching Ticketmaster events")
             return []
 
     def _format_events(self, tm_events):
@@ -98,7 +101,7 @@ class TicketmasterService:
                     "reasoning": f"Found matching event on Ticketmaster: {name}"
                 })
             except Exception as e:
-                print(f"Error parsing event {event.get('name')}: {e}")
+                logger.warning("Error parsing Ticketmaster event %r: %s", event.get('name'), e)
                 continue
                 
         return formatted
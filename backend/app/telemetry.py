@@ -0,0 +1,338 @@
+"""
+Per-request performance telemetry, exported in Prometheus text format.
+
+RequestMetricsMiddleware times every HTTP request by route template, method and
+status. While a request is in flight, a RequestTiming is held in a contextvar;
+the SQLAlchemy cursor hooks and llm_call() add their time to it, and the totals
+go back to the client in a Server-Timing header:
+
+    Server-Timing: db;dur=4.1;desc="3 queries", llm;dur=0.0;desc="0 calls", total;dur=9.7
+
+    GET /metrics    # Prometheus scrape endpoint (routes/metrics.py)
+
+The metric types here are deliberately small (no prometheus_client dependency):
+counters, gauges and fixed-bucket histograms, plus collectors that read
+existing stats (pool, breakers) at scrape time.
+"""
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# (name, type, help, [(labels, value), ...]) - what a collector returns at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        name = f"{name}{{{rendered}}}"
+    return f"{name} {value}"
+
+
+# ──────────────────────────────────────────────
+# Metric types
+# ──────────────────────────────────────────────
+
+class Registry:
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def register(self, metric: "_Metric"):
+        self._metrics.append(metric)
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]):
+        """Adds a callable that returns metric families when /metrics is scraped."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(_format_sample(name, labels, value) for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _labels(self, values: Tuple) -> Dict[str, str]:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        return dict(zip(self.labelnames, values))
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [_format_sample(self.name, self._labels(k), v) for k, v in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        super().__init__(name, help_text, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last slot is +Inf), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels) -> int:
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = self._header()
+        for key, (counts, total, count) in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(_format_sample(f"{self.name}_bucket", {**labels, "le": le}, cumulative))
+            lines.append(_format_sample(f"{self.name}_sum", labels, float(total)))
+            lines.append(_format_sample(f"{self.name}_count", labels, count))
+        return lines
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route template, method and status.", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Time from request start to the last body byte.", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served.")
+HTTP_DB_QUERIES = Histogram("http_request_db_queries", "SQL statements executed per request.", ("route",), buckets=COUNT_BUCKETS)
+HTTP_DB_SECONDS = Histogram("http_request_db_seconds", "Time spent in SQL per request.", ("route",))
+HTTP_LLM_SECONDS = Histogram("http_request_llm_seconds", "Time spent waiting on LLM providers per request.", ("route",))
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Duration of individual SQL statements.", buckets=QUERY_BUCKETS)
+LLM_CALL_SECONDS = Histogram("llm_call_duration_seconds", "Duration of individual LLM provider calls.", ("provider", "outcome"))
+
+
+# ──────────────────────────────────────────────
+# Per-request attribution
+# ──────────────────────────────────────────────
+
+class RequestTiming:
+    """DB and LLM time accumulated by the request currently in this context."""
+
+    __slots__ = ("db_queries", "db_seconds", "llm_calls", "llm_seconds", "profile")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        # A profiler.ProfileSession when this request is being profiled; SQL and
+        # LLM calls are marked on it as spans
+        self.profile = None
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries", '
+            f'llm;dur={self.llm_seconds * 1000:.1f};desc="{self.llm_calls} calls", '
+            f"total;dur={total_seconds * 1000:.1f}"
+        )
+
+
+_current: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar("request_timing", default=None)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def request_timing():
+    """Collects DB/LLM time for the enclosed block (the middleware does this per request)."""
+    timing = RequestTiming()
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+    context._telemetry_started = time.perf_counter()
+    timing = _current.get()
+    if timing is not None and timing.profile is not None:
+        context._telemetry_span = timing.profile.begin(f"SQL: {statement}")
+
+
+def _end_profile_span(context):
+    span = getattr(context, "_telemetry_span", None)
+    if span is not None:
+        context._telemetry_span = None
+        span.end()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_telemetry_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    DB_QUERY_SECONDS.observe(elapsed)
+    _end_profile_span(context)
+    timing = _current.get()
+    if timing is not None:
+        timing.db_queries += 1
+        timing.db_seconds += elapsed
+
+
+def instrument_queries():
+    """
+    Times every SQL statement on every engine (async engines included, via
+    their sync_engine). Listening on the Engine class also covers engines
+    created after this call, e.g. the test suite's. Idempotent.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", lambda ctx: _end_profile_span(ctx.execution_context))
+
+
+@contextlib.contextmanager
+def llm_call(provider: str):
+    """Times one LLM provider call and attributes it to the current request."""
+    started = time.perf_counter()
+    outcome = "error"
+    timing = _current.get()
+    span = timing.profile.begin(f"LLM: {provider}") if timing is not None and timing.profile is not None else None
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        LLM_CALL_SECONDS.observe(elapsed, provider, outcome)
+        if span is not None:
+            span.end()
+        if timing is not None:
+            timing.llm_calls += 1
+            timing.llm_seconds += elapsed
+
+
+# ──────────────────────────────────────────────
+# ASGI middleware
+# ──────────────────────────────────────────────
+
+def route_label(scope) -> str:
+    """The matched route template ("/api/events/{event_id}"), so IDs don't explode label cardinality."""
+    # Newer FastAPI keeps included routers nested: scope["route"].path lacks the
+    # include prefix, but the effective route context has the full template.
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(effective, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency / status / in-flight per route and adds a Server-Timing
+    header. Plain ASGI rather than @app.middleware("http") so streamed
+    responses are timed to their last chunk and the header is added without
+    buffering the body. Server-Timing covers work done before the headers
+    were sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        HTTP_IN_FLIGHT.inc()
+
+        with request_timing() as timing:
+            async def send_with_timing(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timing.server_timing(time.perf_counter() - started))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                elapsed = time.perf_counter() - started
+                HTTP_IN_FLIGHT.dec()
+                route = route_label(scope)
+                method = scope["method"]
+                HTTP_REQUESTS.inc(method, route, str(status))
+                HTTP_LATENCY.observe(elapsed, method, route)
+                HTTP_DB_QUERIES.observe(timing.db_queries, route)
+                HTTP_DB_SECONDS.observe(timing.db_seconds, route)
+                HTTP_LLM_SECONDS.observe(timing.llm_seconds, route)
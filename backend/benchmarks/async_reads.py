@@ -0,0 +1,138 @@
+"""
+Throughput of the hot read endpoints on the old sync path (threadpool +
+SessionLocal) vs the async session path, at N concurrent clients.
+
+    cd backend
+    python benchmarks/async_reads.py                       # throwaway SQLite file
+    DATABASE_URL=postgresql://... python benchmarks/async_reads.py --clients 200
+
+Requests go through the ASGI app in-process (httpx.ASGITransport), so the
+numbers measure handler scheduling + DB access, not the network. The old
+path is re-mounted under /bench/sync/* exactly as it was before the port.
+Against SQLite the gap is small (aiosqlite still uses a thread per
+connection); run it against Postgres/asyncpg for representative numbers.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+# The sync path holds its connection across threadpool hops (handler, response
+# serialisation, get_db cleanup). Once every worker thread is blocked waiting
+# for a connection, the requests holding them can't get a thread back, and
+# everything stalls until DB_POOL_TIMEOUT. Uncap overflow so the comparison
+# measures throughput rather than that stall.
+os.environ.setdefault("DB_MAX_OVERFLOW", "-1")
+
+import httpx
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.database import SessionLocal, async_engine, get_db
+from app.main import app
+
+
+@app.get("/bench/sync/events", response_model=List[schemas.Event])
+def legacy_read_events(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return db.query(models.Event).offset(skip).limit(limit).all()
+
+
+@app.get("/bench/sync/todos", response_model=List[schemas.ToDo])
+def legacy_get_todos(family_id: int = 1, db: Session = Depends(get_db)):
+    return db.query(models.ToDo).filter(models.ToDo.family_id == family_id).all()
+
+
+@app.get("/bench/sync/shopping", response_model=List[schemas.ShoppingItem])
+def legacy_get_shopping_items(family_id: int = 1, db: Session = Depends(get_db)):
+    return db.query(models.ShoppingItem).filter(models.ShoppingItem.family_id == family_id).all()
+
+
+def seed(rows: int) -> int:
+    db = SessionLocal()
+    try:
+        family = models.Family(name="Bench")
+        db.add(family)
+        db.flush()
+        members = [
+            models.User(name=f"Member {i}", email=f"bench{i}-{time.time_ns()}@example.com", family_id=family.id)
+            for i in range(4)
+        ]
+        db.add_all(members)
+        start = datetime(2026, 1, 1, 9)
+        for i in range(rows):
+            db.add(models.Event(
+                title=f"Event {i}", start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1),
+                family_id=family.id, attendees=members[: i % 4 + 1], driver=members[0],
+            ))
+            db.add(models.ToDo(title=f"Todo {i}", family_id=family.id, assigned_to=members[i % 4], created_by=members[0]))
+            db.add(models.ShoppingItem(name=f"Item {i}", family_id=family.id, added_by=members[i % 4]))
+        db.commit()
+        return family.id
+    finally:
+        db.close()
+
+
+async def run(paths: List[str], clients: int, requests_per_client: int):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def worker(n: int):
+            for i in range(requests_per_client):
+                path = paths[(n + i) % len(paths)]
+                started = time.perf_counter()
+                response = await http.get(path)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(n) for n in range(clients)])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--rows", type=int, default=50, help="events/todos/items to seed")
+    args = parser.parse_args()
+
+    family_id = seed(args.rows)
+    sync_paths = ["/bench/sync/events", f"/bench/sync/todos?family_id={family_id}", f"/bench/sync/shopping?family_id={family_id}"]
+    async_paths = ["/api/events/", f"/api/todos/?family_id={family_id}", f"/api/shopping/?family_id={family_id}"]
+
+    async def both():
+        # Warm both pools before measuring
+        await run(sync_paths + async_paths, clients=10, requests_per_client=3)
+        results = {
+            "sync": await run(sync_paths, args.clients, args.requests),
+            "async": await run(async_paths, args.clients, args.requests),
+        }
+        await async_engine.dispose()
+        return results
+
+    results = asyncio.run(both())
+    print(f"{args.clients} clients x {args.requests} requests, {args.rows} rows per table")
+    for name, r in results.items():
+        print(f"  {name:5s}  {r['rps']:8.1f} req/s   p50 {r['p50_ms']:7.1f} ms   p95 {r['p95_ms']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
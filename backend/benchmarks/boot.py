@@ -0,0 +1,99 @@
+"""
+Schema step of worker boot: the old path (create_all at import + `alembic
+upgrade head` in the startup hook) vs app.migrations.ensure_schema(), for
+N workers starting at once against an already-migrated and a fresh database.
+
+    cd backend
+    python benchmarks/boot.py --workers 4
+    DATABASE_URL=postgresql://... python benchmarks/boot.py --workers 4   # already-migrated only
+
+Each worker is a separate process; timings exclude importing the app
+(identical for both paths) and cover only the schema work.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r"""
+import json, sys, time
+import app.models
+from app.database import Base, engine
+from app import migrations
+
+mode = sys.argv[1]
+started = time.perf_counter()
+error = None
+try:
+    if mode == "old":
+        from alembic.config import Config
+        from alembic import command
+        Base.metadata.create_all(bind=engine)
+        command.upgrade(Config(migrations.ALEMBIC_INI), "head")
+        result = "upgraded"
+    else:
+        result = migrations.ensure_schema(engine)
+except Exception as e:
+    result, error = "error", str(e).splitlines()[0]
+print(json.dumps({"ms": (time.perf_counter() - started) * 1000, "result": result, "error": error}))
+"""
+
+
+def boot(mode: str, workers: int, database_url: str):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    procs = [
+        subprocess.Popen([sys.executable, "-W", "ignore", "-c", WORKER, mode], cwd=BACKEND_DIR, env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(workers)
+    ]
+    runs = []
+    for proc in procs:
+        out, _ = proc.communicate()
+        lines = [l for l in out.splitlines() if l.startswith("{")]
+        runs.append(json.loads(lines[-1]) if lines else {"ms": float("nan"), "result": "crashed", "error": None})
+    return runs
+
+
+def report(label: str, runs):
+    times = [r["ms"] for r in runs]
+    results = {}
+    for r in runs:
+        results[r["result"]] = results.get(r["result"], 0) + 1
+    print(f"  {label:28s} median {statistics.median(times):7.1f} ms   max {max(times):7.1f} ms   {results}")
+    for r in runs:
+        if r["error"]:
+            print(f"    error: {r['error']}")
+
+
+def fresh_sqlite_url():
+    return f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'boot.db')}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-fresh", action="store_true", help="only measure an already-migrated database")
+    args = parser.parse_args()
+
+    configured = os.getenv("DATABASE_URL")
+    print(f"{args.workers} workers booting in parallel")
+
+    # A configured database can't be made fresh for each run
+    if not args.skip_fresh and not configured:
+        for mode in ("old", "new"):
+            report(f"{mode}: fresh database", boot(mode, args.workers, fresh_sqlite_url()))
+
+    url = configured or fresh_sqlite_url()
+    boot("new", 1, url)  # bring it to head first
+    for mode in ("old", "new"):
+        report(f"{mode}: already at head", boot(mode, args.workers, url))
+
+
+if __name__ == "__main__":
+    main()
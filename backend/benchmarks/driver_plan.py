@@ -0,0 +1,66 @@
+"""
+Driver assignment on synthetic dense days: greedy alone vs greedy + local
+search (services/driver_planner.py), over several random days.
+
+    cd backend
+    python benchmarks/driver_plan.py --events 12 --drivers 3 --days 20 --budget-ms 200
+
+Events are 30-90 minutes long, start between 07:00 and 20:00 and are scattered
+over a ~25 km metro area. Travel times come from the local haversine profile.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.driver_planner import DriverPlanner, Stop  # noqa: E402
+from app.services.logistics import SPEED_PROFILES, HaversineBackend  # noqa: E402
+
+HOME = (47.61, -122.33)
+
+
+def synthetic_day(rng: random.Random, n_events: int):
+    points = [HOME] + [(HOME[0] + rng.uniform(-0.15, 0.15), HOME[1] + rng.uniform(-0.2, 0.2)) for _ in range(n_events)]
+    travel = HaversineBackend().table(points, points, SPEED_PROFILES["driving"])
+    stops = []
+    for i in range(n_events):
+        start = rng.randrange(7 * 60, 20 * 60, 15)
+        stops.append(Stop(i + 1, start, start + rng.choice((30, 45, 60, 90)), i + 1))
+    return travel, stops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=12)
+    parser.add_argument("--drivers", type=int, default=3)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--budget-ms", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    drivers = list(range(1, args.drivers + 1))
+    rows = []
+    for _ in range(args.days):
+        travel, stops = synthetic_day(rng, args.events)
+        planner = DriverPlanner(travel, drivers, budget_seconds=args.budget_ms / 1000)
+        started = time.perf_counter()
+        greedy = planner.greedy(stops)
+        greedy_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        plan = planner.solve(stops)
+        solve_ms = (time.perf_counter() - started) * 1000
+        rows.append((len(greedy.unassigned), greedy.total_minutes, greedy_ms, len(plan.unassigned), plan.total_minutes, solve_ms, plan.moves, plan.timed_out))
+
+    print(f"{args.days} days x {args.events} events, {args.drivers} drivers, budget {args.budget_ms} ms")
+    print(f"  greedy         unassigned {statistics.mean(r[0] for r in rows):5.2f}   drive {statistics.mean(r[1] for r in rows):7.1f} min   {statistics.median(r[2] for r in rows):7.2f} ms")
+    print(f"  + local search unassigned {statistics.mean(r[3] for r in rows):5.2f}   drive {statistics.mean(r[4] for r in rows):7.1f} min   {statistics.median(r[5] for r in rows):7.2f} ms")
+    print(f"  moves/day {statistics.mean(r[6] for r in rows):.1f}, days hitting the budget {sum(r[7] for r in rows)}")
+
+
+if __name__ == "__main__":
+    main()
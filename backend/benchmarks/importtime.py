@@ -0,0 +1,64 @@
+"""
+Startup import cost of the app, from `python -X importtime`.
+
+    cd backend
+    python benchmarks/importtime.py            # total + 15 heaviest modules
+    python benchmarks/importtime.py --top 40 --runs 5
+
+Reports the median cumulative time of `import app.main` over several fresh
+interpreters, the heaviest modules by cumulative time, and whether any of
+the lazily-loaded SDKs (openai, google.genai, alembic, numpy) crept back onto the
+import path. tests/test_import_budget.py enforces the budget in CI.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ("openai", "google.genai", "alembic", "numpy")
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def importtime(target: str = "app.main"):
+    """Returns {module: (self_us, cumulative_us)} for one fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--target", default="app.main")
+    args = parser.parse_args()
+
+    runs = [importtime(args.target) for _ in range(args.runs)]
+    totals = [run[args.target][1] / 1000 for run in runs]
+    print(f"import {args.target}: median {statistics.median(totals):.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f})")
+
+    last = runs[-1]
+    print(f"\nHeaviest modules (cumulative ms, last run):")
+    for name, (self_us, cumulative_us) in sorted(last.items(), key=lambda kv: -kv[1][1])[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}  {self_us / 1000:7.1f} self  {name}")
+
+    eager = [m for m in LAZY_MODULES if m in last]
+    print(f"\nLazy SDKs imported at startup: {', '.join(eager) if eager else 'none'}")
+    return 1 if eager else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Drive-time matrix for N places: the scalar haversine/profile path called
+pair by pair vs one NumPy pass over the whole table, and RoutingEngine.matrix()
+cold (NumPy pass + cache fill) and warm (every pair served from the LRU).
+
+    cd backend
+    python benchmarks/routing.py --places 50 --runs 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.logistics import SPEED_PROFILES, HaversineBackend, RoutingEngine, haversine_km  # noqa: E402
+
+
+def places(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    # Scattered over a metro area around Seattle
+    return [(47.6 + rng.uniform(-0.3, 0.3), -122.3 + rng.uniform(-0.3, 0.3)) for _ in range(n)]
+
+
+def pairwise(points):
+    profile = SPEED_PROFILES["driving"]
+    return [[profile.minutes(haversine_km(o, d)) for d in points] for o in points]
+
+
+def timed(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--places", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    points = places(args.places)
+    cold = timed(lambda: RoutingEngine(cache_size=args.places ** 2).matrix(points, points), args.runs)
+    warm_engine = RoutingEngine(cache_size=args.places ** 2)
+    warm_engine.matrix(points, points)
+    warm = timed(lambda: warm_engine.matrix(points, points), args.runs)
+    loop = timed(lambda: pairwise(points), args.runs)
+    vectorized = timed(lambda: HaversineBackend().table(points, points, SPEED_PROFILES["driving"]), args.runs)
+
+    print(f"{args.places}x{args.places} matrix, median of {args.runs} runs")
+    print(f"  pair-by-pair loop     {loop:8.2f} ms")
+    print(f"  NumPy table only      {vectorized:8.2f} ms")
+    print(f"  engine.matrix (cold)  {cold:8.2f} ms")
+    print(f"  engine.matrix (warm)  {warm:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
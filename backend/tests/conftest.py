@@ -1,22 +1,50 @@
+import os
+import tempfile
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_async_db, get_async_read_db, get_db
 from app import models  # Explicitly register models checking
+from app.services import llm
+from app.services.geocoding import LocalGeocoder, geocoder
 
-# Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite://"
+# Keep tests on the mocked provider only, even when real API keys are in the environment
+os.environ["LLM_HEDGING"] = "0"
+# Tests build their own schema; don't migrate the local dev database on TestClient startup
+os.environ["MIGRATE_ON_STARTUP"] = "0"
+
+# Use a throwaway SQLite file for testing: the sync and async (aiosqlite)
+# engines need to see the same database, which rules out :memory:
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
+    f"sqlite:///{TEST_DB_PATH}",
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: each TestClient runs its own event loop, so connections can't be reused across tests
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+@pytest.fixture(autouse=True)
+def reset_llm_state():
+    """Circuit breakers and cached clients are process-wide; isolate each test."""
+    llm.reset_health()
+    llm.reset_clients()
+    yield
+
+@pytest.fixture(autouse=True)
+def reset_geocoder(monkeypatch):
+    """The geocode LRU and autocomplete index outlive each test's tables; geocode offline."""
+    geocoder.clear()
+    monkeypatch.setattr(geocoder, "provider", LocalGeocoder())
+    yield
+
 @pytest.fixture(scope="function")
 def db_session():
     """Create a new database session for a test."""
@@ -28,6 +56,11 @@ def db_session():
         db.close()
         Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture
+def async_session_factory():
+    """The async sessionmaker bound to the test database."""
+    return TestingAsyncSessionLocal
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """Create a TestClient that uses the test database."""
@@ -37,7 +70,13 @@ def client(db_session):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -171,6 +171,18 @@ def mock_gemini_client(response_text: str) -> MagicMock:
     return client
 
 
+def mock_gemini_stream_client(response_text: str, chunk_size: int = 7) -> MagicMock:
+    """Create a mocked google.genai.Client whose streaming call yields response_text in chunks."""
+    client = MagicMock()
+    chunks = []
+    for i in range(0, len(response_text), chunk_size):
+        chunk = MagicMock()
+        chunk.text = response_text[i:i + chunk_size]
+        chunks.append(chunk)
+    client.models.generate_content_stream.return_value = iter(chunks)
+    return client
+
+
 # ──────────────────────────────────────────────
 # Ticketmaster Mock Responses
 # ──────────────────────────────────────────────
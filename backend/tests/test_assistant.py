@@ -6,6 +6,7 @@ from fastapi.testclient import TestClient
 
 from tests.mocks.fixtures import (
     mock_gemini_client,
+    mock_gemini_stream_client,
     GEMINI_MULTI_INTENT_RESPONSE,
     GEMINI_EMPTY_RESPONSE,
     GEMINI_SEARCH_RESPONSE,
@@ -51,13 +52,13 @@ def _seed_user_in_db(db_session, user_id=1):
 # ──────────────────────────────────────────────
 
 class TestInteractEndpoint:
-    @patch("app.services.ai_learning.genai")
-    def test_interact_multi_intent(self, mock_genai, client: TestClient, db_session):
+    @patch("app.services.ai_learning.get_client")
+    def test_interact_multi_intent(self, mock_get_client, client: TestClient, db_session):
         """POST /interact returns structured events, shopping_list, todos."""
         user = _seed_user_in_db(db_session)
 
         mock_client = mock_gemini_client(GEMINI_MULTI_INTENT_RESPONSE)
-        mock_genai.Client.return_value = mock_client
+        mock_get_client.return_value = mock_client
 
         response = client.post("/api/assistant/interact", json={
             "query": "Soccer practice Tuesday and buy milk",
@@ -70,13 +71,13 @@ class TestInteractEndpoint:
         assert len(data["shopping_list"]) == 1
         assert len(data["todos"]) == 1
 
-    @patch("app.services.ai_learning.genai")
-    def test_interact_empty_response(self, mock_genai, client: TestClient, db_session):
+    @patch("app.services.ai_learning.get_client")
+    def test_interact_empty_response(self, mock_get_client, client: TestClient, db_session):
         """POST /interact with no intents returns empty arrays."""
         user = _seed_user_in_db(db_session)
 
         mock_client = mock_gemini_client(GEMINI_EMPTY_RESPONSE)
-        mock_genai.Client.return_value = mock_client
+        mock_get_client.return_value = mock_client
 
         response = client.post("/api/assistant/interact", json={
             "query": "hello",
@@ -88,14 +89,14 @@ class TestInteractEndpoint:
         assert data["shopping_list"] == []
         assert data["todos"] == []
 
-    @patch("app.services.ai_learning.genai")
-    def test_interact_api_failure(self, mock_genai, client: TestClient, db_session):
+    @patch("app.services.ai_learning.get_client")
+    def test_interact_api_failure(self, mock_get_client, client: TestClient, db_session):
         """POST /interact returns 500 when Gemini API fails."""
         user = _seed_user_in_db(db_session)
 
         mock_client = MagicMock()
         mock_client.models.generate_content.side_effect = Exception("Gemini down")
-        mock_genai.Client.return_value = mock_client
+        mock_get_client.return_value = mock_client
 
         response = client.post("/api/assistant/interact", json={
             "query": "test",
@@ -103,17 +104,85 @@ class TestInteractEndpoint:
         })
         assert response.status_code == 500
 
+    def test_service_runs_on_openai_alone(self, db_session):
+        """With only an OpenAI key the service uses OpenAI instead of failing."""
+        from app.services.ai_learning import AILearningService
+
+        clients = {"gemini": None, "openai": MagicMock()}
+        with patch("app.services.ai_learning.get_client", side_effect=clients.get):
+            service = AILearningService(db_session)
+        assert [p.name for p in service.llm.providers] == ["openai"]
+
+    def test_service_needs_some_provider(self, db_session):
+        from app.services.ai_learning import AILearningService
+        from app.services.llm import ProviderNotConfigured
+
+        with patch("app.services.ai_learning.get_client", return_value=None):
+            with pytest.raises(ProviderNotConfigured):
+                AILearningService(db_session)
+
+
+# ──────────────────────────────────────────────
+# /api/assistant/interact/stream
+# ──────────────────────────────────────────────
+
+def _parse_sse(body: str):
+    """Split an SSE body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestInteractStreamEndpoint:
+    @patch("app.services.ai_learning.get_client")
+    def test_stream_emits_each_item_then_done(self, mock_get_client, client: TestClient, db_session):
+        user = _seed_user_in_db(db_session)
+        mock_get_client.return_value = mock_gemini_stream_client(GEMINI_MULTI_INTENT_RESPONSE)
+
+        response = client.post("/api/assistant/interact/stream", json={
+            "query": "Soccer practice Tuesday and buy milk",
+            "user_id": user.id,
+        })
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = _parse_sse(response.text)
+        assert [e[0] for e in events] == ["item", "item", "item", "done"]
+        assert events[0][1] == {
+            "type": "events",
+            "item": json.loads(GEMINI_MULTI_INTENT_RESPONSE)["events"][0],
+        }
+        assert events[1][1]["type"] == "shopping_list"
+        assert events[2][1]["type"] == "todos"
+        assert events[3][1] == {"events": 1, "shopping_list": 1, "todos": 1}
+
+    @patch("app.services.ai_learning.get_client")
+    def test_stream_reports_provider_error(self, mock_get_client, client: TestClient, db_session):
+        user = _seed_user_in_db(db_session)
+        mock_client = MagicMock()
+        mock_client.models.generate_content_stream.side_effect = Exception("Gemini down")
+        mock_get_client.return_value = mock_client
+
+        response = client.post("/api/assistant/interact/stream", json={
+            "query": "test",
+            "user_id": user.id,
+        })
+        events = _parse_sse(response.text)
+        assert events == [("error", {"detail": "Gemini down"})]
+
 
 # ──────────────────────────────────────────────
 # /api/assistant/search
 # ──────────────────────────────────────────────
 
 class TestSearchEndpoint:
-    @patch("google.genai.Client")
-    def test_search_returns_suggestions(self, MockClient, client: TestClient):
+    @patch("app.routes.assistant.require_client")
+    def test_search_returns_suggestions(self, mock_get_client, client: TestClient):
         """POST /search returns event suggestions from Gemini + Google Search."""
         mock_instance = mock_gemini_client(GEMINI_SEARCH_RESPONSE)
-        MockClient.return_value = mock_instance
+        mock_get_client.return_value = mock_instance
 
         response = client.post("/api/assistant/search", json={
             "query": "concerts this weekend",
@@ -124,11 +193,11 @@ class TestSearchEndpoint:
         assert data["suggestions"][0]["title"] == "Taylor Swift Concert"
         assert "Buy Tickets" in data["suggestions"][0]["description"]
 
-    @patch("google.genai.Client")
-    def test_search_empty_results(self, MockClient, client: TestClient):
+    @patch("app.routes.assistant.require_client")
+    def test_search_empty_results(self, mock_get_client, client: TestClient):
         """POST /search with no matching events returns empty suggestions."""
         mock_instance = mock_gemini_client(GEMINI_SEARCH_EMPTY)
-        MockClient.return_value = mock_instance
+        mock_get_client.return_value = mock_instance
 
         response = client.post("/api/assistant/search", json={
             "query": "underwater basket weaving tournament",
@@ -136,41 +205,41 @@ class TestSearchEndpoint:
         assert response.status_code == 200
         assert response.json()["suggestions"] == []
 
-    @patch("google.genai.Client")
-    def test_search_api_failure(self, MockClient, client: TestClient):
+    @patch("app.routes.assistant.require_client")
+    def test_search_api_failure(self, mock_get_client, client: TestClient):
         """POST /search returns 500 when Gemini API fails."""
         mock_instance = MagicMock()
         mock_instance.models.generate_content.side_effect = Exception("API error")
-        MockClient.return_value = mock_instance
+        mock_get_client.return_value = mock_instance
 
         response = client.post("/api/assistant/search", json={
             "query": "concerts",
         })
         assert response.status_code == 500
 
-    @patch("google.genai.Client")
-    def test_search_malformed_json(self, MockClient, client: TestClient):
+    @patch("app.routes.assistant.require_client")
+    def test_search_malformed_json(self, mock_get_client, client: TestClient):
         """POST /search with malformed Gemini response returns 500."""
         mock_instance = MagicMock()
         mock_response = MagicMock()
         mock_response.text = "This is not JSON at all"
         mock_instance.models.generate_content.return_value = mock_response
-        MockClient.return_value = mock_instance
+        mock_get_client.return_value = mock_instance
 
         response = client.post("/api/assistant/search", json={
             "query": "concerts",
         })
         assert response.status_code == 500
 
-    @patch("google.genai.Client")
-    def test_search_json_in_markdown(self, MockClient, client: TestClient):
+    @patch("app.routes.assistant.require_client")
+    def test_search_json_in_markdown(self, mock_get_client, client: TestClient):
         """POST /search handles JSON wrapped in ```json blocks."""
         wrapped = "```json\n" + GEMINI_SEARCH_RESPONSE + "\n```"
         mock_instance = MagicMock()
         mock_response = MagicMock()
         mock_response.text = wrapped
         mock_instance.models.generate_content.return_value = mock_response
-        MockClient.return_value = mock_instance
+        mock_get_client.return_value = mock_instance
 
         response = client.post("/api/assistant/search", json={
             "query": "concerts",
@@ -184,8 +253,8 @@ class TestSearchEndpoint:
 # ──────────────────────────────────────────────
 
 class TestLearnEndpoint:
-    @patch("app.services.ai_learning.genai")
-    def test_learn_creates_profile_attribute(self, mock_genai, client: TestClient, db_session):
+    @patch("app.services.ai_learning.get_client")
+    def test_learn_creates_profile_attribute(self, mock_get_client, client: TestClient, db_session):
         """POST /learn stores a new location preference."""
         user = _seed_user_in_db(db_session)
 
@@ -211,8 +280,8 @@ class TestLearnEndpoint:
         assert attr.value == "Lincoln Fields"
         assert attr.confidence == 0.5
 
-    @patch("app.services.ai_learning.genai")
-    def test_learn_reinforces_existing_attribute(self, mock_genai, client: TestClient, db_session):
+    @patch("app.services.ai_learning.get_client")
+    def test_learn_reinforces_existing_attribute(self, mock_get_client, client: TestClient, db_session):
         """Repeated same location reinforces confidence."""
         user = _seed_user_in_db(db_session)
 
@@ -240,8 +309,8 @@ class TestLearnEndpoint:
         # Original had confidence 0.8, reinforcing adds 0.1 twice
         assert attr.confidence >= 0.8
 
-    @patch("app.services.ai_learning.genai")
-    def test_learn_non_event_action(self, mock_genai, client: TestClient, db_session):
+    @patch("app.services.ai_learning.get_client")
+    def test_learn_non_event_action(self, mock_get_client, client: TestClient, db_session):
         """Non-event actions still return success (no-op learning)."""
         user = _seed_user_in_db(db_session)
 
@@ -251,3 +320,99 @@ class TestLearnEndpoint:
             "actual_action": {"type": "shopping", "name": "milk"},
         })
         assert response.status_code == 200
+
+
+# ──────────────────────────────────────────────
+# /api/assistant/apply
+# ──────────────────────────────────────────────
+
+class TestApplyEndpoint:
+    def _payload(self, user_id):
+        return {
+            "user_id": user_id,
+            "events": [
+                {
+                    "title": "Soccer Practice",
+                    "start_time": "2025-02-15T17:00:00",
+                    "location": "Lincoln Fields",
+                    "attendees": ["AI"],
+                    "category": "Sports & Recreation",
+                },
+                {"title": "Dentist", "start_time": "2025-02-16T09:00:00", "end_time": "2025-02-16T09:30:00"},
+            ],
+            "shopping_list": [{"name": "milk"}, {"name": "eggs", "category": "Food"}, {"name": "bread"}],
+            "todos": [{"title": "Pick up dry cleaning", "due_date": "2025-02-14", "assigned_to": "ai user"}],
+        }
+
+    def test_apply_creates_everything(self, client: TestClient, db_session):
+        user = _seed_user_in_db(db_session)
+
+        response = client.post("/api/assistant/apply", json=self._payload(user.id))
+        assert response.status_code == 200
+        data = response.json()
+
+        assert [e["title"] for e in data["events"]] == ["Soccer Practice", "Dentist"]
+        assert [a["id"] for a in data["events"][0]["attendees"]] == [user.id]
+        assert data["events"][0]["family_id"] == user.family_id
+        assert data["events"][1]["end_time"] == "2025-02-16T09:30:00"
+        assert [i["name"] for i in data["shopping_list"]] == ["milk", "eggs", "bread"]
+        assert data["shopping_list"][1]["category"] == "Food"
+        assert data["todos"][0]["assigned_to"]["id"] == user.id
+
+        from app.models import Event, ShoppingItem, ToDo
+        assert db_session.query(Event).count() == 2
+        assert db_session.query(ShoppingItem).filter(ShoppingItem.family_id == user.family_id).count() == 3
+        assert db_session.query(ToDo).filter(ToDo.created_by_user_id == user.id).count() == 1
+
+    def test_apply_uses_bulk_inserts_and_one_commit(self, client: TestClient, db_session, monkeypatch):
+        from sqlalchemy import event
+        from app.services.geocoding import LocalGeocoder, geocoder
+
+        class StoredProvider(LocalGeocoder):
+            persistent = True
+
+        monkeypatch.setattr(geocoder, "provider", StoredProvider())
+
+        user = _seed_user_in_db(db_session)
+        statements = []
+        commits = []
+        bind = db_session.get_bind()
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        def on_commit(conn):
+            commits.append(conn)
+
+        event.listen(bind, "before_cursor_execute", on_execute)
+        event.listen(bind, "commit", on_commit)
+        try:
+            # Commute re-chaining runs after the response in its own transaction
+            with patch("app.services.commute.recompute_after_change") as recompute:
+                response = client.post("/api/assistant/apply", json=self._payload(user.id))
+        finally:
+            event.remove(bind, "before_cursor_execute", on_execute)
+            event.remove(bind, "commit", on_commit)
+
+        assert response.status_code == 200
+        recompute.assert_called_once()
+        inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+        # events, event_attendees, shopping_items, todos, and one batch for newly geocoded locations
+        assert len(inserts) == 5
+        assert sum("geocoded_places" in s for s in inserts) == 1
+        assert len(commits) == 1
+
+    def test_apply_unknown_user(self, client: TestClient):
+        response = client.post("/api/assistant/apply", json={"user_id": 999, "shopping_list": [{"name": "milk"}]})
+        assert response.status_code == 404
+
+    def test_apply_invalid_payload_writes_nothing(self, client: TestClient, db_session):
+        user = _seed_user_in_db(db_session)
+        payload = self._payload(user.id)
+        payload["todos"].append({"due_date": "2025-02-14"})  # missing title
+
+        response = client.post("/api/assistant/apply", json=payload)
+        assert response.status_code == 422
+
+        from app.models import ShoppingItem
+        assert db_session.query(ShoppingItem).count() == 0
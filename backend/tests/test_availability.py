@@ -0,0 +1,138 @@
+"""Common free time across family members: GET /api/families/{id}/free-slots and the assistant prompt."""
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.services.availability import common_free, merge_intervals
+
+
+def _at(hour, minute=0, day=2):
+    return datetime(2025, 3, day, hour, minute)
+
+
+@pytest.fixture
+def family(db_session):
+    family = models.Family(name="Free")
+    db_session.add(family)
+    db_session.flush()
+    members = [models.User(name=name, email=f"{name.lower()}@example.com", family_id=family.id) for name in ("Alex", "Sam", "Kim")]
+    db_session.add_all(members)
+    db_session.flush()
+    alex, sam, kim = members
+    db_session.add_all([
+        models.Event(title="Work", start_time=_at(9), end_time=_at(12), family_id=family.id, attendees=[alex]),
+        models.Event(title="Gym", start_time=_at(11), end_time=_at(13), family_id=family.id, attendees=[alex]),
+        models.Event(title="School run", start_time=_at(15), end_time=_at(15, 30), family_id=family.id, driver_id=sam.id),
+        models.Event(title="Piano", start_time=_at(18), end_time=_at(19), family_id=family.id, attendees=[kim]),
+    ])
+    db_session.commit()
+    return family, members
+
+
+def _slots(response):
+    assert response.status_code == 200, response.text
+    return [(slot["start"][11:16], slot["end"][11:16], slot["minutes"]) for slot in response.json()]
+
+
+# ──────────────────────────────────────────────
+# Sweep line
+# ──────────────────────────────────────────────
+
+class TestSweep:
+    def test_merge_joins_overlapping_and_touching(self):
+        assert merge_intervals([(_at(11), _at(13)), (_at(9), _at(12)), (_at(13), _at(14)), (_at(16), _at(17))]) == [
+            (_at(9), _at(14)), (_at(16), _at(17)),
+        ]
+
+    def test_free_where_nobody_is_busy(self):
+        busy = [[(_at(9), _at(12))], [(_at(11), _at(13)), (_at(15), _at(16))]]
+        slots = common_free(busy, _at(8), _at(18), min_minutes=30)
+        assert [(s.start, s.end) for s in slots] == [(_at(8), _at(9)), (_at(13), _at(15)), (_at(16), _at(18))]
+
+    def test_short_gaps_and_nights_are_skipped(self):
+        busy = [[(_at(9), _at(12)), (_at(12, 20), _at(21, 45))]]
+        slots = common_free(busy, _at(0), _at(12, day=3), min_minutes=30)
+        assert [(s.start, s.end, s.minutes) for s in slots] == [
+            (_at(7), _at(9), 120),
+            (_at(7, day=3), _at(12, day=3), 300),
+        ]
+
+
+# ──────────────────────────────────────────────
+# Endpoint
+# ──────────────────────────────────────────────
+
+class TestFreeSlotsEndpoint:
+    def test_all_members(self, client: TestClient, family):
+        family, _ = family
+        response = client.get(f"/api/families/{family.id}/free-slots", params={
+            "start": "2025-03-02T08:00:00", "end": "2025-03-02T20:00:00", "min_minutes": 60,
+        })
+        assert _slots(response) == [("08:00", "09:00", 60), ("13:00", "15:00", 120), ("15:30", "18:00", 150), ("19:00", "20:00", 60)]
+
+    def test_selected_members(self, client: TestClient, family):
+        family, (alex, sam, kim) = family
+        response = client.get(f"/api/families/{family.id}/free-slots", params={
+            "start": "2025-03-02T08:00:00", "end": "2025-03-02T20:00:00", "members": [sam.id, kim.id],
+        })
+        assert _slots(response) == [("08:00", "15:00", 420), ("15:30", "18:00", 150), ("19:00", "20:00", 60)]
+
+    def test_rejects_outsiders_and_bad_windows(self, client: TestClient, db_session, family):
+        family, _ = family
+        stranger = models.User(name="Stranger", email="stranger@example.com")
+        db_session.add(stranger)
+        db_session.commit()
+        url = f"/api/families/{family.id}/free-slots"
+        window = {"start": "2025-03-02T08:00:00", "end": "2025-03-02T20:00:00"}
+        assert client.get(url, params={**window, "members": [stranger.id]}).status_code == 400
+        assert client.get(url, params={"start": "2025-03-02T08:00:00", "end": "2025-03-01T08:00:00"}).status_code == 400
+        assert client.get(url, params={"start": "2025-03-01T00:00:00", "end": "2025-06-01T00:00:00"}).status_code == 400
+        assert client.get("/api/families/999/free-slots", params=window).status_code == 404
+
+
+# ──────────────────────────────────────────────
+# Assistant context
+# ──────────────────────────────────────────────
+
+class TestAssistantContext:
+    @patch("app.services.ai_learning.get_client")
+    def test_prompt_lists_free_windows(self, mock_get_client, db_session, family):
+        from app.services.ai_learning import AILearningService
+
+        _, (alex, _, _) = family
+        service = AILearningService(db_session)
+        context = service.get_free_time_context(alex.id, now=_at(8))
+        assert context.splitlines()[:3] == [
+            "- Sun 2025-03-02 08:00 to 09:00",
+            "- Sun 2025-03-02 13:00 to 15:00",
+            "- Sun 2025-03-02 15:30 to 18:00",
+        ]
+        with patch.object(AILearningService, "get_free_time_context", return_value="- Sun 2025-03-02 13:00 to 15:00"):
+            assert "- Sun 2025-03-02 13:00 to 15:00" in service._multi_intent_prompt(alex.id, "coffee with everyone")
+
+    @patch("app.services.ai_learning.get_client")
+    def test_prompt_is_built_off_the_event_loop(self, mock_get_client, db_session, family):
+        import asyncio
+        import threading
+        from app.services.ai_learning import AILearningService
+
+        _, (alex, _, _) = family
+        service = AILearningService(db_session)
+        service.llm = MagicMock()
+        service.llm.generate.return_value = "{}"
+        threads = []
+
+        def free_time(user_id):
+            threads.append(threading.get_ident())
+            return ""
+
+        async def run():
+            with patch.object(service, "get_free_time_context", side_effect=free_time):
+                assert await service.parse_multi_intent(alex.id, "coffee with everyone") == {}
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(run())
+        assert threads and threads[0] != loop_thread
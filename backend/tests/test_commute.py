@@ -0,0 +1,157 @@
+"""Commute chaining from each traveller's previous event of the day."""
+import datetime
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models, pubsub
+from app.services import commute
+from app.services.logistics import LogisticsService
+
+SCHOOL = (47.61, -122.33)
+FIELD = (47.68, -122.29)
+DENTIST = (47.55, -122.39)
+
+
+@pytest.fixture
+def drivers(db_session):
+    users = [models.User(name=name, email=f"{name.lower()}@example.com") for name in ("Alex", "Sam")]
+    db_session.add_all(users)
+    db_session.commit()
+    return users
+
+
+def _create(client, title, start_hour, point, **extra):
+    response = client.post("/api/events/", json={
+        "title": title,
+        "latitude": point[0],
+        "longitude": point[1],
+        "start_time": f"2025-03-01T{start_hour:02d}:00:00",
+        "end_time": f"2025-03-01T{start_hour:02d}:30:00",
+        **extra,
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def _commutes(client):
+    return {e["title"]: e["commute_time_minutes"] for e in client.get("/api/events/").json()}
+
+
+def _drive(a, b):
+    return LogisticsService.get_drive_time(f"{a[0]},{a[1]}", f"{b[0]},{b[1]}")
+
+
+def _from_home(point):
+    return LogisticsService.get_drive_time(commute.HOME, f"{point[0]},{point[1]}")
+
+
+class TestCommuteChaining:
+    def test_chains_from_previous_event(self, client: TestClient, drivers):
+        alex = drivers[0]
+        _create(client, "School", 8, SCHOOL, driver_id=alex.id)
+        _create(client, "Soccer", 10, FIELD, driver_id=alex.id)
+        assert _commutes(client) == {"School": _from_home(SCHOOL), "Soccer": _drive(SCHOOL, FIELD)}
+
+    def test_chains_from_a_weekly_series_in_week_two(self, client: TestClient, drivers):
+        alex = drivers[0]
+        client.post("/api/events/", json={
+            "title": "School", "latitude": SCHOOL[0], "longitude": SCHOOL[1], "driver_id": alex.id,
+            "start_time": "2025-02-22T08:00:00", "end_time": "2025-02-22T08:30:00", "rrule": "FREQ=WEEKLY",
+        })
+        _create(client, "Soccer", 10, FIELD, driver_id=alex.id)
+        assert _commutes(client) == {"School": _from_home(SCHOOL), "Soccer": _drive(SCHOOL, FIELD)}
+
+    def test_insert_in_between_rechains_the_next_event(self, client: TestClient, drivers):
+        alex = drivers[0]
+        _create(client, "School", 8, SCHOOL, driver_id=alex.id)
+        _create(client, "Soccer", 12, FIELD, driver_id=alex.id)
+        _create(client, "Dentist", 10, DENTIST, driver_id=alex.id)
+        assert _commutes(client) == {
+            "School": _from_home(SCHOOL),
+            "Dentist": _drive(SCHOOL, DENTIST),
+            "Soccer": _drive(DENTIST, FIELD),
+        }
+
+    def test_moving_an_event_rechains_old_and_new_neighbours(self, client: TestClient, drivers):
+        alex = drivers[0]
+        school = _create(client, "School", 8, SCHOOL, driver_id=alex.id)
+        _create(client, "Soccer", 10, FIELD, driver_id=alex.id)
+        _create(client, "Dentist", 14, DENTIST, driver_id=alex.id)
+
+        moved = {**school, "start_time": "2025-03-01T12:00:00", "end_time": "2025-03-01T12:30:00"}
+        response = client.put(f"/api/events/{school['id']}", json=moved)
+        assert response.status_code == 200
+        assert _commutes(client) == {
+            "Soccer": _from_home(FIELD),
+            "School": _drive(FIELD, SCHOOL),
+            "Dentist": _drive(SCHOOL, DENTIST),
+        }
+
+    def test_delete_rechains_the_next_event(self, client: TestClient, drivers):
+        alex = drivers[0]
+        _create(client, "School", 8, SCHOOL, driver_id=alex.id)
+        soccer = _create(client, "Soccer", 10, FIELD, driver_id=alex.id)
+        _create(client, "Dentist", 14, DENTIST, driver_id=alex.id)
+
+        assert client.delete(f"/api/events/{soccer['id']}").status_code == 200
+        assert _commutes(client)["Dentist"] == _drive(SCHOOL, DENTIST)
+
+    def test_travellers_are_independent(self, client: TestClient, drivers):
+        alex, sam = drivers
+        _create(client, "School", 8, SCHOOL, driver_id=alex.id)
+        _create(client, "Soccer", 10, FIELD, driver_id=sam.id)
+        # Sam had nothing earlier that day
+        assert _commutes(client)["Soccer"] == _from_home(FIELD)
+
+    def test_attendees_without_driver_take_longest_leg(self, client: TestClient, drivers):
+        alex, sam = drivers
+        _create(client, "School", 8, SCHOOL, attendee_ids=[alex.id])
+        _create(client, "Dentist", 9, DENTIST, attendee_ids=[sam.id])
+        _create(client, "Soccer", 10, FIELD, attendee_ids=[alex.id, sam.id])
+        assert _commutes(client)["Soccer"] == max(_drive(SCHOOL, FIELD), _drive(DENTIST, FIELD))
+
+    def test_previous_day_does_not_chain(self, client: TestClient, drivers):
+        alex = drivers[0]
+        client.post("/api/events/", json={
+            "title": "Late", "latitude": SCHOOL[0], "longitude": SCHOOL[1], "driver_id": alex.id,
+            "start_time": "2025-02-28T22:00:00", "end_time": "2025-02-28T23:00:00",
+        })
+        _create(client, "Soccer", 10, FIELD, driver_id=alex.id)
+        assert _commutes(client)["Soccer"] == _from_home(FIELD)
+
+    def test_recompute_does_not_bump_version(self, client: TestClient, drivers):
+        school = _create(client, "School", 8, SCHOOL, driver_id=drivers[0].id)
+        stored = client.get(f"/api/events/{school['id']}").json()
+        assert stored["version"] == 1
+        assert stored["commute_time_minutes"] == _from_home(SCHOOL)
+
+    def test_client_commute_is_ignored(self, client: TestClient, drivers):
+        _create(client, "School", 8, SCHOOL, driver_id=drivers[0].id, commute_time_minutes=999)
+        assert _commutes(client)["School"] == _from_home(SCHOOL)
+
+    def test_rechained_events_are_published(self, db_session, drivers):
+        alex = drivers[0]
+        events = [
+            models.Event(
+                title=title, family_id=1, driver_id=alex.id, latitude=point[0], longitude=point[1],
+                start_time=datetime.datetime(2025, 3, 1, hour), end_time=datetime.datetime(2025, 3, 1, hour, 30),
+            )
+            for title, hour, point in (("School", 8, SCHOOL), ("Soccer", 10, FIELD))
+        ]
+        db_session.add_all(events)
+        db_session.commit()
+        commute.recompute_after_change(db_session.get_bind(), [events[0].id])
+
+        published = []
+        with patch.object(pubsub.hub, "publish", lambda family_id, message: published.append((family_id, message))):
+            # Nothing moved, so nothing is rewritten or announced
+            commute.recompute_after_change(db_session.get_bind(), [events[0].id])
+            assert published == []
+
+            events[0].start_time = datetime.datetime(2025, 3, 1, 12)
+            events[0].end_time = datetime.datetime(2025, 3, 1, 12, 30)
+            db_session.commit()
+            commute.recompute_after_change(db_session.get_bind(), [events[0].id, events[1].id])
+        assert published == [(1, {"type": "change", "changed": {"events": sorted(e.id for e in events)}})]
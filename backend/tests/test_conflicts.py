@@ -0,0 +1,165 @@
+"""Double-booking warnings on event create/update and on assistant apply."""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.services.conflicts import IntervalTree
+
+
+@pytest.fixture
+def family(db_session):
+    family = models.Family(name="Busy")
+    db_session.add(family)
+    db_session.flush()
+    members = [models.User(name=name, email=f"{name.lower()}@example.com", family_id=family.id) for name in ("Alex", "Sam", "Kim")]
+    db_session.add_all(members)
+    db_session.commit()
+    return family, members
+
+
+def _create(client, title, start, end, **extra):
+    response = client.post("/api/events/", json={"title": title, "start_time": start, "end_time": end, **extra})
+    assert response.status_code == 200
+    return response.json()
+
+
+# ──────────────────────────────────────────────
+# Interval tree
+# ──────────────────────────────────────────────
+
+class TestIntervalTree:
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        base = datetime(2026, 1, 1)
+        for _ in range(200):
+            intervals = []
+            for i in range(rng.randint(0, 40)):
+                start = base + timedelta(minutes=rng.randint(0, 600))
+                intervals.append((start, start + timedelta(minutes=rng.choice((0, 15, 30, 90))), i))
+            tree = IntervalTree(intervals)
+            assert len(tree) == len(intervals)
+            for _ in range(20):
+                start = base + timedelta(minutes=rng.randint(-30, 630))
+                end = start + timedelta(minutes=rng.choice((0, 10, 60, 240)))
+                expected = sorted(value for s, e, value in intervals if s < end and e > start)
+                assert sorted(tree.overlapping(start, end)) == expected
+
+    def test_back_to_back_events_do_not_overlap(self):
+        tree = IntervalTree([(datetime(2026, 1, 1, 9), datetime(2026, 1, 1, 10), "a")])
+        assert tree.overlapping(datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 11)) == []
+        assert tree.overlapping(datetime(2026, 1, 1, 9, 30), None) == ["a"]
+
+
+# ──────────────────────────────────────────────
+# Create / update
+# ──────────────────────────────────────────────
+
+class TestEventConflicts:
+    def test_overlapping_attendee_is_reported(self, client: TestClient, family):
+        _, (alex, sam, kim) = family
+        soccer = _create(client, "Soccer", "2025-03-01T10:00:00", "2025-03-01T11:00:00", attendee_ids=[alex.id, sam.id])
+        assert soccer["conflicts"] == []
+
+        dentist = _create(client, "Dentist", "2025-03-01T10:30:00", "2025-03-01T11:30:00", attendee_ids=[sam.id, kim.id])
+        assert dentist["id"]  # Saved anyway
+        assert dentist["conflicts"] == [{
+            "event_id": dentist["id"],
+            "conflicting_event_id": soccer["id"],
+            "title": "Soccer",
+            "start_time": "2025-03-01T10:00:00",
+            "end_time": "2025-03-01T11:00:00",
+            "user_ids": [sam.id],
+        }]
+
+    def test_driver_counts_as_booked(self, client: TestClient, family):
+        _, (alex, sam, _) = family
+        school = _create(client, "School run", "2025-03-01T08:00:00", "2025-03-01T08:45:00", driver_id=alex.id)
+        swim = _create(client, "Swim", "2025-03-01T08:30:00", "2025-03-01T09:30:00", attendee_ids=[alex.id])
+        assert [(c["conflicting_event_id"], c["user_ids"]) for c in swim["conflicts"]] == [(school["id"], [alex.id])]
+
+    def test_no_conflict_for_other_people_or_adjacent_times(self, client: TestClient, family):
+        _, (alex, sam, _) = family
+        _create(client, "Soccer", "2025-03-01T10:00:00", "2025-03-01T11:00:00", attendee_ids=[alex.id])
+        assert _create(client, "Piano", "2025-03-01T10:00:00", "2025-03-01T11:00:00", attendee_ids=[sam.id])["conflicts"] == []
+        assert _create(client, "Lunch", "2025-03-01T11:00:00", "2025-03-01T12:00:00", attendee_ids=[alex.id])["conflicts"] == []
+
+    def test_update_reports_conflicts_and_ignores_itself(self, client: TestClient, family):
+        _, (alex, _, _) = family
+        soccer = _create(client, "Soccer", "2025-03-01T10:00:00", "2025-03-01T11:00:00", attendee_ids=[alex.id])
+        lunch = _create(client, "Lunch", "2025-03-01T12:00:00", "2025-03-01T13:00:00", attendee_ids=[alex.id])
+
+        # Attendees kept from the stored event when none are sent
+        moved = client.put(f"/api/events/{lunch['id']}", json={
+            "title": "Lunch", "start_time": "2025-03-01T10:45:00", "end_time": "2025-03-01T11:45:00",
+        }).json()
+        assert [c["conflicting_event_id"] for c in moved["conflicts"]] == [soccer["id"]]
+
+        renamed = client.put(f"/api/events/{soccer['id']}", json={
+            "title": "Soccer!", "start_time": "2025-03-01T09:00:00", "end_time": "2025-03-01T10:00:00",
+        }).json()
+        assert renamed["conflicts"] == []
+
+    def test_weekly_series_conflicts_in_week_two(self, client: TestClient, family):
+        _, (alex, _, _) = family
+        soccer = _create(client, "Soccer", "2025-03-01T10:00:00", "2025-03-01T11:00:00",
+                         attendee_ids=[alex.id], rrule="FREQ=WEEKLY")
+        dentist = _create(client, "Dentist", "2025-03-08T10:30:00", "2025-03-08T11:30:00", attendee_ids=[alex.id])
+        assert [(c["conflicting_event_id"], c["start_time"], c["end_time"]) for c in dentist["conflicts"]] == [
+            (soccer["id"], "2025-03-08T10:00:00", "2025-03-08T11:00:00"),
+        ]
+
+    def test_saved_series_is_checked_past_its_first_occurrence(self, client: TestClient, family):
+        _, (alex, _, _) = family
+        dentist = _create(client, "Dentist", "2025-03-08T10:30:00", "2025-03-08T11:30:00", attendee_ids=[alex.id])
+        soccer = _create(client, "Soccer", "2025-03-01T10:00:00", "2025-03-01T11:00:00",
+                         attendee_ids=[alex.id], rrule="FREQ=WEEKLY")
+        assert [c["conflicting_event_id"] for c in soccer["conflicts"]] == [dentist["id"]]
+
+
+# ──────────────────────────────────────────────
+# Assistant apply (batch)
+# ──────────────────────────────────────────────
+
+class TestBatchConflicts:
+    def test_apply_checks_against_family_and_within_batch(self, client: TestClient, db_session, family):
+        family, (alex, sam, _) = family
+        existing = models.Event(title="Work", start_time=datetime(2025, 3, 1, 9), end_time=datetime(2025, 3, 1, 17),
+                                family_id=family.id, attendees=[alex])
+        db_session.add(existing)
+        db_session.commit()
+
+        response = client.post("/api/assistant/apply", json={
+            "user_id": alex.id,
+            "events": [
+                {"title": "Vet", "start_time": "2025-03-01T16:00:00", "end_time": "2025-03-01T16:30:00", "attendee_ids": [alex.id]},
+                {"title": "Piano", "start_time": "2025-03-01T18:00:00", "end_time": "2025-03-01T19:00:00", "attendee_ids": [sam.id]},
+                {"title": "Recital", "start_time": "2025-03-01T18:30:00", "end_time": "2025-03-01T19:30:00", "attendee_ids": [sam.id]},
+                {"title": "Dinner", "start_time": "2025-03-01T20:00:00", "attendee_ids": [alex.id]},
+            ],
+        })
+        assert response.status_code == 200
+        ids = {e["title"]: e["id"] for e in response.json()["events"]}
+        found = {(c["event_id"], c["conflicting_event_id"], tuple(c["user_ids"])) for c in response.json()["conflicts"]}
+        assert found == {
+            (ids["Vet"], existing.id, (alex.id,)),
+            (ids["Piano"], ids["Recital"], (sam.id,)),
+            (ids["Recital"], ids["Piano"], (sam.id,)),
+        }
+
+    def test_apply_checks_against_series_occurrences(self, client: TestClient, db_session, family):
+        family, (alex, _, _) = family
+        work = models.Event(title="Work", start_time=datetime(2025, 2, 22, 9), end_time=datetime(2025, 2, 22, 17),
+                            rrule="FREQ=WEEKLY", family_id=family.id, attendees=[alex])
+        db_session.add(work)
+        db_session.commit()
+
+        response = client.post("/api/assistant/apply", json={
+            "user_id": alex.id,
+            "events": [{"title": "Vet", "start_time": "2025-03-01T16:00:00", "end_time": "2025-03-01T16:30:00", "attendee_ids": [alex.id]}],
+        })
+        assert [(c["conflicting_event_id"], c["start_time"]) for c in response.json()["conflicts"]] == [
+            (work.id, "2025-03-01T09:00:00"),
+        ]
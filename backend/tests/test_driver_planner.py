@@ -0,0 +1,226 @@
+"""Daily driver assignment: greedy + local search, and POST /api/events/plan-drivers."""
+import datetime
+import random
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.services.driver_planner import DriverPlanner, Stop, plan_day
+from app.services.logistics import LogisticsService
+
+
+def _matrix(n, default=20.0, **edges):
+    """Symmetric travel matrix; edges like n1_3=5 set both directions."""
+    travel = [[0.0 if i == j else default for j in range(n)] for i in range(n)]
+    for name, minutes in edges.items():
+        a, b = (int(x) for x in name[1:].split("_"))
+        travel[a][b] = travel[b][a] = minutes
+    return travel
+
+
+def _assigned(plan):
+    return {stop.event_id: driver for driver, route in plan.routes.items() for stop in route}
+
+
+# ──────────────────────────────────────────────
+# Solver
+# ──────────────────────────────────────────────
+
+class TestDriverPlanner:
+    def test_chains_reachable_events(self):
+        travel = _matrix(3, n1_2=10)
+        stops = [Stop(1, 540, 570, 1), Stop(2, 600, 630, 2)]
+        plan = DriverPlanner(travel, [7, 8]).solve(stops)
+        # One driver does both: 20 + 10 + 20 beats two round trips of 40
+        assert _assigned(plan) == {1: 7, 2: 7}
+        assert plan.total_minutes == 50
+        assert plan.legs == {1: 20, 2: 10}
+
+    def test_unreachable_in_time_goes_to_another_driver(self):
+        travel = _matrix(3, n1_2=45)
+        stops = [Stop(1, 540, 570, 1), Stop(2, 600, 630, 2)]
+        plan = DriverPlanner(travel, [7, 8]).solve(stops)
+        assert set(_assigned(plan).values()) == {7, 8}
+
+    def test_overlapping_events_beyond_drivers_are_unassigned(self):
+        stops = [Stop(i, 540, 600, i) for i in (1, 2, 3)]
+        plan = DriverPlanner(_matrix(4), [7, 8]).solve(stops)
+        assert len(plan.unassigned) == 1
+        assert len(_assigned(plan)) == 2
+
+    def test_makes_room_for_an_unassigned_event(self):
+        # C fits either driver but is cheaper after A; D fits only after A.
+        # Greedy gives C the A driver and strands D; local search moves C over.
+        travel = _matrix(5, n1_3=5, n2_3=8, n1_4=5, n2_4=30)
+        stops = [Stop(1, 540, 570, 1), Stop(2, 540, 570, 2), Stop(3, 580, 600, 3), Stop(4, 580, 600, 4)]
+        planner = DriverPlanner(travel, [7, 8])
+        assert len(planner.greedy(stops).unassigned) == 1
+        plan = planner.solve(stops)
+        assert plan.unassigned == []
+        assignment = _assigned(plan)
+        assert assignment[3] == assignment[2] and assignment[4] == assignment[1]
+
+    def test_local_search_never_worse_and_stays_feasible(self):
+        rng = random.Random(3)
+        improved = 0
+        for _ in range(30):
+            n = 10
+            travel = [[0.0 if i == j else rng.uniform(5, 40) for j in range(n + 1)] for i in range(n + 1)]
+            stops = []
+            for i in range(1, n + 1):
+                start = rng.randrange(420, 1200, 15)
+                stops.append(Stop(i, start, start + 30, i))
+            planner = DriverPlanner(travel, [1, 2, 3])
+            greedy = planner.greedy(stops)
+            plan = planner.solve(stops)
+            assert len(plan.unassigned) <= len(greedy.unassigned)
+            if len(plan.unassigned) == len(greedy.unassigned):
+                assert plan.total_minutes <= greedy.total_minutes + 1e-6
+            assert all(planner.feasible(route) for route in plan.routes.values())
+            assert sorted([*_assigned(plan), *(s.event_id for s in plan.unassigned)]) == list(range(1, n + 1))
+            assert plan.total_minutes == pytest.approx(sum(planner.route_minutes(r) for r in plan.routes.values()))
+            improved += plan.total_minutes < greedy.total_minutes - 1e-6
+        assert improved > 0
+
+    def test_zero_budget_returns_greedy(self):
+        travel = _matrix(5, n1_3=5, n2_3=8, n1_4=5, n2_4=30)
+        stops = [Stop(1, 540, 570, 1), Stop(2, 540, 570, 2), Stop(3, 580, 600, 3), Stop(4, 580, 600, 4)]
+        plan = DriverPlanner(travel, [7, 8], budget_seconds=0).solve(stops)
+        assert plan.timed_out
+        assert len(plan.unassigned) == 1
+
+    def test_greedy_total_matches_routes_on_addresses(self):
+        # Addresses without coordinates: the matrix can have a non-zero diagonal
+        places = ["Home", "Lincoln High", "Aquatic Center", "Library"]
+        travel = LogisticsService.get_drive_time_matrix(places, places)
+        travel[0][0] = 41
+        stops = [Stop(1, 480, 510, 1), Stop(2, 480, 540, 2), Stop(3, 660, 720, 3), Stop(4, 840, 900, 1)]
+        planner = DriverPlanner(travel, [7, 8], budget_seconds=0)
+        assert all(planner.travel[i][i] == 0 for i in range(len(places)))
+
+        greedy = planner.greedy(stops)
+        assert greedy.greedy_minutes == pytest.approx(sum(planner.route_minutes(route) for route in greedy.routes.values()))
+        assert planner.solve(stops).greedy_minutes == pytest.approx(greedy.greedy_minutes)
+
+    def test_plan_day_reports_real_greedy_minutes(self):
+        day = datetime.date(2025, 3, 1)
+        events = [
+            SimpleNamespace(id=i, location=place, latitude=None, longitude=None,
+                            start_time=datetime.datetime(2025, 3, 1, hour), end_time=datetime.datetime(2025, 3, 1, hour, 30))
+            for i, (place, hour) in enumerate([("Lincoln High", 8), ("Aquatic Center", 8), ("Library", 15)], start=1)
+        ]
+        plan = plan_day(events, [7, 8], day, budget_seconds=0)
+        # No local search ran, so the greedy total is the plan's real route total
+        assert plan.greedy_minutes == pytest.approx(plan.total_minutes)
+
+# ──────────────────────────────────────────────
+# Endpoint
+# ──────────────────────────────────────────────
+
+@pytest.fixture
+def family(db_session):
+    family = models.Family(name="Planners")
+    db_session.add(family)
+    db_session.flush()
+    members = [models.User(name=name, email=f"{name.lower()}@example.com", family_id=family.id, status="active") for name in ("Alex", "Sam")]
+    db_session.add_all(members)
+    db_session.commit()
+    return family, members
+
+
+def _event(client, title, start, end, lat, lon):
+    response = client.post("/api/events/", json={
+        "title": title, "start_time": start, "end_time": end, "latitude": lat, "longitude": lon,
+    })
+    return response.json()["id"]
+
+
+class TestPlanDriversEndpoint:
+    def _seed(self, client, db_session, family):
+        ids = [
+            _event(client, "School", "2025-03-01T08:00:00", "2025-03-01T08:30:00", 47.61, -122.33),
+            _event(client, "Swim", "2025-03-01T08:00:00", "2025-03-01T09:00:00", 47.68, -122.29),
+            _event(client, "Soccer", "2025-03-01T11:00:00", "2025-03-01T12:00:00", 47.62, -122.34),
+            _event(client, "Other day", "2025-03-02T11:00:00", "2025-03-02T12:00:00", 47.62, -122.34),
+        ]
+        db_session.query(models.Event).update({models.Event.family_id: family.id})
+        db_session.commit()
+        return ids
+
+    def test_plan_only(self, client: TestClient, db_session, family):
+        family, members = family
+        school, swim, soccer, other = self._seed(client, db_session, family)
+        response = client.post("/api/events/plan-drivers", params={"date": "2025-03-01", "family_id": family.id})
+        assert response.status_code == 200
+        plan = response.json()
+        assignments = {a["event_id"]: a["driver_id"] for a in plan["assignments"]}
+        assert set(assignments) == {school, swim, soccer}
+        # School and Swim overlap, so both drivers are needed
+        assert assignments[school] != assignments[swim]
+        assert set(assignments.values()) == {m.id for m in members}
+        assert plan["unassigned_event_ids"] == []
+        assert plan["total_drive_minutes"] == pytest.approx(sum(plan["minutes_by_driver"].values()), abs=1)
+        assert plan["applied"] is False
+        assert db_session.get(models.Event, school).driver_id is None
+
+    def test_apply_saves_drivers(self, client: TestClient, db_session, family):
+        family, members = family
+        school, swim, soccer, _ = self._seed(client, db_session, family)
+        response = client.post("/api/events/plan-drivers", params={"date": "2025-03-01", "family_id": family.id, "apply": True})
+        assert response.json()["applied"] is True
+        db_session.expire_all()
+        for assignment in response.json()["assignments"]:
+            assert db_session.get(models.Event, assignment["event_id"]).driver_id == assignment["driver_id"]
+
+    def test_series_occurrence_is_planned_but_not_applied(self, client: TestClient, db_session, family):
+        family, _ = family
+        school, swim, soccer, _ = self._seed(client, db_session, family)
+        series = models.Event(title="Piano", start_time=datetime.datetime(2025, 2, 22, 14), end_time=datetime.datetime(2025, 2, 22, 15),
+                              latitude=47.63, longitude=-122.31, rrule="FREQ=WEEKLY", family_id=family.id)
+        db_session.add(series)
+        db_session.commit()
+
+        response = client.post("/api/events/plan-drivers", params={"date": "2025-03-01", "family_id": family.id, "apply": True})
+        planned = {a["event_id"]: a for a in response.json()["assignments"]}
+        assert set(planned) == {school, swim, soccer, series.id}
+        assert planned[series.id]["recurrence_id"] == "2025-03-01T14:00:00"
+        assert planned[series.id]["driver_id"] is not None
+        db_session.expire_all()
+        # One day's driver is not written onto every occurrence
+        assert db_session.get(models.Event, series.id).driver_id is None
+        assert db_session.get(models.Event, school).driver_id == planned[school]["driver_id"]
+
+    def test_explicit_drivers(self, client: TestClient, db_session, family):
+        family, members = family
+        school, swim, soccer, _ = self._seed(client, db_session, family)
+        response = client.post(
+            "/api/events/plan-drivers",
+            params={"date": "2025-03-01", "family_id": family.id},
+            json={"driver_ids": [members[0].id]},
+        )
+        plan = response.json()
+        assert len(plan["unassigned_event_ids"]) == 1
+        assert {a["driver_id"] for a in plan["assignments"]} == {members[0].id, None}
+
+    def test_apply_keeps_manual_driver_of_unplaced_event(self, client: TestClient, db_session, family):
+        family, (alex, sam) = family
+        school, swim, _, _ = self._seed(client, db_session, family)
+        db_session.query(models.Event).filter(models.Event.id.in_([school, swim])).update({models.Event.driver_id: sam.id})
+        db_session.commit()
+
+        response = client.post(
+            "/api/events/plan-drivers",
+            params={"date": "2025-03-01", "family_id": family.id, "apply": True},
+            json={"driver_ids": [alex.id]},
+        )
+        [unplaced] = response.json()["unassigned_event_ids"]
+        db_session.expire_all()
+        event = db_session.get(models.Event, unplaced)
+        assert event.driver_id == sam.id
+        assert event.version == 1
+
+    def test_no_drivers(self, client: TestClient, db_session):
+        response = client.post("/api/events/plan-drivers", params={"date": "2025-03-01", "family_id": 999})
+        assert response.status_code == 400
@@ -92,3 +92,122 @@ def test_delete_event(client: TestClient):
     # Verify gone
     response = client.get(f"/api/events/{event_id}")
     assert response.status_code == 404
+
+def test_update_event_version_conflict(client: TestClient):
+    start = datetime.now()
+    payload = {
+        "title": "Practice",
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+    }
+    created = client.post("/api/events/", json=payload).json()
+    assert created["version"] == 1
+
+    # First writer wins and bumps the version
+    first = client.put(f"/api/events/{created['id']}", json={**payload, "title": "Practice (moved)", "version": 1})
+    assert first.status_code == 200
+    assert first.json()["version"] == 2
+
+    # Second writer still holds version 1
+    second = client.put(f"/api/events/{created['id']}", json={**payload, "title": "Practice (cancelled)", "version": 1})
+    assert second.status_code == 409
+    assert client.get(f"/api/events/{created['id']}").json()["title"] == "Practice (moved)"
+
+def test_update_event_replaces_attendees(client: TestClient):
+    user_ids = [
+        client.post("/api/users/", json={"name": f"Kid {i}", "email": f"kid{i}@example.com", "password": "pwd"}).json()["id"]
+        for i in range(2)
+    ]
+    start = datetime.now()
+    payload = {
+        "title": "Swim",
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+    }
+    created = client.post("/api/events/", json={**payload, "attendee_ids": [user_ids[0]]}).json()
+
+    response = client.put(f"/api/events/{created['id']}", json={**payload, "attendee_ids": [user_ids[1]]})
+    assert response.status_code == 200
+    assert [a["id"] for a in response.json()["attendees"]] == [user_ids[1]]
+
+def test_read_events_includes_attendees_and_driver(client: TestClient):
+    # The list endpoint runs on the async session, where relationships must be eager-loaded
+    parent = client.post("/api/users/", json={"name": "Parent", "email": "parent@example.com", "password": "pwd"}).json()
+    kid = client.post("/api/users/", json={"name": "Kid", "email": "kid@example.com", "password": "pwd"}).json()
+    start = datetime.now()
+    client.post(
+        "/api/events/",
+        json={
+            "title": "Practice",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "attendee_ids": [kid["id"]],
+            "driver_id": parent["id"],
+        },
+    )
+
+    response = client.get("/api/events/")
+    assert response.status_code == 200
+    event = response.json()[0]
+    assert [a["id"] for a in event["attendees"]] == [kid["id"]]
+    assert event["driver"]["id"] == parent["id"]
+
+
+def _event(title, lat, lon, start="2025-03-01T10:00:00", end="2025-03-01T11:00:00"):
+    return {"title": title, "latitude": lat, "longitude": lon, "start_time": start, "end_time": end}
+
+
+def test_nearby_events(client: TestClient):
+    client.post("/api/events/", json=_event("Park", 47.61, -122.33))
+    client.post("/api/events/", json=_event("Library", 47.62, -122.35))
+    client.post("/api/events/", json=_event("Tacoma", 47.25, -122.44))
+    client.post("/api/events/", json=_event("Next week", 47.61, -122.33, "2025-03-08T10:00:00", "2025-03-08T11:00:00"))
+
+    response = client.get("/api/events/nearby", params={"lat": 47.61, "lon": -122.34, "radius": 5})
+    assert response.status_code == 200
+    events = response.json()
+    assert sorted(e["title"] for e in events) == ["Library", "Next week", "Park"]
+    assert [e["distance_km"] for e in events] == sorted(e["distance_km"] for e in events)
+
+    window = client.get("/api/events/nearby", params={
+        "lat": 47.61, "lon": -122.34, "radius": 5, "start": "2025-03-01T00:00:00", "end": "2025-03-02T00:00:00",
+    })
+    assert sorted(e["title"] for e in window.json()) == ["Library", "Park"]
+
+    wide = client.get("/api/events/nearby", params={"lat": 47.61, "lon": -122.34, "radius": 50})
+    assert "Tacoma" in [e["title"] for e in wide.json()]
+
+
+def test_nearby_events_expand_series(client: TestClient):
+    series = client.post("/api/events/", json={**_event("Practice", 47.61, -122.33, "2025-02-22T10:00:00", "2025-02-22T11:00:00"), "rrule": "FREQ=WEEKLY"}).json()
+
+    window = client.get("/api/events/nearby", params={
+        "lat": 47.61, "lon": -122.34, "radius": 5, "start": "2025-03-01T00:00:00", "end": "2025-03-02T00:00:00",
+    }).json()
+    assert [(e["id"], e["start_time"], e["recurrence_id"]) for e in window] == [
+        (series["id"], "2025-03-01T10:00:00", "2025-03-01T10:00:00"),
+    ]
+    assert window[0]["distance_km"] > 0
+
+
+def test_nearby_events_validates_input(client: TestClient):
+    assert client.get("/api/events/nearby", params={"lat": 95, "lon": 0}).status_code == 400
+    assert client.get("/api/events/nearby", params={"lat": 47.6, "lon": -122.3, "radius": 500}).status_code == 400
+    assert client.get("/api/events/nearby", params={"lon": -122.3}).status_code == 422
+
+
+def test_event_location_gets_grid_cell(client: TestClient, db_session, monkeypatch):
+    from app import models
+    from app.services.geocoding import LocalGeocoder, geocoder
+    from app.services.logistics import grid_cell
+
+    class StoredProvider(LocalGeocoder):
+        persistent = True
+
+    monkeypatch.setattr(geocoder, "provider", StoredProvider())
+
+    created = client.post("/api/events/", json={**_event("Soccer", None, None), "location": "Lincoln Fields"}).json()
+    assert isinstance(created["latitude"], float)
+    stored = db_session.get(models.Event, created["id"])
+    assert stored.geo_cell == grid_cell(created["latitude"], created["longitude"])
+
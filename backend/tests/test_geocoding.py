@@ -0,0 +1,193 @@
+"""Geocode cache, batch resolution and autocomplete."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.services.geocoding import Geocoder, LocalGeocoder, NullGeocoder, PrefixIndex, Place, geocoder, normalize_address
+
+
+class CountingProvider(LocalGeocoder):
+    """Stands in for a real provider, whose results are stored."""
+
+    name = "counting"
+    persistent = True
+
+    def __init__(self, unknown=()):
+        super().__init__()
+        self.calls = []
+        self.unknown = set(unknown)
+
+    def geocode(self, query, key):
+        self.calls.append(key)
+        if key in self.unknown:
+            return None
+        return super().geocode(query, key)
+
+
+class FailingProvider:
+    name = "failing"
+
+    def __init__(self):
+        self.calls = 0
+
+    def geocode(self, query, key):
+        self.calls += 1
+        raise ConnectionError("geocoder down")
+
+
+# ──────────────────────────────────────────────
+# Service
+# ──────────────────────────────────────────────
+
+class TestGeocoder:
+    def test_normalize_address(self):
+        assert normalize_address("  Lincoln   Fields, ") == "lincoln fields"
+        assert normalize_address("St. Mary's") == "st mary s"
+        assert normalize_address(None) == ""
+
+    def test_repeated_places_hit_provider_once(self, db_session):
+        provider = CountingProvider()
+        geo = Geocoder(provider)
+        first = geo.resolve_many(["Lincoln Fields", "Home", "lincoln fields", "Home"], db_session)
+        geo.resolve("LINCOLN FIELDS.", db_session)
+        assert sorted(provider.calls) == ["home", "lincoln fields"]
+        assert first["Lincoln Fields"] == first["lincoln fields"]
+
+    def test_table_survives_restart(self, db_session):
+        provider = CountingProvider(unknown={"nowhere"})
+        Geocoder(provider).resolve_many(["Lincoln Fields", "Nowhere"], db_session)
+        db_session.commit()
+        assert db_session.query(models.GeocodedPlace).count() == 2
+
+        # A new worker (empty LRU) reads both rows, including the miss
+        fresh = Geocoder(provider)
+        resolved = fresh.resolve_many(["Lincoln Fields", "Nowhere"], db_session)
+        assert resolved["Nowhere"] is None
+        assert resolved["Lincoln Fields"].provider == "counting"
+        assert len(provider.calls) == 2
+        assert fresh.stats()["table_hits"] == 2
+
+    def test_table_is_per_provider(self, db_session):
+        Geocoder(CountingProvider()).resolve_many(["Lincoln Fields"], db_session)
+        db_session.commit()
+
+        class OtherProvider(CountingProvider):
+            name = "other"
+
+        other = OtherProvider()
+        assert Geocoder(other).resolve("Lincoln Fields", db_session).provider == "other"
+        assert other.calls == ["lincoln fields"]
+        assert Geocoder(other).autocomplete("linc", db_session) == []
+
+    def test_stand_in_points_are_not_stored(self, db_session):
+        geo = Geocoder(LocalGeocoder())
+        assert geo.resolve("Lincoln Fields", db_session) is not None
+        db_session.commit()
+        assert db_session.query(models.GeocodedPlace).count() == 0
+
+    def test_default_is_no_geocoding(self, db_session):
+        geo = Geocoder()
+        assert isinstance(geo.provider, NullGeocoder)
+        assert geo.resolve("Lincoln Fields", db_session) is None
+        assert geo.resolve("47.61,-122.33").coords == (47.61, -122.33)
+        assert db_session.query(models.GeocodedPlace).count() == 0
+
+    def test_provider_errors_are_not_cached(self, db_session):
+        provider = FailingProvider()
+        geo = Geocoder(provider)
+        assert geo.resolve("Lincoln Fields", db_session) is None
+        assert geo.resolve("Lincoln Fields", db_session) is None
+        assert provider.calls == 2
+        assert db_session.query(models.GeocodedPlace).count() == 0
+
+    def test_coordinates_pass_through(self):
+        provider = CountingProvider()
+        place = Geocoder(provider).resolve("47.61,-122.33")
+        assert place.coords == (47.61, -122.33)
+        assert provider.calls == []
+
+    def test_prefix_index(self):
+        index = PrefixIndex([
+            Place("lincoln fields", "Lincoln Fields", 0, 0, "local"),
+            Place("lincoln high school", "Lincoln High School", 0, 0, "local"),
+            Place("green lake fields", "Green Lake Fields", 0, 0, "local"),
+        ])
+        assert [p.query_key for p in index.search("linc")] == ["lincoln fields", "lincoln high school"]
+        assert [p.query_key for p in index.search("fie")] == ["green lake fields", "lincoln fields"]
+        assert [p.query_key for p in index.search("lincoln h")] == ["lincoln high school"]
+        assert index.search("zoo") == []
+        assert len(index.search("l", limit=1)) == 1
+
+    def test_autocomplete_never_calls_provider(self, db_session):
+        provider = CountingProvider()
+        geo = Geocoder(provider)
+        geo.resolve_many(["Lincoln Fields", "Lincoln High School"], db_session)
+        db_session.commit()
+        calls = len(provider.calls)
+        assert [p.display_name for p in geo.autocomplete("Linc", db_session)] == ["Lincoln Fields", "Lincoln High School"]
+        assert geo.autocomplete("Lindbergh", db_session) == []
+        assert len(provider.calls) == calls
+
+        # Another worker's index is built from the table
+        assert len(Geocoder(provider).autocomplete("lincoln", db_session)) == 2
+
+
+# ──────────────────────────────────────────────
+# Routes
+# ──────────────────────────────────────────────
+
+class TestPlacesRoutes:
+    def test_resolve_batch(self, client: TestClient):
+        response = client.post("/api/places/resolve", json={"queries": ["Lincoln Fields", "Home", "lincoln fields"]})
+        assert response.status_code == 200
+        places = response.json()
+        assert [p["query"] for p in places] == ["Lincoln Fields", "Home", "lincoln fields"]
+        assert places[0]["latitude"] == places[2]["latitude"]
+
+    def test_resolve_batch_limit(self, client: TestClient):
+        response = client.post("/api/places/resolve", json={"queries": ["x"] * 101})
+        assert response.status_code == 400
+
+    def test_resolve_single(self, client: TestClient):
+        response = client.get("/api/places/resolve", params={"q": "Lincoln Fields"})
+        assert response.status_code == 200
+        assert response.json()["display_name"] == "Lincoln Fields"
+
+    def test_autocomplete_from_cache(self, client: TestClient):
+        assert client.get("/api/places/autocomplete", params={"q": "linc"}).json() == []
+        client.post("/api/places/resolve", json={"queries": ["Lincoln Fields"]})
+        suggestions = client.get("/api/places/autocomplete", params={"q": "linc"}).json()
+        assert [s["display_name"] for s in suggestions] == ["Lincoln Fields"]
+
+    def test_event_location_is_geocoded(self, client: TestClient, monkeypatch):
+        monkeypatch.setattr(geocoder, "provider", CountingProvider())
+        response = client.post("/api/events/", json={
+            "title": "Soccer",
+            "location": "Lincoln Fields",
+            "start_time": "2025-03-01T10:00:00",
+            "end_time": "2025-03-01T11:00:00",
+        })
+        assert response.status_code == 200
+        event = response.json()
+        place = geocoder.resolve("Lincoln Fields")
+        assert (event["latitude"], event["longitude"]) == place.coords
+
+    def test_event_skips_stand_in_coordinates(self, client: TestClient):
+        response = client.post("/api/events/", json={
+            "title": "Soccer",
+            "location": "Lincoln Fields",
+            "start_time": "2025-03-01T10:00:00",
+            "end_time": "2025-03-01T11:00:00",
+        })
+        assert (response.json()["latitude"], response.json()["longitude"]) == (None, None)
+
+    def test_event_keeps_given_coordinates(self, client: TestClient):
+        response = client.post("/api/events/", json={
+            "title": "Soccer",
+            "location": "Lincoln Fields",
+            "latitude": 47.61,
+            "longitude": -122.33,
+            "start_time": "2025-03-01T10:00:00",
+            "end_time": "2025-03-01T11:00:00",
+        })
+        assert (response.json()["latitude"], response.json()["longitude"]) == (47.61, -122.33)
@@ -0,0 +1,50 @@
+"""
+Startup import regression budget. Each check runs in a fresh interpreter so
+modules already loaded by the test session don't hide the real cost.
+Raise APP_IMPORT_BUDGET_MS on slow CI runners rather than deleting the test.
+"""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = float(os.getenv("APP_IMPORT_BUDGET_MS", "2000"))
+
+# Provider SDKs and Alembic load on first use (app.services.llm registry, app.migrations)
+LAZY_MODULES = ["openai", "google.genai", "alembic", "numpy"]
+
+
+def _run(code: str) -> str:
+    proc = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return proc.stdout.strip().splitlines()[-1]
+
+
+def test_app_import_does_not_load_sdks():
+    loaded = json.loads(_run(
+        "import sys, json, app.main; "
+        f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    ))
+    assert loaded == []
+
+
+def test_sdk_loads_on_first_client_request():
+    loaded = json.loads(_run(
+        "import os, sys, json; os.environ['OPENAI_API_KEY'] = 'sk-test'; "
+        "from app.services import llm; llm.get_client('openai'); "
+        "print(json.dumps(['openai' in sys.modules, 'google.genai' in sys.modules]))"
+    ))
+    assert loaded == [True, False]
+
+
+def test_app_import_time_within_budget():
+    proc = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    last = [line for line in proc.stderr.splitlines() if line.endswith("| app.main")][-1]
+    cumulative_ms = int(last.split("|")[1]) / 1000
+    assert cumulative_ms < IMPORT_BUDGET_MS, f"import app.main took {cumulative_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
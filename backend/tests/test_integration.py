@@ -42,8 +42,8 @@ def _seed_user_with_family(db_session):
 # ──────────────────────────────────────────────
 
 class TestVoiceToEventFlow:
-    @patch("app.routes.voice.OpenAI")
-    def test_voice_upload_creates_parsed_data(self, MockOpenAI, client: TestClient, db_session):
+    @patch("app.routes.voice.require_client")
+    def test_voice_upload_creates_parsed_data(self, mock_require_client, client: TestClient, db_session):
         """Upload audio → Whisper transcribes → NLP parses → returns events + shopping."""
         family, user = _seed_user_with_family(db_session)
 
@@ -58,7 +58,7 @@ class TestVoiceToEventFlow:
             whisper_text="Soccer practice next Tuesday and buy milk",
             chat_content=NLP_MULTI_INTENT_RESPONSE,
         )
-        MockOpenAI.return_value = openai_instance
+        mock_require_client.return_value = openai_instance
 
         # Upload a fake audio file
         response = client.post(
@@ -72,8 +72,8 @@ class TestVoiceToEventFlow:
         assert len(data["parsed_data"]["events"]) == 1
         assert len(data["parsed_data"]["shopping_items"]) == 2
 
-    @patch("app.routes.voice.OpenAI")
-    def test_voice_without_auth_fails(self, MockOpenAI, client: TestClient):
+    @patch("app.routes.voice.require_client")
+    def test_voice_without_auth_fails(self, mock_require_client, client: TestClient):
         """Voice endpoint requires authentication."""
         response = client.post(
             "/api/voice/process",
@@ -81,8 +81,8 @@ class TestVoiceToEventFlow:
         )
         assert response.status_code == 401
 
-    @patch("app.routes.voice.OpenAI")
-    def test_voice_whisper_failure(self, MockOpenAI, client: TestClient, db_session):
+    @patch("app.routes.voice.require_client")
+    def test_voice_whisper_failure(self, mock_require_client, client: TestClient, db_session):
         """If Whisper fails, voice endpoint returns 500."""
         family, user = _seed_user_with_family(db_session)
 
@@ -93,7 +93,7 @@ class TestVoiceToEventFlow:
 
         openai_instance = MagicMock()
         openai_instance.audio.transcriptions.create.side_effect = Exception("Whisper API error")
-        MockOpenAI.return_value = openai_instance
+        mock_require_client.return_value = openai_instance
 
         response = client.post(
             "/api/voice/process",
@@ -108,13 +108,13 @@ class TestVoiceToEventFlow:
 # ──────────────────────────────────────────────
 
 class TestTextToMultiIntentFlow:
-    @patch("app.services.ai_learning.genai")
-    def test_text_parses_into_events_shopping_todos(self, mock_genai, client: TestClient, db_session):
+    @patch("app.services.ai_learning.get_client")
+    def test_text_parses_into_events_shopping_todos(self, mock_get_client, client: TestClient, db_session):
         """Text input → Gemini parse → returns events, shopping, todos for action cards."""
         family, user = _seed_user_with_family(db_session)
 
         mock_client = mock_gemini_client(GEMINI_MULTI_INTENT_RESPONSE)
-        mock_genai.Client.return_value = mock_client
+        mock_get_client.return_value = mock_client
 
         # Call interact endpoint
         response = client.post("/api/assistant/interact", json={
@@ -160,8 +160,8 @@ class TestTextToMultiIntentFlow:
 # ──────────────────────────────────────────────
 
 class TestLearningFeedbackLoop:
-    @patch("app.services.ai_learning.genai")
-    def test_feedback_improves_next_query(self, mock_genai, client: TestClient, db_session):
+    @patch("app.services.ai_learning.get_client")
+    def test_feedback_improves_next_query(self, mock_get_client, client: TestClient, db_session):
         """
         1. User asks about soccer → AI responds
         2. User confirms with location → learn endpoint stores preference
@@ -171,7 +171,7 @@ class TestLearningFeedbackLoop:
 
         # Step 1: Initial interaction
         mock_client = mock_gemini_client(GEMINI_MULTI_INTENT_RESPONSE)
-        mock_genai.Client.return_value = mock_client
+        mock_get_client.return_value = mock_client
 
         client.post("/api/assistant/interact", json={
             "query": "Soccer practice",
@@ -202,7 +202,7 @@ class TestLearningFeedbackLoop:
         # Step 4: Next interaction — the profile context should now include the learned data
         # Reset mock for second call
         mock_client2 = mock_gemini_client(GEMINI_MULTI_INTENT_RESPONSE)
-        mock_genai.Client.return_value = mock_client2
+        mock_get_client.return_value = mock_client2
 
         client.post("/api/assistant/interact", json={
             "query": "Soccer this Saturday",
@@ -236,18 +236,18 @@ class TestErrorHandling:
         response = client.put("/api/todos/99999", json={"title": "x"})
         assert response.status_code == 404
 
-    @patch("google.genai.Client")
-    def test_search_gemini_timeout(self, MockClient, client: TestClient):
+    @patch("app.routes.assistant.require_client")
+    def test_search_gemini_timeout(self, mock_require_client, client: TestClient):
         """Gemini timeout in search returns 500."""
         mock_instance = MagicMock()
         mock_instance.models.generate_content.side_effect = TimeoutError("Gemini timed out")
-        MockClient.return_value = mock_instance
+        mock_require_client.return_value = mock_instance
 
         response = client.post("/api/assistant/search", json={"query": "concerts"})
         assert response.status_code == 500
 
-    @patch("app.services.ai_learning.genai")
-    def test_interact_gemini_malformed_json(self, mock_genai, client: TestClient, db_session):
+    @patch("app.services.ai_learning.get_client")
+    def test_interact_gemini_malformed_json(self, mock_get_client, client: TestClient, db_session):
         """Gemini returns non-JSON text in interact → 500."""
         family, user = _seed_user_with_family(db_session)
 
@@ -255,7 +255,7 @@ class TestErrorHandling:
         mock_response = MagicMock()
         mock_response.text = "Sorry, I can't help with that"
         mock_client.models.generate_content.return_value = mock_response
-        mock_genai.Client.return_value = mock_client
+        mock_get_client.return_value = mock_client
 
         response = client.post("/api/assistant/interact", json={
             "query": "something",
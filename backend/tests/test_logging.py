@@ -0,0 +1,170 @@
+"""Structured logging: queue handler, request-ID correlation, payload sampling."""
+import ast
+import json
+import logging
+import os
+import queue
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import log
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+
+def _record(msg="hello", level=logging.INFO, **extra):
+    record = logging.makeLogRecord({"name": "app.test", "levelno": level, "levelname": logging.getLevelName(level), "msg": msg})
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+@pytest.fixture
+def payload_debug(monkeypatch):
+    """DEBUG enabled for app.* and every request's payloads sampled."""
+    monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "1")
+    app_logger = logging.getLogger("app")
+    previous = app_logger.level
+    app_logger.setLevel(logging.DEBUG)
+    yield
+    app_logger.setLevel(previous)
+
+
+# ──────────────────────────────────────────────
+# Handler + formatter
+# ──────────────────────────────────────────────
+
+class TestHandler:
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = log.DroppingQueueHandler(queue.Queue(maxsize=2))
+        for i in range(5):
+            handler.handle(_record(f"message {i}"))
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+
+    def test_json_lines_carry_request_id_extras_and_traceback(self):
+        handler = log.DroppingQueueHandler(queue.Queue())
+        handler.addFilter(log.RequestIdFilter())
+        logger = logging.getLogger("app.test.json")
+        logger.addHandler(handler)
+        logger.propagate = False
+        token = log._request_id.set("req-1")
+        try:
+            try:
+                raise ValueError("bad input")
+            except ValueError:
+                logger.exception("failed for %s", "alice", extra={"payload": "raw"})
+        finally:
+            log._request_id.reset(token)
+            logger.removeHandler(handler)
+
+        line = json.loads(log.JsonFormatter().format(handler.queue.get_nowait()))
+        assert line["msg"] == "failed for alice"
+        assert line["level"] == "ERROR"
+        assert line["request_id"] == "req-1"
+        assert line["payload"] == "raw"
+        assert "ValueError: bad input" in line["exc"]
+
+    def test_text_format_without_request(self):
+        text = log.TextFormatter().format(_record("plain"))
+        assert "INFO app.test [None] plain" in text
+
+    def test_library_loggers_held_at_warning(self):
+        from app import database
+
+        pools = [
+            f"{cls.__module__}.{cls.__name__}" for cls in vars(database).values()
+            if isinstance(cls, type) and issubclass(cls, database._TimedCheckout) and cls is not database._TimedCheckout
+        ]
+        root_level = logging.getLogger().level
+        log.stop_logging()
+        try:
+            log.configure_logging({"LOG_LEVEL": "DEBUG"})
+            assert logging.getLogger("app.routes.events").isEnabledFor(logging.DEBUG)
+            for name in ("sqlalchemy.engine.Engine", "sqlalchemy.pool.impl.QueuePool", "httpx", *pools):
+                assert not logging.getLogger(name).isEnabledFor(logging.INFO), name
+        finally:
+            log.stop_logging()
+            log.configure_logging()
+            logging.getLogger().setLevel(root_level)
+
+
+# ──────────────────────────────────────────────
+# Payload sampling
+# ──────────────────────────────────────────────
+
+class TestPayloadSampling:
+    def test_sampling_is_decided_per_request(self):
+        sampled = 0
+        for i in range(2000):
+            token = log._request_id.set(f"request-{i}")
+            try:
+                decisions = {log.payload_sampled(0.1) for _ in range(3)}
+            finally:
+                log._request_id.reset(token)
+            assert len(decisions) == 1  # same answer for every payload of the request
+            sampled += decisions.pop()
+        assert 100 < sampled < 300
+
+    def test_rate_bounds(self):
+        assert log.payload_sampled(0) is False
+        assert log.payload_sampled(1) is True
+
+    def test_payloads_are_truncated(self, payload_debug, monkeypatch, caplog):
+        monkeypatch.setenv("LOG_PAYLOAD_MAX_CHARS", "10")
+        with caplog.at_level(logging.DEBUG, logger="app.test"):
+            log.log_payload(logging.getLogger("app.test"), "LLM output", "x" * 25)
+        assert caplog.records[-1].payload == "xxxxxxxxxx... [15 more chars]"
+
+    def test_payloads_skipped_above_debug(self, monkeypatch, caplog):
+        monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "1")
+        with caplog.at_level(logging.INFO, logger="app.test"):
+            log.log_payload(logging.getLogger("app.test"), "LLM output", "secret body")
+        assert not caplog.records
+
+
+# ──────────────────────────────────────────────
+# Request correlation
+# ──────────────────────────────────────────────
+
+class TestRequestIds:
+    def test_generated_when_missing(self, client: TestClient):
+        first = client.get("/").headers["x-request-id"]
+        second = client.get("/").headers["x-request-id"]
+        assert len(first) == 32 and first != second
+
+    def test_client_id_is_kept_when_safe(self, client: TestClient):
+        assert client.get("/", headers={"X-Request-ID": "edge-7f3a.1"}).headers["x-request-id"] == "edge-7f3a.1"
+        unsafe = client.get("/", headers={"X-Request-ID": "a b\"c"}).headers["x-request-id"]
+        assert unsafe != "a b\"c"
+
+    @patch("app.routes.assistant.require_client")
+    def test_handler_logs_carry_the_request_id(self, mock_require_client, payload_debug, client: TestClient, caplog):
+        mock_require_client.return_value.models.generate_content.return_value.text = '{"suggestions": []}'
+        with caplog.at_level(logging.DEBUG, logger="app.routes.assistant"):
+            response = client.post("/api/assistant/search", json={"query": "log me"}, headers={"X-Request-ID": "trace-42"})
+        assert response.status_code == 200
+
+        records = [r for r in caplog.records if r.name == "app.routes.assistant"]
+        # The search runs on a threadpool worker; the ID still follows it there
+        assert records and all(getattr(r, "request_id", None) == "trace-42" for r in records)
+        assert any(getattr(r, "payload", None) == '{"suggestions": []}' for r in records)
+
+
+def test_app_has_no_print_calls():
+    offenders = []
+    for root, _, files in os.walk(APP_DIR):
+        for name in files:
+            if not name.endswith(".py"):
+                continue
+            path = os.path.join(root, name)
+            with open(path) as f:
+                tree = ast.parse(f.read(), path)
+            offenders += [
+                f"{os.path.relpath(path, APP_DIR)}:{node.lineno}"
+                for node in ast.walk(tree)
+                if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "print"
+            ]
+    assert offenders == []
@@ -0,0 +1,109 @@
+"""Migration coordinator: cheap revision check, single migrator under a lock."""
+import threading
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app import migrations
+from app.services.logistics import grid_cell
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'migrate.db'}"
+
+
+def test_fresh_database_is_migrated_to_head(db_url):
+    engine = create_engine(db_url)
+    assert migrations.ensure_schema(engine) == "migrated"
+
+    with engine.connect() as conn:
+        assert migrations.current_revision(conn) == migrations.head_revision()
+    tables = set(inspect(engine).get_table_names())
+    assert {"users", "events", "todos", "shopping_items", "event_attendees"} <= tables
+
+
+def test_database_at_head_skips_alembic(db_url):
+    engine = create_engine(db_url)
+    migrations.ensure_schema(engine)
+
+    with patch("app.migrations._upgrade") as upgrade:
+        assert migrations.ensure_schema(engine) == "current"
+    upgrade.assert_not_called()
+
+
+def test_current_revision_of_unmigrated_database_is_none(db_url):
+    with create_engine(db_url).connect() as conn:
+        assert migrations.current_revision(conn) is None
+
+
+def test_parallel_workers_migrate_once(db_url):
+    upgrades = []
+    real_upgrade = migrations._upgrade
+
+    def counting_upgrade(connection):
+        upgrades.append(threading.get_ident())
+        real_upgrade(connection)
+
+    results = []
+    barrier = threading.Barrier(4)
+
+    def worker():
+        engine = create_engine(db_url)
+        barrier.wait()
+        results.append(migrations.ensure_schema(engine))
+
+    with patch("app.migrations._upgrade", side_effect=counting_upgrade):
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert len(upgrades) == 1
+    assert results.count("migrated") == 1
+    assert set(results) <= {"migrated", "skipped", "current"}
+
+
+def test_partially_migrated_database_is_upgraded(db_url):
+    from alembic import command
+
+    engine = create_engine(db_url)
+    with engine.begin() as conn:
+        config = migrations._alembic_config(conn)
+        command.upgrade(config, "a1b2c3d4e5f6")
+
+    assert migrations.ensure_schema(engine) == "migrated"
+    with engine.connect() as conn:
+        columns = {c["name"] for c in inspect(conn).get_columns("events")}
+        assert "version" in columns
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == migrations.head_revision()
+
+
+def test_event_coordinates_become_numeric(db_url):
+    from alembic import command
+
+    engine = create_engine(db_url)
+    with engine.begin() as conn:
+        command.upgrade(migrations._alembic_config(conn), "e8b3d6a2f4c1")
+        conn.execute(text(
+            "INSERT INTO events (id, title, latitude, longitude) VALUES "
+            "(1, 'Soccer', '47.61', '-122.33'), (2, 'Dentist', 'somewhere', '-122.33'), (3, 'Party', NULL, NULL)"
+        ))
+
+    assert migrations.ensure_schema(engine) == "migrated"
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, latitude, longitude, geo_cell FROM events ORDER BY id")).all()
+        indexes = {i["name"] for i in inspect(conn).get_indexes("events")}
+    assert rows[0][1:3] == (47.61, -122.33)
+    assert rows[0][3] == grid_cell(47.61, -122.33)
+    assert rows[1][1:] == (None, None, None)
+    assert rows[2][1:] == (None, None, None)
+    assert "ix_events_geo_cell_start_time" in indexes
+
+
+def test_scanned_head_matches_alembic():
+    from alembic.script import ScriptDirectory
+
+    assert migrations._scan_head() == ScriptDirectory.from_config(migrations._alembic_config()).get_current_head()
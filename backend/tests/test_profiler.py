@@ -0,0 +1,127 @@
+"""On-demand profiler: token gating, speedscope output, SQL/LLM spans, ring buffer."""
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import profiler, telemetry
+
+TOKEN = "staging-secret"
+
+
+@pytest.fixture
+def profiling(tmp_path, monkeypatch):
+    """Profiling enabled with a private ring buffer of 3 profiles."""
+    monkeypatch.setenv("PROFILER_TOKEN", TOKEN)
+    monkeypatch.setenv("PROFILE_INTERVAL_MS", "1")
+    store = profiler.ProfileStore(str(tmp_path / "profiles"), keep=3)
+    monkeypatch.setattr(profiler, "store", store)
+    return store
+
+
+def _frame_names(document):
+    return [frame["name"] for frame in document["shared"]["frames"]]
+
+
+# ──────────────────────────────────────────────
+# Middleware
+# ──────────────────────────────────────────────
+
+class TestProfiledRequests:
+    def test_requests_without_token_are_not_profiled(self, profiling, client: TestClient):
+        response = client.get("/api/events/999999")
+        assert "x-profile-id" not in response.headers
+        assert profiling.list() == []
+
+    def test_wrong_token_is_ignored(self, profiling, client: TestClient):
+        response = client.get("/api/events/999999", headers={"X-Profile-Token": "guess"})
+        assert "x-profile-id" not in response.headers
+        assert profiling.list() == []
+
+    def test_disabled_without_configured_token(self, profiling, monkeypatch, client: TestClient):
+        monkeypatch.delenv("PROFILER_TOKEN")
+        response = client.get("/api/events/999999", headers={"X-Profile-Token": ""})
+        assert "x-profile-id" not in response.headers
+        assert client.get("/api/profiles/", headers={"X-Profile-Token": TOKEN}).status_code == 404
+
+    def test_profile_is_stored_with_sql_spans(self, profiling, client: TestClient):
+        response = client.get("/api/events/999999", headers={"X-Profile-Token": TOKEN})
+        assert response.status_code == 404
+        profile_id = response.headers["x-profile-id"]
+        assert profiling.list() == [profile_id]
+
+        download = client.get(f"/api/profiles/{profile_id}", headers={"X-Profile-Token": TOKEN})
+        assert download.status_code == 200
+        document = download.json()
+        assert document["$schema"] == profiler.SPEEDSCOPE_SCHEMA
+        assert document["name"] == "GET /api/events/999999"
+        assert any(name.startswith("SQL: SELECT") for name in _frame_names(document))
+
+        timelines = [p for p in document["profiles"] if p["type"] == "evented"]
+        assert timelines and [e["type"] for e in timelines[0]["events"]][:2] == ["O", "C"]
+
+    def test_profile_downloads_require_the_token(self, profiling, client: TestClient):
+        assert client.get("/api/profiles/").status_code == 403
+        assert client.get("/api/profiles/", headers={"X-Profile-Token": "guess"}).status_code == 403
+        assert client.get("/api/profiles/0-deadbeef", headers={"X-Profile-Token": TOKEN}).status_code == 404
+        assert client.get("/api/profiles/..%2Fetc", headers={"X-Profile-Token": TOKEN}).status_code == 404
+
+    @patch("app.routes.assistant.require_client")
+    def test_llm_calls_are_marked(self, mock_require_client, profiling, client: TestClient):
+        def slow_generate(**kwargs):
+            time.sleep(0.02)
+            response = type("R", (), {})()
+            response.text = '{"suggestions": []}'
+            return response
+
+        mock_require_client.return_value.models.generate_content.side_effect = slow_generate
+        response = client.post(
+            "/api/assistant/search", json={"query": "profiled search"}, headers={"X-Profile-Token": TOKEN}
+        )
+        assert response.status_code == 200
+
+        document = client.get(f"/api/profiles/{response.headers['x-profile-id']}", headers={"X-Profile-Token": TOKEN}).json()
+        assert "LLM: gemini" in _frame_names(document)
+        # The sampler caught the thread while it was inside the call
+        sampled = [p for p in document["profiles"] if p["type"] == "sampled"]
+        llm_frame = _frame_names(document).index("LLM: gemini")
+        assert any(stack[-1] == llm_frame for p in sampled for stack in p["samples"])
+
+
+# ──────────────────────────────────────────────
+# Session + store
+# ──────────────────────────────────────────────
+
+class TestProfileSession:
+    def test_nested_spans_stay_nested(self):
+        session = profiler.ProfileSession(interval=0.001)
+        with telemetry.request_timing() as timing:
+            timing.profile = session.start()
+            outer = session.begin("LLM: openai")
+            inner = session.begin("SQL: SELECT 1")
+            inner.end()
+            outer.end()
+        session.stop()
+
+        document = session.to_speedscope("test")
+        events = [p for p in document["profiles"] if p["type"] == "evented"][0]["events"]
+        names = _frame_names(document)
+        assert [(e["type"], names[e["frame"]]) for e in events] == [
+            ("O", "LLM: openai"), ("O", "SQL: SELECT 1"), ("C", "SQL: SELECT 1"), ("C", "LLM: openai"),
+        ]
+
+    def test_long_statements_are_truncated(self):
+        session = profiler.ProfileSession()
+        span = session.begin("SELECT " + ", ".join(f"col_{i}" for i in range(100)))
+        span.end()
+        assert len(span.label) == profiler.MAX_LABEL_CHARS
+        assert span.label.endswith("...")
+
+    def test_store_keeps_only_the_newest(self, tmp_path):
+        store = profiler.ProfileStore(str(tmp_path), keep=2)
+        ids = [f"{1000 + i}-0000000{i}" for i in range(4)]
+        for profile_id in ids:
+            store.save(profile_id, {"name": profile_id})
+        assert store.list() == [ids[3], ids[2]]
+        assert store.path(ids[0]) is None
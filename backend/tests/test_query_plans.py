@@ -0,0 +1,195 @@
+"""
+Query-plan regression tests: run each hot endpoint against a seeded database,
+capture the SQL it issues, and EXPLAIN every filtered statement. A plan that
+falls back to scanning a table means an index is missing (or a query stopped
+matching it).
+"""
+import re
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import models
+from app.auth import get_password_hash
+
+
+@pytest.fixture
+def seeded(db_session):
+    family = models.Family(name="Plan Family")
+    db_session.add(family)
+    db_session.flush()
+
+    users = [
+        models.User(name=f"Member {i}", email=f"Member{i}@Example.com", hashed_password=get_password_hash("pwd"), family_id=family.id)
+        for i in range(3)
+    ]
+    users.append(models.User(name="Invited", email="invited@example.com", family_id=family.id,
+                             status="pending_invite", invite_token="invite-token-123"))
+    db_session.add_all(users)
+    db_session.flush()
+
+    start = datetime(2026, 3, 1, 9)
+    for i in range(20):
+        db_session.add(models.Event(title=f"Event {i}", start_time=start + timedelta(days=i), end_time=start + timedelta(days=i, hours=1),
+                                    family_id=family.id, attendees=users[: i % 3 + 1]))
+        db_session.add(models.ToDo(title=f"Todo {i}", family_id=family.id, assigned_to_user_id=users[i % 3].id, created_by_user_id=users[0].id))
+        db_session.add(models.ShoppingItem(name=f"Item {i}", family_id=family.id, is_bought=i % 2 == 0, added_by_user_id=users[0].id))
+        db_session.add(models.UserProfileAttribute(user_id=users[i % 3].id, key=f"location_{i}", value="Park", confidence=0.9))
+    db_session.commit()
+    return family, users
+
+
+@pytest.fixture
+def captured_sql(db_session, async_session_factory):
+    """Collects (statement, parameters) for every filtered query on the sync and async engines."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and re.match(r"\s*(SELECT|UPDATE|DELETE)\b", statement) and re.search(r"\bWHERE\b", statement):
+            statements.append((statement, parameters))
+
+    engines = [db_session.get_bind(), async_session_factory.kw["bind"].sync_engine]
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def _table_scans(db_session, statements):
+    """Returns "<plan line> <- <sql>" for every full table scan in the captured statements."""
+    scans = []
+    connection = db_session.connection()
+    for statement, parameters in statements:
+        for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+            detail = row[-1]
+            if re.match(r"SCAN (?!CONSTANT)", detail):
+                scans.append(f"{detail} <- {' '.join(statement.split())}")
+    return scans
+
+
+def _assert_indexed(db_session, statements):
+    assert statements, "scenario issued no filtered queries"
+    scans = _table_scans(db_session, statements)
+    assert scans == [], "\n".join(scans)
+
+
+def _login(client, email):
+    response = client.post("/api/auth/token", data={"username": email, "password": "pwd"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class TestHotQueryPlans:
+    def test_todo_list_by_family_and_assignee(self, client: TestClient, db_session, seeded, captured_sql):
+        family, users = seeded
+        client.get("/api/todos/", params={"family_id": family.id})
+        client.get("/api/todos/", params={"family_id": family.id, "user_id": users[1].id})
+        _assert_indexed(db_session, captured_sql)
+
+    def test_shopping_list_and_clear_bought(self, client: TestClient, db_session, seeded, captured_sql):
+        family, _ = seeded
+        client.get("/api/shopping/", params={"family_id": family.id})
+        client.post("/api/shopping/bulk/toggle", params={"family_id": family.id}, json={"ids": [1, 2, 3]})
+        client.delete("/api/shopping/bought", params={"family_id": family.id})
+        _assert_indexed(db_session, captured_sql)
+
+    def test_login_matches_email_case_insensitively(self, client: TestClient, db_session, seeded, captured_sql):
+        # Stored as "Member0@Example.com"; login lowercases its input
+        _login(client, "member0@example.com")
+        _assert_indexed(db_session, captured_sql)
+        assert any("lower(users.email)" in statement for statement, _ in captured_sql)
+
+    def test_family_member_list(self, client: TestClient, db_session, seeded, captured_sql):
+        headers = _login(client, "member0@example.com")
+        response = client.get("/api/users/", headers=headers)
+        assert len(response.json()) == 4
+        _assert_indexed(db_session, captured_sql)
+
+    def test_invite_token_lookup(self, client: TestClient, db_session, seeded, captured_sql):
+        response = client.post(
+            "/api/auth/setup-invite",
+            params={"token": "invite-token-123"},
+            json={"name": "Invited", "email": "invited@example.com", "password": "pwd"},
+        )
+        assert response.status_code == 200
+        _assert_indexed(db_session, captured_sql)
+
+    def test_event_attendee_lookups(self, client: TestClient, db_session, seeded, captured_sql):
+        _, users = seeded
+        client.get("/api/events/")
+        db_session.expire_all()
+        assert len(db_session.get(models.User, users[0].id).attending_events) == 20
+        _assert_indexed(db_session, captured_sql)
+
+    def test_profile_attribute_lookups(self, db_session, seeded, captured_sql):
+        from app.services.ai_learning import AILearningService
+
+        _, users = seeded
+        with patch("app.services.ai_learning.get_client"):
+            service = AILearningService(db_session)
+        service.get_user_profile_context(users[0].id)
+        service.learn_from_interaction(users[0].id, "soccer at the park", {"type": "event", "location": "Park", "category": "Sports"})
+        _assert_indexed(db_session, captured_sql)
+
+    def test_nearby_events_use_grid_cells(self, client: TestClient, db_session, seeded, captured_sql):
+        from app.services.logistics import grid_cell
+
+        family, _ = seeded
+        start = datetime(2026, 3, 1, 9)
+        for i in range(10):
+            lat, lng = 47.6 + i * 0.01, -122.3
+            db_session.add(models.Event(title=f"Near {i}", start_time=start, end_time=start + timedelta(hours=1), family_id=family.id,
+                                        latitude=lat, longitude=lng, geo_cell=grid_cell(lat, lng)))
+        db_session.commit()
+        response = client.get("/api/events/nearby", params={"lat": 47.6, "lon": -122.3, "radius": 5,
+                                                            "start": "2026-03-01T00:00:00", "end": "2026-03-02T00:00:00"})
+        assert len(response.json()) == 5
+        _assert_indexed(db_session, captured_sql)
+
+
+    def test_commute_neighbour_lookups(self, db_session, seeded, captured_sql):
+        from app.services import commute
+
+        _, users = seeded
+        moment = datetime(2026, 3, 5, 12)
+        commute.previous_event(db_session, users[0].id, moment, exclude_id=0)
+        commute.next_event(db_session, users[0].id, moment, exclude_id=0)
+        _assert_indexed(db_session, captured_sql)
+
+    def test_conflict_checks(self, db_session, seeded, captured_sql):
+        from app.services import conflicts
+
+        family, users = seeded
+        start = datetime(2026, 3, 5, 9, 30)
+        assert conflicts.find_conflicts(db_session, 0, [u.id for u in users[:2]], start, start + timedelta(hours=1))
+        batch = db_session.query(models.Event).filter(models.Event.title.in_(["Event 4", "Event 5"])).all()
+        conflicts.check_batch(db_session, family.id, batch)
+        _assert_indexed(db_session, captured_sql)
+
+    def test_free_slot_busy_lookup(self, client: TestClient, db_session, seeded, captured_sql):
+        family, users = seeded
+        response = client.get(f"/api/families/{family.id}/free-slots", params={
+            "start": "2026-03-02T00:00:00", "end": "2026-03-09T00:00:00", "members": [users[0].id, users[1].id],
+        })
+        assert len(response.json()) == 14
+        _assert_indexed(db_session, captured_sql)
+
+    def test_windowed_event_read(self, client: TestClient, db_session, seeded, captured_sql):
+        family, _ = seeded
+        db_session.add(models.Event(title="Weekly", start_time=datetime(2026, 1, 6, 17), end_time=datetime(2026, 1, 6, 18),
+                                    family_id=family.id, rrule="FREQ=WEEKLY"))
+        db_session.commit()
+        response = client.get("/api/events/", params={"start": "2026-03-02T00:00:00", "end": "2026-03-09T00:00:00"})
+        assert [e["title"] for e in response.json()].count("Weekly") == 1
+        _assert_indexed(db_session, captured_sql)
+
+    def test_delta_sync(self, client: TestClient, db_session, seeded, captured_sql):
+        family, _ = seeded
+        token = client.get("/api/sync/", params={"family_id": family.id}).json()["token"]
+        response = client.get("/api/sync/", params={"family_id": family.id, "since": token})
+        assert response.status_code == 200
+        _assert_indexed(db_session, captured_sql)
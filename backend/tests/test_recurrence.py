@@ -0,0 +1,130 @@
+"""Recurring events: RRULE series stored once, expanded per requested window."""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from dateutil.rrule import rrulestr
+from fastapi.testclient import TestClient
+
+from app import models
+from app.services import recurrence
+
+
+def _series(client, rule, start="2025-01-07T17:00:00", end="2025-01-07T18:00:00", **extra):
+    return client.post("/api/events/", json={"title": "Soccer", "start_time": start, "end_time": end, "rrule": rule, **extra})
+
+
+def _window(client, start, end, **params):
+    response = client.get("/api/events/", params={"start": start, "end": end, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+# ──────────────────────────────────────────────
+# Expansion
+# ──────────────────────────────────────────────
+
+class TestExpansion:
+    def test_matches_dateutil(self):
+        rng = random.Random(5)
+        for _ in range(500):
+            parts = [f"FREQ={rng.choice(['DAILY', 'WEEKLY', 'MONTHLY'])}", f"INTERVAL={rng.randint(1, 3)}"]
+            if parts[0] == "FREQ=WEEKLY" and rng.random() < 0.7:
+                parts.append("BYDAY=" + ",".join(rng.sample(recurrence.WEEKDAYS, rng.randint(1, 3))))
+            if rng.random() < 0.3:
+                parts.append(f"COUNT={rng.randint(1, 40)}")
+            rule = ";".join(parts)
+            dtstart = datetime(2025, 1, 1, 8) + timedelta(days=rng.randint(0, 30), minutes=rng.randrange(0, 600, 15))
+            length = timedelta(minutes=rng.choice((0, 45, 120)))
+            window_start = datetime(2025, 1, 1) + timedelta(days=rng.randint(-5, 300))
+            window_end = window_start + timedelta(days=rng.choice((1, 7, 31)))
+
+            expected = [
+                s for s in rrulestr(rule, dtstart=dtstart).between(window_start - timedelta(days=40), window_end)
+                if s < window_end and (s + length > window_start if length else s >= window_start)
+            ]
+            assert list(recurrence.expand(rule, dtstart, dtstart + length, window_start, window_end)) == expected
+
+    def test_long_series_costs_only_the_window(self):
+        # Ten years of daily occurrences; a week's window expands seven
+        dtstart = datetime(2016, 1, 1, 7)
+        week = recurrence.expand("FREQ=DAILY", dtstart, dtstart + timedelta(hours=1), datetime(2026, 3, 2), datetime(2026, 3, 9))
+        assert week == tuple(datetime(2026, 3, day, 7) for day in range(2, 9))
+
+    def test_exdates_and_cache(self):
+        cache = recurrence.RecurrenceCache(size=2)
+        dtstart = datetime(2025, 1, 6, 9)
+        args = ("FREQ=WEEKLY;BYDAY=MO,WE", dtstart, dtstart + timedelta(hours=1), datetime(2025, 1, 6), datetime(2025, 1, 13))
+        assert cache.expand(*args, exdates=["2025-01-08T09:00:00"]) == (datetime(2025, 1, 6, 9),)
+        assert cache.expand(*args, exdates=["2025-01-08T09:00:00"]) == (datetime(2025, 1, 6, 9),)
+        assert cache.expand(*args) == (datetime(2025, 1, 6, 9), datetime(2025, 1, 8, 9))
+        assert cache.stats() == {"cached": 2, "hits": 1, "misses": 2}
+
+    def test_prepare_series(self):
+        data = {"rrule": "FREQ=WEEKLY;COUNT=3", "start_time": datetime(2025, 1, 7, 17), "end_time": datetime(2025, 1, 7, 18),
+                "exdates": [datetime(2025, 1, 14, 17), "2025-01-14T17:00:00"]}
+        recurrence.prepare_series(data)
+        assert data["exdates"] == ["2025-01-14T17:00:00"]
+        assert data["recurrence_end"] == datetime(2025, 1, 21, 18)
+
+        for rule in ("BYDAY=MO", "FREQ=SOMETIMES", "FREQ=DAILY;COUNT=2;UNTIL=20250101", "FREQ=DAILY;COUNT=999999"):
+            with pytest.raises(ValueError):
+                recurrence.prepare_series({"rrule": rule, "start_time": datetime(2025, 1, 1)})
+
+
+# ──────────────────────────────────────────────
+# API
+# ──────────────────────────────────────────────
+
+class TestRecurringEvents:
+    def test_window_lists_occurrences_and_singles(self, client: TestClient):
+        series = _series(client, "FREQ=WEEKLY;BYDAY=TU,TH").json()
+        client.post("/api/events/", json={"title": "Dentist", "start_time": "2025-03-05T10:00:00", "end_time": "2025-03-05T11:00:00"})
+        client.post("/api/events/", json={"title": "Old", "start_time": "2025-01-05T10:00:00", "end_time": "2025-01-05T11:00:00"})
+
+        events = _window(client, "2025-03-03T00:00:00", "2025-03-10T00:00:00")
+        assert [(e["title"], e["start_time"], e["recurrence_id"]) for e in events] == [
+            ("Soccer", "2025-03-04T17:00:00", "2025-03-04T17:00:00"),
+            ("Dentist", "2025-03-05T10:00:00", None),
+            ("Soccer", "2025-03-06T17:00:00", "2025-03-06T17:00:00"),
+        ]
+        assert events[0]["id"] == series["id"] and events[0]["end_time"] == "2025-03-04T18:00:00"
+        # Only the series row is stored
+        assert len(client.get("/api/events/").json()) == 3
+
+    def test_finished_series_and_bad_rules(self, client: TestClient):
+        finished = _series(client, "FREQ=DAILY;COUNT=3").json()
+        assert finished["recurrence_end"] == "2025-01-09T18:00:00"
+        assert _window(client, "2025-01-09T00:00:00", "2025-01-20T00:00:00")[0]["start_time"] == "2025-01-09T17:00:00"
+        assert _window(client, "2025-01-10T00:00:00", "2025-01-20T00:00:00") == []
+
+        assert _series(client, "FREQ=FORTNIGHTLY").status_code == 400
+        assert client.get("/api/events/", params={"start": "2025-01-10T00:00:00"}).status_code == 400
+        assert client.get("/api/events/", params={"start": "2025-01-01T00:00:00", "end": "2027-01-01T00:00:00"}).status_code == 400
+
+    def test_cancel_one_occurrence(self, client: TestClient):
+        series = _series(client, "FREQ=WEEKLY").json()
+        response = client.delete(f"/api/events/{series['id']}/occurrences/2025-01-14T17:00:00")
+        assert response.status_code == 200
+        assert response.json()["exdates"] == ["2025-01-14T17:00:00"]
+        assert response.json()["version"] == series["version"] + 1
+
+        starts = [e["start_time"] for e in _window(client, "2025-01-06T00:00:00", "2025-01-27T00:00:00")]
+        assert starts == ["2025-01-07T17:00:00", "2025-01-21T17:00:00"]
+        assert client.delete(f"/api/events/{series['id']}/occurrences/2025-01-15T17:00:00").status_code == 404
+
+    def test_busy_time_includes_occurrences(self, client: TestClient, db_session):
+        from app.services.availability import find_free_slots
+
+        family = models.Family(name="Recurring")
+        db_session.add(family)
+        db_session.flush()
+        kid = models.User(name="Kid", email="kid@example.com", family_id=family.id)
+        db_session.add(kid)
+        db_session.commit()
+        series = _series(client, "FREQ=DAILY", attendee_ids=[kid.id]).json()
+        db_session.query(models.Event).filter(models.Event.id == series["id"]).update({"family_id": family.id})
+        db_session.commit()
+
+        slots = find_free_slots(db_session, family.id, [kid.id], datetime(2025, 6, 1, 16), datetime(2025, 6, 1, 20))
+        assert [(s.start.hour, s.end.hour) for s in slots] == [(16, 17), (18, 20)]
@@ -1,12 +1,21 @@
 """Phase 2: Service-level tests with mocked external APIs."""
 import json
+import math
+import random
 import pytest
 from unittest.mock import patch, MagicMock
+from sqlalchemy.orm import sessionmaker
 
 from app.services.nlp import parse_natural_query, parse_voice_command, _fallback_parse
 from app.services.classifier import classify_event, DEFAULT_LABELS
 from app.services.ticketmaster import TicketmasterService
-from app.services.logistics import LogisticsService
+from app import models
+from app.services import logistics
+from app.services.logistics import LogisticsService, RoutingEngine, TravelTimeStore, haversine_km
+from app.services.singleflight import SingleFlight, normalize_key
+from app.services import llm
+from app.services.stream_parser import IncrementalIntentParser
+from app.services.llm import HedgedLLM, LLMProvider, CircuitBreaker, AllProvidersFailed
 from tests.mocks.fixtures import (
     mock_openai_client,
     mock_gemini_client,
@@ -316,17 +325,120 @@ class TestTicketmaster:
 # Logistics Service
 # ──────────────────────────────────────────────
 
+class FailingBackend:
+    name = "osrm"
+    persist = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def table(self, origins, destinations, profile):
+        self.calls += 1
+        raise ConnectionError("routing server down")
+
+
+class CountingBackend(logistics.HaversineBackend):
+    name = "osrm"
+    persist = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def table(self, origins, destinations, profile):
+        self.calls += 1
+        return super().table(origins, destinations, profile)
+
+
 class TestLogistics:
     def test_drive_time_returns_int(self):
         time = LogisticsService.get_drive_time("40.7,-74.0", "40.8,-73.9")
         assert isinstance(time, int)
         assert 15 <= time <= 45
 
+    def test_drive_time_follows_distance(self):
+        """~14 km straight line -> ~18 km of road at city/arterial speeds."""
+        assert haversine_km((40.7, -74.0), (40.8, -73.9)) == pytest.approx(13.95, abs=0.01)
+        assert LogisticsService.get_drive_time("40.7,-74.0", "40.8,-73.9") == 33
+        assert LogisticsService.get_drive_time("40.7,-74.0", "40.7,-74.0") == 0
+        near = LogisticsService.get_drive_time("40.7,-74.0", "40.71,-74.0")
+        far = LogisticsService.get_drive_time("40.7,-74.0", "41.7,-74.0")
+        assert 0 < near < far
+
     def test_drive_time_deterministic(self):
-        """Same inputs produce same result (seeded random)."""
+        """Same inputs produce same result without touching the global RNG."""
+        random.seed(7)
+        expected = random.random()
+        random.seed(7)
         t1 = LogisticsService.get_drive_time("Home", "School")
         t2 = LogisticsService.get_drive_time("Home", "School")
         assert t1 == t2
+        assert 15 <= t1 <= 45
+        assert random.random() == expected
+
+    def test_matrix_matches_pairwise(self):
+        origins = ["40.7,-74.0", "40.75,-73.95", "Home"]
+        destinations = ["40.8,-73.9", "40.7,-74.0", "", "School"]
+        matrix = LogisticsService.get_drive_time_matrix(origins, destinations)
+        assert matrix == [[LogisticsService.get_drive_time(o, d) for d in destinations] for o in origins]
+        assert matrix[0][1] == 0
+        assert matrix[2][2] == 0
+
+    def test_profile_array_matches_scalar(self):
+        profile = logistics.SPEED_PROFILES["driving"]
+        distances = [0.0, 1.0, 4.0, 10.0, 30.0, 120.0]
+        assert profile.minutes_array(distances).tolist() == pytest.approx([profile.minutes(km) for km in distances])
+
+    def test_engine_lru(self):
+        engine = RoutingEngine(cache_size=2)
+        a, b, c = (40.7, -74.0), (40.8, -73.9), (40.9, -73.8)
+        first = engine.minutes(a, b)
+        assert engine.minutes(a, b) == first
+        assert engine.stats()["hits"] == 1
+        engine.minutes(a, c)
+        engine.minutes(b, c)
+        # (a, b) was least recently used and got evicted
+        assert engine.stats()["cached_pairs"] == 2
+        engine.minutes(a, b)
+        assert engine.stats()["hits"] == 1
+
+    def test_engine_persists_server_results(self, db_session):
+        store = TravelTimeStore(sessionmaker(bind=db_session.get_bind()))
+        backend = CountingBackend()
+        points = [(40.7, -74.0), (40.8, -73.9), (40.9, -73.8)]
+        first = RoutingEngine(backend, store=store).matrix(points, points)
+        assert backend.calls == 1
+        assert db_session.query(models.TravelTime).count() == 6
+
+        # A fresh engine (empty LRU) reads the table instead of the backend
+        assert RoutingEngine(backend, store=store).matrix(points, points) == first
+        assert backend.calls == 1
+
+    def test_engine_falls_back_without_persisting(self, db_session):
+        engine = RoutingEngine(FailingBackend(), store=TravelTimeStore(sessionmaker(bind=db_session.get_bind())))
+        a, b = (40.7, -74.0), (40.8, -73.9)
+        assert engine.minutes(a, b) == pytest.approx(logistics.SPEED_PROFILES["driving"].minutes(haversine_km(a, b)))
+        assert db_session.query(models.TravelTime).count() == 0
+
+    def test_places_are_geocoded_before_routing(self):
+        from app.services.geocoding import geocoder
+
+        home, school = geocoder.resolve("Home").coords, geocoder.resolve("School").coords
+        expected = LogisticsService.get_drive_time(f"{home[0]},{home[1]}", f"{school[0]},{school[1]}")
+        assert LogisticsService.get_drive_time("Home", "School") == expected
+        assert LogisticsService.get_drive_time_matrix(["Home"], ["School", "home."]) == [[expected, 0]]
+
+    def test_placeholder_without_geocoding(self, monkeypatch):
+        from app.services.geocoding import NullGeocoder, geocoder
+
+        monkeypatch.setattr(geocoder, "provider", NullGeocoder())
+        there = LogisticsService.get_drive_time("Home", "School")
+        assert 15 <= there <= 45
+        assert LogisticsService.get_drive_time("School", "Home") == there
+        assert LogisticsService.get_drive_time("Home", "home.") == 0
+        places = ["Home", "School", "Lincoln Fields"]
+        matrix = LogisticsService.get_drive_time_matrix(places, places)
+        assert [matrix[i][i] for i in range(3)] == [0, 0, 0]
+        assert all(matrix[i][j] == matrix[j][i] for i in range(3) for j in range(3))
 
     def test_drive_time_empty_input(self):
         """Empty coordinates return 0."""
@@ -335,9 +447,31 @@ class TestLogistics:
         assert LogisticsService.get_drive_time(None, None) == 0
 
     def test_resolve_location(self):
+        """The local geocoder places names deterministically around its center."""
         lat, lng = LogisticsService.resolve_location("Lincoln High School")
-        assert lat == "37.7749"
-        assert lng == "-122.4194"
+        assert (lat, lng) == LogisticsService.resolve_location("lincoln high school.")
+        assert haversine_km((37.7749, -122.4194), (float(lat), float(lng))) <= 25.01
+
+    def test_grid_cells_cover_radius(self):
+        center = (47.61, -122.33)
+        cells = set(logistics.grid_cells_within(center, 30))
+        for bearing in range(0, 360, 15):
+            # Points ~29 km away in every direction land in a listed cell
+            lat = center[0] + math.degrees(29 / logistics.EARTH_RADIUS_KM) * math.cos(math.radians(bearing))
+            lng = center[1] + math.degrees(29 / logistics.EARTH_RADIUS_KM) * math.sin(math.radians(bearing)) / math.cos(math.radians(center[0]))
+            assert logistics.grid_cell(lat, lng) in cells
+        assert len(cells) < 30
+
+    def test_grid_cells_wrap_antimeridian(self):
+        cells = set(logistics.grid_cells_within((0.0, 179.95), 20))
+        assert logistics.grid_cell(0.0, -179.95) in cells
+        assert logistics.grid_cell(None, 1.0) is None
+
+    def test_resolve_locations_batch(self):
+        resolved = LogisticsService.resolve_locations(["Home", "Lincoln Fields", "47.61,-122.33", ""])
+        assert set(resolved) == {"Home", "Lincoln Fields", "47.61,-122.33"}
+        assert resolved["47.61,-122.33"] == (47.61, -122.33)
+        assert resolved["Home"] == LogisticsService.resolve_location("Home")
 
     def test_resolve_location_empty(self):
         lat, lng = LogisticsService.resolve_location("")
@@ -348,3 +482,449 @@ class TestLogistics:
         lat, lng = LogisticsService.resolve_location(None)
         assert lat is None
         assert lng is None
+
+
+# ──────────────────────────────────────────────
+# Single-flight coalescing
+# ──────────────────────────────────────────────
+
+class TestSingleFlight:
+    def test_normalize_key_ignores_case_and_whitespace(self):
+        assert normalize_key("Concerts  this Weekend ") == normalize_key("concerts this weekend")
+        assert normalize_key("concerts") != normalize_key("concerts", "gpt-4o")
+
+    def test_concurrent_identical_calls_share_one_call(self):
+        """Threads arriving while the leader is in flight get its result."""
+        import threading
+        import time
+
+        flight = SingleFlight("test_concurrent")
+        release = threading.Event()
+        calls = []
+
+        def slow_call():
+            calls.append(1)
+            release.wait(timeout=5)
+            return {"answer": 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("same", slow_call)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        # Wait until every follower has joined the in-flight call
+        deadline = time.time() + 5
+        while flight.coalesced < 4 and time.time() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert results == [{"answer": 42}] * 5
+        assert flight.stats()["coalesced"] == 4
+        assert flight.stats()["in_flight"] == 0
+
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight("test_sequential")
+        assert flight.do("k", lambda: 1) == 1
+        assert flight.do("k", lambda: 2) == 2
+        assert flight.stats() == {"calls": 2, "coalesced": 0, "in_flight": 0}
+
+    def test_errors_propagate_to_all_waiters(self):
+        flight = SingleFlight("test_errors")
+
+        def boom():
+            raise RuntimeError("provider down")
+
+        with pytest.raises(RuntimeError, match="provider down"):
+            flight.do("k", boom)
+        assert flight.stats()["in_flight"] == 0
+
+    def test_concurrent_async_calls_share_one_call(self):
+        import asyncio
+
+        flight = SingleFlight("test_async")
+        calls = []
+
+        async def slow_call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["result"]
+
+        async def run():
+            return await asyncio.gather(*[flight.do_async("q", slow_call) for _ in range(3)])
+
+        results = asyncio.run(run())
+        assert len(calls) == 1
+        assert results == [["result"]] * 3
+        assert flight.coalesced == 2
+
+    def test_cancelled_leader_hands_off_to_a_follower(self):
+        import asyncio
+
+        flight = SingleFlight("test_async_cancel")
+        calls = []
+
+        async def slow_call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["result"]
+
+        async def run():
+            leader = asyncio.create_task(flight.do_async("q", slow_call))
+            await asyncio.sleep(0)
+            followers = [asyncio.create_task(flight.do_async("q", slow_call)) for _ in range(2)]
+            await asyncio.sleep(0)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await asyncio.gather(*followers)
+
+        assert asyncio.run(run()) == [["result"]] * 2
+        # One retry between the two followers, not one each
+        assert len(calls) == 2
+        assert flight.stats()["in_flight"] == 0
+
+    def test_metrics_endpoint_reports_flights(self, client):
+        response = client.get("/api/metrics/")
+        assert response.status_code == 200
+        flights = response.json()["singleflight"]
+        assert "assistant_search" in flights
+        assert "parse_natural_query" in flights
+        assert "classify_event" in flights
+
+
+# ──────────────────────────────────────────────
+# Hedged multi-provider LLM execution
+# ──────────────────────────────────────────────
+
+class FakeProvider(LLMProvider):
+    def __init__(self, name, text="{}", delay=0.0, error=None):
+        self.name = name
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def generate(self, prompt, system=None, json_mode=True):
+        import time
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.text
+
+
+class TestHedgedLLM:
+    def test_fast_primary_wins_without_hedge(self):
+        primary = FakeProvider("fast", text="primary")
+        backup = FakeProvider("backup", text="backup")
+        result = HedgedLLM([primary, backup], default_hedge_delay=1.0).generate("q")
+
+        assert result == "primary"
+        assert backup.calls == 0
+        assert llm.stats()["fast"]["wins"] == 1
+
+    def test_slow_primary_is_hedged(self):
+        primary = FakeProvider("slow", text="primary", delay=0.5)
+        backup = FakeProvider("hedge", text="backup")
+        result = HedgedLLM([primary, backup], default_hedge_delay=0.05).generate("q")
+
+        assert result == "backup"
+        stats = llm.stats()
+        assert stats["hedge"]["hedges"] == 1
+        assert stats["hedge"]["wins"] == 1
+
+    def test_failing_primary_fails_over_immediately(self):
+        primary = FakeProvider("broken", error=RuntimeError("500"))
+        backup = FakeProvider("healthy", text="backup")
+        result = HedgedLLM([primary, backup], default_hedge_delay=10.0).generate("q")
+
+        assert result == "backup"
+        assert llm.stats()["broken"]["errors"] == 1
+
+    def test_all_providers_fail_raises_last_error(self):
+        providers = [
+            FakeProvider("a", error=RuntimeError("a down")),
+            FakeProvider("b", error=RuntimeError("b down")),
+        ]
+        with pytest.raises(RuntimeError):
+            HedgedLLM(providers, default_hedge_delay=0.01).generate("q")
+
+    def test_open_breaker_skips_provider(self):
+        failing = FakeProvider("flaky", error=RuntimeError("down"))
+        backup = FakeProvider("steady", text="ok")
+        hedged = HedgedLLM([failing, backup], default_hedge_delay=10.0)
+        for _ in range(5):
+            hedged.generate("q")
+
+        assert llm.health("flaky").breaker.state == CircuitBreaker.OPEN
+        hedged.generate("q")
+        assert failing.calls == 5  # not called once the breaker opened
+
+    def test_single_provider_with_open_breaker(self):
+        failing = FakeProvider("solo", error=RuntimeError("down"))
+        hedged = HedgedLLM([failing])
+        for _ in range(5):
+            with pytest.raises(RuntimeError):
+                hedged.generate("q")
+        with pytest.raises(AllProvidersFailed):
+            hedged.generate("q")
+
+    def test_breaker_half_opens_after_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow() is True  # trial call
+        assert breaker.allow() is False  # only one trial at a time
+        breaker.record_success(0.1)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failover_after_half_open_probe(self):
+        primary = FakeProvider("primary", text="primary")
+        secondary = FakeProvider("secondary", text="secondary")
+        breaker = llm.health("secondary").breaker
+        breaker.reset_timeout = 0.0
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        hedged = HedgedLLM([primary, secondary], default_hedge_delay=10.0)
+
+        # The secondary isn't launched, so it mustn't be left holding its trial
+        assert hedged.generate("q") == "primary"
+        assert secondary.calls == 0
+        assert breaker.available()
+
+        primary.error = RuntimeError("500")
+        assert hedged.generate("q") == "secondary"
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_abandoned_stream_releases_trial(self):
+        class StreamingProvider(FakeProvider):
+            def generate_stream(self, prompt, system=None, json_mode=True):
+                yield from self.generate(prompt)
+
+        provider = StreamingProvider("streaming", text="hello")
+        breaker = llm.health("streaming").breaker
+        breaker.reset_timeout = 0.0
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+
+        stream = HedgedLLM([provider]).stream("q")
+        next(stream)
+        stream.close()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.available()
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=1.0)
+        breaker.record_success(5.0)
+        breaker.record_success(5.0)
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_hedge_delay_uses_p95(self):
+        provider = FakeProvider("measured")
+        hedged = HedgedLLM([provider], default_hedge_delay=3.0)
+        assert hedged.hedge_delay(provider) == 3.0
+
+        llm.health("measured").latencies.extend([0.1 * i for i in range(1, 101)])
+        assert hedged.hedge_delay(provider) == pytest.approx(9.5)
+
+
+# ──────────────────────────────────────────────
+# Incremental JSON parsing of streamed intents
+# ──────────────────────────────────────────────
+
+class TestIncrementalIntentParser:
+    def test_items_emitted_as_soon_as_they_close(self):
+        parser = IncrementalIntentParser()
+        assert parser.feed('{"events": [{"title": "Soc') == []
+        assert parser.feed('cer", "attendees": ["Jake"]}') == [
+            ("events", {"title": "Soccer", "attendees": ["Jake"]})
+        ]
+        assert parser.feed(', {"title": "Dentist"}], "shopping_list": [{"name": "milk"}') == [
+            ("events", {"title": "Dentist"}),
+            ("shopping_list", {"name": "milk"}),
+        ]
+        assert parser.feed('], "todos": []}') == []
+
+    def test_char_by_char_matches_full_parse(self):
+        from tests.mocks.fixtures import GEMINI_MULTI_INTENT_RESPONSE
+
+        parser = IncrementalIntentParser()
+        items = list(parser.iter_items(iter(GEMINI_MULTI_INTENT_RESPONSE)))
+        expected = json.loads(GEMINI_MULTI_INTENT_RESPONSE)
+        assert items == [
+            ("events", expected["events"][0]),
+            ("shopping_list", expected["shopping_list"][0]),
+            ("todos", expected["todos"][0]),
+        ]
+
+    def test_braces_and_quotes_inside_strings(self):
+        todo = {"title": 'Fix "the} {door]" \\ now'}
+        parser = IncrementalIntentParser()
+        items = parser.feed(json.dumps({"todos": [todo]}))
+        assert items == [("todos", todo)]
+
+    def test_ignores_markdown_fence(self):
+        parser = IncrementalIntentParser()
+        items = parser.feed('```json\n{"shopping_list": [{"name": "eggs"}]}\n```')
+        assert items == [("shopping_list", {"name": "eggs"})]
+
+
+# ──────────────────────────────────────────────
+# Database connection pool
+# ──────────────────────────────────────────────
+
+class TestConnectionPool:
+    def test_engine_options_from_environment(self):
+        from app.database import engine_options, TimedQueuePool
+
+        options = engine_options(
+            "postgresql://u:p@db/railway",
+            {"DB_POOL_SIZE": "20", "DB_MAX_OVERFLOW": "5", "DB_POOL_RECYCLE": "300", "DB_STATEMENT_TIMEOUT_MS": "5000"},
+        )
+        assert options["poolclass"] is TimedQueuePool
+        assert options["pool_size"] == 20
+        assert options["max_overflow"] == 5
+        assert options["pool_recycle"] == 300
+        assert options["pool_pre_ping"] is True
+        assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    def test_pgbouncer_mode_disables_client_pool(self):
+        from app.database import engine_options, TimedNullPool
+
+        options = engine_options("postgresql://u:p@pgbouncer/railway", {"DB_PGBOUNCER": "1", "DB_STATEMENT_TIMEOUT_MS": "5000"})
+        assert options["poolclass"] is TimedNullPool
+        assert "pool_size" not in options
+        # PgBouncer rejects startup options; the timeout is set per transaction instead
+        assert options["connect_args"] == {}
+
+    def test_sqlite_keeps_check_same_thread(self):
+        from app.database import engine_options
+
+        options = engine_options("sqlite:///./x.db", {"DB_STATEMENT_TIMEOUT_MS": "5000"})
+        assert options["connect_args"] == {"check_same_thread": False}
+
+    def test_checkout_telemetry_tracks_in_use_overflow_and_timeouts(self, tmp_path):
+        from sqlalchemy import exc
+        from app.database import create_app_engine
+
+        engine = create_app_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            {"DB_POOL_SIZE": "1", "DB_MAX_OVERFLOW": "1", "DB_POOL_TIMEOUT": "0.05"},
+        )
+        first = engine.connect()
+        second = engine.connect()
+        stats = engine.pool_stats.stats()
+        assert stats["in_use"] == 2
+        assert stats["overflow"] == 1
+        assert stats["checkouts"] == 2
+        assert stats["checkout_ms_max"] is not None
+
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        assert engine.pool_stats.stats()["timeouts"] == 1
+
+        first.close()
+        second.close()
+        stats = engine.pool_stats.stats()
+        assert stats["in_use"] == 0
+        assert stats["peak_in_use"] == 2
+        engine.dispose()
+
+    def test_metrics_endpoint_reports_pool(self, client):
+        response = client.get("/api/metrics/")
+        assert response.status_code == 200
+        pool = response.json()["db_pool"]
+        assert {"in_use", "overflow", "checkout_ms_p95", "timeouts"} <= set(pool)
+        assert response.json()["db_pool_async"]["pool"] == "TimedAsyncQueuePool"
+
+
+# ──────────────────────────────────────────────
+# Read-replica routing
+# ──────────────────────────────────────────────
+
+@pytest.fixture
+def replica(client, async_session_factory, tmp_path, monkeypatch):
+    """
+    A second SQLite file standing in for the replica. It holds one event the
+    primary doesn't, so responses show which database served them.
+    """
+    from datetime import datetime
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import NullPool
+    from app import database, main, models
+    from app.database import Base, ReadRouter, get_async_read_db
+
+    path = tmp_path / "replica.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    with Session(sync_engine) as db:
+        db.add(models.Event(title="From replica", start_time=datetime(2026, 1, 1, 9), end_time=datetime(2026, 1, 1, 10)))
+        db.commit()
+    sync_engine.dispose()
+
+    router = ReadRouter(
+        async_session_factory,
+        async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool), expire_on_commit=False),
+    )
+    monkeypatch.setattr(database, "read_router", router)
+    monkeypatch.setattr(main, "read_router", router)
+    # Exercise the real routing dependency instead of the test override
+    monkeypatch.delitem(main.app.dependency_overrides, get_async_read_db)
+    return router
+
+
+def _event_titles(client):
+    return [e["title"] for e in client.get("/api/events/").json()]
+
+
+class TestReadReplicaRouting:
+    def test_reads_go_to_replica(self, client, replica):
+        assert _event_titles(client) == ["From replica"]
+        assert replica.stats()["replica_reads"] == 1
+
+    def test_client_reads_its_own_writes_from_primary(self, client, replica):
+        client.post("/api/events/", json={"title": "Just added", "start_time": "2026-01-02T09:00:00", "end_time": "2026-01-02T10:00:00"})
+        assert _event_titles(client) == ["Just added"]
+        assert replica.stats()["read_your_writes"] == 1
+
+        # Once the window has passed, reads return to the replica
+        replica.read_your_writes_seconds = 0
+        assert _event_titles(client) == ["From replica"]
+
+    def test_other_clients_are_not_pinned_by_a_write(self, client, replica):
+        client.post("/api/events/", json={"title": "Just added", "start_time": "2026-01-02T09:00:00", "end_time": "2026-01-02T10:00:00"})
+        response = client.get("/api/events/", headers={"Authorization": "Bearer someone-else"})
+        assert [e["title"] for e in response.json()] == ["From replica"]
+
+    def test_lagging_replica_falls_back_to_primary(self, client, replica):
+        async def lagging(session):
+            return 60.0
+
+        replica.lag_probe = lagging
+        assert _event_titles(client) == []
+        assert replica.stats()["lag_fallbacks"] == 1
+        assert replica.stats()["replica_lag_seconds"] == 60.0
+
+    def test_failed_lag_probe_falls_back_to_primary(self, client, replica):
+        async def broken(session):
+            raise RuntimeError("replica unreachable")
+
+        replica.lag_probe = broken
+        assert _event_titles(client) == []
+        assert replica.stats()["lag_fallbacks"] == 1
+
+    def test_without_replica_everything_reads_primary(self):
+        import asyncio
+        from app.database import ReadRouter
+
+        primary = object()
+        router = ReadRouter(primary)
+        assert asyncio.run(router.session_factory("anyone")) is primary
+        assert router.stats()["replica_configured"] is False
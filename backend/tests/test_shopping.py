@@ -122,3 +122,96 @@ def test_delete_nonexistent_item(client: TestClient):
 def test_toggle_nonexistent_item(client: TestClient):
     response = client.post("/api/shopping/99999/toggle")
     assert response.status_code == 404
+
+
+def test_bulk_create_shopping_items(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+
+    response = client.post(
+        "/api/shopping/bulk",
+        json=[{"name": "Milk"}, {"name": "Eggs", "category": "Food"}, {"name": "Bread"}],
+        params={"family_id": family.id, "user_id": user.id},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [i["name"] for i in data] == ["Milk", "Eggs", "Bread"]
+    assert all(i["family_id"] == family.id for i in data)
+    assert data[1]["category"] == "Food"
+
+
+def _bulk_seed(client, family, user, names):
+    response = client.post(
+        "/api/shopping/bulk",
+        json=[{"name": n} for n in names],
+        params={"family_id": family.id, "user_id": user.id},
+    )
+    return [i["id"] for i in response.json()]
+
+
+def test_bulk_toggle_bought(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    ids = _bulk_seed(client, family, user, ["A", "B", "C"])
+
+    # Flip two items
+    r = client.post("/api/shopping/bulk/toggle", json={"ids": ids[:2]}, params={"family_id": family.id})
+    assert r.status_code == 200
+    assert r.json()["updated"] == 2
+
+    items = {i["id"]: i["is_bought"] for i in client.get("/api/shopping/", params={"family_id": family.id}).json()}
+    assert items == {ids[0]: True, ids[1]: True, ids[2]: False}
+
+    # Explicit value sets rather than flips
+    client.post("/api/shopping/bulk/toggle", json={"ids": ids, "is_bought": True}, params={"family_id": family.id})
+    items = client.get("/api/shopping/", params={"family_id": family.id}).json()
+    assert all(i["is_bought"] for i in items)
+
+
+def test_bulk_toggle_ignores_other_families(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    ids = _bulk_seed(client, family, user, ["A"])
+
+    r = client.post("/api/shopping/bulk/toggle", json={"ids": ids}, params={"family_id": family.id + 1})
+    assert r.json()["updated"] == 0
+
+
+def test_clear_bought(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    ids = _bulk_seed(client, family, user, ["A", "B", "C"])
+    client.post("/api/shopping/bulk/toggle", json={"ids": ids[1:]}, params={"family_id": family.id})
+
+    r = client.delete("/api/shopping/bought", params={"family_id": family.id})
+    assert r.status_code == 200
+    assert r.json()["deleted"] == 2
+
+    remaining = client.get("/api/shopping/", params={"family_id": family.id}).json()
+    assert [i["id"] for i in remaining] == [ids[0]]
+
+
+def test_update_shopping_item_version_conflict(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    item_id = _bulk_seed(client, family, user, ["Milk"])[0]
+
+    first = client.put(f"/api/shopping/{item_id}", json={"name": "Oat milk", "version": 1})
+    assert first.status_code == 200
+    assert first.json()["version"] == 2
+
+    stale = client.put(f"/api/shopping/{item_id}", json={"name": "Soy milk", "version": 1})
+    assert stale.status_code == 409
+
+
+def test_toggle_bumps_version(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    item_id = _bulk_seed(client, family, user, ["Juice"])[0]
+
+    assert client.post(f"/api/shopping/{item_id}/toggle").json()["version"] == 2
+    assert client.post(f"/api/shopping/{item_id}/toggle").json()["version"] == 3
+
+
+def test_bulk_toggle_bumps_version(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    item_id = _bulk_seed(client, family, user, ["Milk"])[0]
+    client.post("/api/shopping/bulk/toggle", json={"ids": [item_id], "is_bought": True}, params={"family_id": family.id})
+
+    stale = client.put(f"/api/shopping/{item_id}", json={"name": "Milk", "is_bought": False, "version": 1})
+    assert stale.status_code == 409
+    assert client.get("/api/shopping/", params={"family_id": family.id}).json()[0]["is_bought"] is True
@@ -0,0 +1,182 @@
+"""Live change push: the pub/sub hub, its brokers and /api/stream."""
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app import models, pubsub
+from app.pubsub import Hub, MemoryBroker, RedisBroker, record_change
+from app.pubsub_server import PubSubServer
+from app.routes.stream import _events
+
+
+@pytest.fixture
+def hub():
+    """A fresh in-process hub in place of the app-wide one."""
+    fresh = Hub(MemoryBroker(), queue_size=4)
+    with patch.object(pubsub, "hub", fresh), patch("app.routes.stream.hub", fresh):
+        yield fresh
+
+
+async def _next(subscription, timeout=2.0):
+    return json.loads(await asyncio.wait_for(subscription.get(), timeout))
+
+
+# ──────────────────────────────────────────────
+# Hub
+# ──────────────────────────────────────────────
+
+class TestHub:
+    def test_fans_out_to_the_family_only(self, hub):
+        async def run():
+            mine, also_mine, theirs = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+            hub.publish(1, {"type": "change", "changed": {"todos": [3]}})
+            await asyncio.sleep(0)
+            assert await _next(mine) == await _next(also_mine) == {"type": "change", "changed": {"todos": [3]}}
+            assert theirs._queue.empty()
+            assert hub.stats()["connections"] == 3 and hub.stats()["families"] == 2
+
+            for subscription in (mine, also_mine, theirs):
+                subscription.close()
+            assert hub.stats()["connections"] == 0 and hub.stats()["families"] == 0
+
+        asyncio.run(run())
+
+    def test_publish_from_another_thread(self, hub):
+        async def run():
+            subscription = hub.subscribe(1)
+            await asyncio.to_thread(hub.publish, 1, {"type": "change"})
+            assert await _next(subscription) == {"type": "change"}
+
+        asyncio.run(run())
+
+    def test_slow_connection_gets_one_resync(self, hub):
+        async def run():
+            slow, fast = hub.subscribe(1), hub.subscribe(1)
+            for n in range(10):
+                hub.publish(1, {"type": "change", "n": n})
+                if n % 2 == 0:
+                    await asyncio.sleep(0)
+                    while not fast._queue.empty():
+                        await fast.get()
+
+            # The backlog was replaced by a single resync; nothing queued behind it
+            assert await _next(slow) == {"type": "resync"}
+            assert slow._queue.empty()
+            assert hub.overflows == 1
+
+            hub.publish(1, {"type": "change", "n": 10})
+            await asyncio.sleep(0)
+            assert await _next(slow) == {"type": "change", "n": 10}
+
+        asyncio.run(run())
+
+
+# ──────────────────────────────────────────────
+# Publishing on commit
+# ──────────────────────────────────────────────
+
+class TestRecordChange:
+    def test_one_message_per_family_after_commit(self, hub, db_session):
+        published = []
+        Session = sessionmaker(bind=db_session.get_bind())
+        with patch.object(hub, "publish", lambda family_id, message: published.append((family_id, message))):
+            with Session() as db:
+                todos = [models.ToDo(title="a", family_id=1), models.ToDo(title="b", family_id=1), models.ToDo(title="c", family_id=2)]
+                db.add_all(todos)
+                db.flush()
+                record_change(db, "todos", todos)
+                record_change(db, "shopping_items", [models.ShoppingItem(id=9, family_id=1)], deleted=True)
+                record_change(db, "todos", [models.ToDo(id=10, family_id=None)])
+                assert published == []
+                ids = [todo.id for todo in todos]
+                db.commit()
+
+                record_change(db, "todos", todos[:1])
+                db.rollback()
+                db.commit()
+
+        assert published == [
+            (1, {"type": "change", "changed": {"todos": ids[:2]}, "deleted": {"shopping_items": [9]}}),
+            (2, {"type": "change", "changed": {"todos": ids[2:]}}),
+        ]
+
+
+# ──────────────────────────────────────────────
+# /api/stream
+# ──────────────────────────────────────────────
+
+class TestStreamEndpoints:
+    def test_websocket_receives_family_changes(self, client: TestClient, hub):
+        with client.websocket_connect("/api/stream/ws?family_id=1") as websocket:
+            assert websocket.receive_json() == {"type": "ready"}
+
+            todo = client.post("/api/todos/", json={"title": "Laundry"}, params={"family_id": 1}).json()
+            client.post("/api/todos/", json={"title": "Elsewhere"}, params={"family_id": 2})
+            item = client.post("/api/shopping/", json={"name": "Milk"}, params={"family_id": 1}).json()
+            client.delete(f"/api/shopping/{item['id']}")
+
+            assert websocket.receive_json() == {"type": "change", "changed": {"todos": [todo["id"]]}}
+            assert websocket.receive_json() == {"type": "change", "changed": {"shopping_items": [item["id"]]}}
+            assert websocket.receive_json() == {"type": "change", "deleted": {"shopping_items": [item["id"]]}}
+        assert hub.stats()["connections"] == 0
+
+    def test_websocket_heartbeat(self, client: TestClient, hub):
+        with patch("app.routes.stream.HEARTBEAT_SECONDS", 0.01):
+            with client.websocket_connect("/api/stream/ws") as websocket:
+                assert websocket.receive_json() == {"type": "ready"}
+                assert websocket.receive_json() == {"type": "ping"}
+
+    def test_server_sent_events(self, hub):
+        async def run():
+            events = _events(1)
+            assert await anext(events) == 'data: {"type":"ready"}\n\n'
+            hub.publish(1, {"type": "change", "changed": {"todos": [4]}})
+            assert await anext(events) == 'data: {"type":"change","changed":{"todos":[4]}}\n\n'
+            with patch("app.routes.stream.HEARTBEAT_SECONDS", 0.01):
+                assert await anext(events) == ": ping\n\n"
+            # Disconnect: the stream is closed and the connection leaves the hub
+            await events.aclose()
+            assert hub.stats()["connections"] == 0
+
+        asyncio.run(run())
+
+
+# ──────────────────────────────────────────────
+# Redis-protocol broker
+# ──────────────────────────────────────────────
+
+class TestRedisBroker:
+    def test_workers_share_changes_through_the_stand_in_server(self):
+        async def run():
+            server = PubSubServer(port=0)
+            await server.start()
+            url = f"redis://127.0.0.1:{server.port}"
+            worker_a, worker_b = Hub(RedisBroker(url)), Hub(RedisBroker(url))
+            try:
+                subscription = worker_b.subscribe(5)
+                while "calendar:family:5" not in server._channels:
+                    await asyncio.sleep(0.01)
+
+                # Route threads publish over the blocking connection
+                await asyncio.to_thread(worker_a.publish, 5, {"type": "change", "changed": {"events": [1]}})
+                await asyncio.to_thread(worker_a.publish, 6, {"type": "change"})
+                assert await _next(subscription) == {"type": "change", "changed": {"events": [1]}}
+
+                subscription.close()
+                while "calendar:family:5" in server._channels:
+                    await asyncio.sleep(0.01)
+            finally:
+                await worker_a.close()
+                await worker_b.close()
+                await server.close()
+
+        asyncio.run(run())
+
+    def test_publish_errors_are_counted_not_raised(self):
+        broker = RedisBroker("redis://127.0.0.1:1", timeout=0.2)
+        broker.publish("calendar:family:1", "{}")
+        assert broker.stats() == {"publish_errors": 1, "reconnects": 0}
@@ -0,0 +1,131 @@
+"""Delta sync (GET /api/sync) and soft deletes."""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+
+
+@pytest.fixture
+def family(db_session):
+    family = models.Family(name="Sync")
+    db_session.add(family)
+    db_session.flush()
+    user = models.User(name="Alex", email="alex@example.com", family_id=family.id)
+    db_session.add(user)
+    db_session.commit()
+    return family, user
+
+
+@pytest.fixture
+def no_lag():
+    with patch("app.routes.sync.SYNC_LAG", timedelta(0)):
+        yield
+
+
+def _seed(client, db_session, family, user):
+    params = {"family_id": family.id, "user_id": user.id}
+    event = client.post("/api/events/", json={"title": "Soccer", "start_time": "2025-03-01T10:00:00", "end_time": "2025-03-01T11:00:00"}).json()
+    db_session.query(models.Event).filter(models.Event.id == event["id"]).update({"family_id": family.id})
+    db_session.commit()
+    todo = client.post("/api/todos/", json={"title": "Laundry"}, params=params).json()
+    item = client.post("/api/shopping/", json={"name": "Milk"}, params=params).json()
+    return event, todo, item
+
+
+def _sync(client, family, since=None, **params):
+    response = client.get("/api/sync/", params={"family_id": family.id, **({"since": since} if since else {}), **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _ids(payload):
+    return {name: [row["id"] for row in payload[name]] for name in ("events", "todos", "shopping_items")}
+
+
+# ──────────────────────────────────────────────
+# Sync
+# ──────────────────────────────────────────────
+
+class TestSync:
+    def test_first_sync_then_only_changes(self, client: TestClient, db_session, family, no_lag):
+        family, user = family
+        event, todo, item = _seed(client, db_session, family, user)
+
+        first = _sync(client, family)
+        assert _ids(first) == {"events": [event["id"]], "todos": [todo["id"]], "shopping_items": [item["id"]]}
+        assert first["has_more"] is False
+
+        idle = _sync(client, family, first["token"])
+        assert _ids(idle) == {"events": [], "todos": [], "shopping_items": []}
+
+        client.put(f"/api/todos/{todo['id']}", json={"title": "Laundry", "status": "completed"})
+        client.delete(f"/api/shopping/{item['id']}")
+        delta = _sync(client, family, idle["token"])
+        assert _ids(delta) == {"events": [], "todos": [todo["id"]], "shopping_items": []}
+        assert delta["todos"][0]["status"] == "completed"
+        assert delta["deleted"] == {"events": [], "todos": [], "shopping_items": [item["id"]]}
+
+        assert _ids(_sync(client, family, delta["token"])) == {"events": [], "todos": [], "shopping_items": []}
+
+    def test_pages_cover_every_row_once(self, client: TestClient, family, no_lag):
+        family, user = family
+        client.post("/api/todos/bulk", json=[{"title": f"Todo {i}"} for i in range(5)], params={"family_id": family.id, "user_id": user.id})
+
+        seen, token, calls = [], None, 0
+        while True:
+            page = _sync(client, family, token, limit=2)
+            seen += page["todos"]
+            token, calls = page["token"], calls + 1
+            if not page["has_more"]:
+                break
+        assert sorted(todo["title"] for todo in seen) == [f"Todo {i}" for i in range(5)]
+        assert calls == 3
+
+    def test_recent_writes_are_sent_again_within_lag(self, client: TestClient, db_session, family):
+        family, user = family
+        _, todo, _ = _seed(client, db_session, family, user)
+        first = _sync(client, family)
+        # Still within SYNC_LAG_SECONDS: a slower concurrent write could land behind it
+        assert [t["id"] for t in _sync(client, family, first["token"])["todos"]] == [todo["id"]]
+
+    def test_rejects_bad_tokens(self, client: TestClient, db_session, family):
+        family, _ = family
+        token = _sync(client, family)["token"]
+        assert client.get("/api/sync/", params={"family_id": family.id, "since": "not-a-token"}).status_code == 400
+        assert client.get("/api/sync/", params={"family_id": family.id + 1, "since": token}).status_code == 400
+
+
+# ──────────────────────────────────────────────
+# Soft deletes
+# ──────────────────────────────────────────────
+
+class TestSoftDeletes:
+    def test_deleted_rows_are_hidden_but_kept(self, client: TestClient, db_session, family):
+        family, user = family
+        event, todo, item = _seed(client, db_session, family, user)
+        assert client.delete(f"/api/events/{event['id']}").status_code == 200
+        assert client.delete(f"/api/todos/{todo['id']}").status_code == 200
+
+        assert client.get(f"/api/events/{event['id']}").status_code == 404
+        assert client.get("/api/events/").json() == []
+        assert client.get("/api/todos/", params={"family_id": family.id}).json() == []
+        assert client.put(f"/api/todos/{todo['id']}", json={"title": "again"}).status_code == 404
+        assert client.delete(f"/api/events/{event['id']}").status_code == 404
+
+        db_session.expire_all()
+        tombstone = db_session.get(models.Event, event["id"])
+        assert tombstone.deleted_at is not None and tombstone.version == event["version"] + 1
+
+    def test_clear_bought_leaves_tombstones(self, client: TestClient, db_session, family, no_lag):
+        family, user = family
+        params = {"family_id": family.id, "user_id": user.id}
+        items = client.post("/api/shopping/bulk", json=[{"name": "Milk"}, {"name": "Eggs"}], params=params).json()
+        token = _sync(client, family)["token"]
+        client.post(f"/api/shopping/{items[0]['id']}/toggle")
+        assert client.delete("/api/shopping/bought", params={"family_id": family.id}).json()["deleted"] == 1
+
+        assert [i["name"] for i in client.get("/api/shopping/", params={"family_id": family.id}).json()] == ["Eggs"]
+        assert _sync(client, family, token)["deleted"]["shopping_items"] == [items[0]["id"]]
@@ -0,0 +1,142 @@
+"""Request telemetry: Prometheus exposition, Server-Timing, DB/LLM attribution."""
+import re
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import telemetry
+from app.services.llm import HedgedLLM, LLMProvider
+from tests.mocks.fixtures import mock_gemini_client, GEMINI_SEARCH_RESPONSE
+
+
+def _server_timing(response):
+    """{"db": (ms, desc), "llm": (ms, desc), "total": (ms, None)} from the header."""
+    parsed = {}
+    for entry in response.headers["server-timing"].split(","):
+        name, *params = [p.strip() for p in entry.split(";")]
+        values = dict(p.split("=", 1) for p in params)
+        parsed[name] = (float(values["dur"]), values.get("desc", "").strip('"') or None)
+    return parsed
+
+
+# ──────────────────────────────────────────────
+# Metric types
+# ──────────────────────────────────────────────
+
+class TestMetricTypes:
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = telemetry.Registry()
+        histogram = telemetry.Histogram("op_seconds", "Op latency.", ("op",), buckets=(0.1, 1.0), registry=registry)
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "read")
+
+        text = registry.render()
+        assert '# TYPE op_seconds histogram' in text
+        assert 'op_seconds_bucket{op="read",le="0.1"} 2' in text
+        assert 'op_seconds_bucket{op="read",le="1"} 3' in text
+        assert 'op_seconds_bucket{op="read",le="+Inf"} 4' in text
+        assert 'op_seconds_count{op="read"} 4' in text
+        assert re.search(r'op_seconds_sum\{op="read"\} 3\.65', text)
+
+    def test_label_values_are_escaped(self):
+        registry = telemetry.Registry()
+        counter = telemetry.Counter("hits_total", "Hits.", ("path",), registry=registry)
+        counter.inc('say "hi"\n')
+        assert 'hits_total{path="say \\"hi\\"\\n"} 1' in registry.render()
+
+    def test_wrong_label_count_is_rejected_at_render(self):
+        registry = telemetry.Registry()
+        counter = telemetry.Counter("hits_total", "Hits.", ("path",), registry=registry)
+        counter.inc("a", "b")
+        with pytest.raises(ValueError):
+            registry.render()
+
+
+# ──────────────────────────────────────────────
+# Middleware + /metrics
+# ──────────────────────────────────────────────
+
+class TestRequestMetrics:
+    def test_server_timing_counts_db_queries(self, client: TestClient):
+        response = client.get("/api/events/999999")
+        assert response.status_code == 404
+
+        timing = _server_timing(response)
+        assert timing["db"][1] == "1 queries"
+        assert timing["llm"] == (0.0, "0 calls")
+        assert timing["total"][0] >= timing["db"][0]
+
+    def test_async_routes_attribute_queries_too(self, client: TestClient):
+        client.post("/api/events/", json={
+            "title": "Timed", "start_time": "2026-01-01T10:00:00", "end_time": "2026-01-01T11:00:00",
+        })
+        response = client.get("/api/events/")
+        assert response.status_code == 200
+        # Runs on the aiosqlite engine, inside SQLAlchemy's greenlet bridge
+        assert int(_server_timing(response)["db"][1].split()[0]) >= 1
+
+    def test_requests_are_labelled_by_route_template(self, client: TestClient):
+        before = telemetry.HTTP_REQUESTS.value("GET", "/api/events/{event_id}", "404")
+        client.get("/api/events/1001")
+        client.get("/api/events/1002")
+        client.get("/no/such/path")
+
+        assert telemetry.HTTP_REQUESTS.value("GET", "/api/events/{event_id}", "404") == before + 2
+        assert telemetry.HTTP_REQUESTS.value("GET", "unmatched", "404") >= 1
+
+    def test_metrics_endpoint_serves_prometheus_text(self, client: TestClient):
+        client.get("/api/events/999999")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert '# TYPE http_request_duration_seconds histogram' in body
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/events/{event_id}"}' in body
+        assert 'http_request_db_queries_bucket{route="/api/events/{event_id}",le="1"}' in body
+        assert 'db_pool_checkouts_total{pool="primary"}' in body
+        assert "http_requests_in_flight 1" in body  # the scrape itself
+
+    @patch("app.routes.assistant.require_client")
+    def test_llm_time_is_attributed_to_the_request(self, mock_require_client, client: TestClient):
+        mock_require_client.return_value = mock_gemini_client(GEMINI_SEARCH_RESPONSE)
+        before = telemetry.LLM_CALL_SECONDS.count("gemini", "ok")
+
+        response = client.post("/api/assistant/search", json={"query": "telemetry concerts"})
+        assert response.status_code == 200
+        assert _server_timing(response)["llm"][1] == "1 calls"
+        assert telemetry.LLM_CALL_SECONDS.count("gemini", "ok") == before + 1
+
+
+# ──────────────────────────────────────────────
+# LLM timing
+# ──────────────────────────────────────────────
+
+class _Provider(LLMProvider):
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+
+    def generate(self, prompt, system=None, json_mode=True):
+        if self.fail:
+            raise RuntimeError("provider down")
+        return "{}"
+
+
+class TestLLMTiming:
+    def test_failed_call_is_recorded_as_error(self):
+        before = telemetry.LLM_CALL_SECONDS.count("flaky", "error")
+        with telemetry.request_timing() as timing:
+            with pytest.raises(RuntimeError):
+                with telemetry.llm_call("flaky"):
+                    raise RuntimeError("boom")
+        assert telemetry.LLM_CALL_SECONDS.count("flaky", "error") == before + 1
+        assert timing.llm_calls == 1
+
+    def test_hedged_calls_on_worker_threads_count_towards_the_request(self):
+        llm = HedgedLLM([_Provider("down", fail=True), _Provider("up")], default_hedge_delay=5.0)
+        with telemetry.request_timing() as timing:
+            assert llm.generate("hello") == "{}"
+        # Both the failed primary and the fallback ran on the executor
+        assert timing.llm_calls == 2
@@ -125,3 +125,72 @@ def test_delete_nonexistent_todo(client: TestClient):
 def test_update_nonexistent_todo(client: TestClient):
     response = client.put("/api/todos/99999", json={"title": "nope"})
     assert response.status_code == 404
+
+
+def _bulk_seed(client, family, user, titles):
+    response = client.post(
+        "/api/todos/bulk",
+        json=[{"title": t} for t in titles],
+        params={"family_id": family.id, "user_id": user.id},
+    )
+    assert response.status_code == 200
+    return [t["id"] for t in response.json()]
+
+
+def test_bulk_create_todos(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    ids = _bulk_seed(client, family, user, ["Laundry", "Dishes"])
+
+    todos = client.get("/api/todos/", params={"family_id": family.id}).json()
+    assert sorted(t["id"] for t in todos) == sorted(ids)
+    assert all(t["created_by_user_id"] == user.id for t in todos)
+
+
+def test_bulk_complete_todos(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    ids = _bulk_seed(client, family, user, ["Laundry", "Dishes", "Trash"])
+
+    r = client.post("/api/todos/bulk/complete", json={"ids": ids[:2]}, params={"family_id": family.id})
+    assert r.status_code == 200
+    assert r.json()["updated"] == 2
+
+    statuses = {t["id"]: t["status"] for t in client.get("/api/todos/", params={"family_id": family.id}).json()}
+    assert statuses == {ids[0]: "completed", ids[1]: "completed", ids[2]: "pending"}
+
+
+def test_bulk_delete_todos(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    ids = _bulk_seed(client, family, user, ["Laundry", "Dishes", "Trash"])
+
+    r = client.post("/api/todos/bulk/delete", json={"ids": ids[1:]}, params={"family_id": family.id})
+    assert r.json()["deleted"] == 2
+
+    # Other families' ids are never touched
+    r = client.post("/api/todos/bulk/delete", json={"ids": ids[:1]}, params={"family_id": family.id + 1})
+    assert r.json()["deleted"] == 0
+
+    remaining = client.get("/api/todos/", params={"family_id": family.id}).json()
+    assert [t["id"] for t in remaining] == [ids[0]]
+
+
+def test_update_todo_version_conflict(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    todo_id = _bulk_seed(client, family, user, ["Laundry"])[0]
+
+    first = client.put(f"/api/todos/{todo_id}", json={"title": "Laundry", "status": "completed", "version": 1})
+    assert first.status_code == 200
+    assert first.json()["version"] == 2
+
+    stale = client.put(f"/api/todos/{todo_id}", json={"title": "Laundry", "status": "pending", "version": 1})
+    assert stale.status_code == 409
+
+
+def test_bulk_complete_bumps_version(client: TestClient, db_session):
+    family, user = _seed_family_and_user(client, db_session)
+    todo_id = _bulk_seed(client, family, user, ["Laundry"])[0]
+    client.post("/api/todos/bulk/complete", json={"ids": [todo_id]}, params={"family_id": family.id})
+
+    # A client that loaded the todo before the bulk change can't silently undo it
+    stale = client.put(f"/api/todos/{todo_id}", json={"title": "Laundry", "status": "pending", "version": 1})
+    assert stale.status_code == 409
+    assert client.get("/api/todos/", params={"family_id": family.id}).json()[0]["status"] == "completed"
@@ -79,3 +79,18 @@ def test_update_user(client: TestClient):
     assert response.status_code == 200
     assert response.json()["name"] == "Updated Name"
     assert response.json()["role"] == "admin"
+
+def test_update_user_version_conflict(client: TestClient):
+    res = client.post(
+        "/api/users/",
+        json={"name": "Racer", "email": "racer@example.com", "password": "pwd"},
+    )
+    user_id = res.json()["id"]
+    body = {"name": "Racer", "email": "racer@example.com", "version": 1}
+
+    assert client.put(f"/api/users/{user_id}", json=body).status_code == 200
+    assert client.put(f"/api/users/{user_id}", json=body).status_code == 409
+
+def test_update_missing_user(client: TestClient):
+    response = client.put("/api/users/99999", json={"name": "Ghost", "email": "ghost@example.com"})
+    assert response.status_code == 404